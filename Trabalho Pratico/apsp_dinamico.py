@@ -0,0 +1,228 @@
+import heapq # Importa heapq para as filas de prioridade dos reparos (Dijkstra parcial)
+
+from grafo_csr import GrafoCSR
+from matriz_distancias import MatrizDistancias, MatrizPredecessores, DISTANCIA_INALCANCAVEL
+from caminhos_minimos import dijkstra_csr
+from instancia_preparada import identificar_servicos_inviaveis
+from matriz_servicos import MatrizServicos
+
+class APSPDinamico:
+    """
+    Mantém a matriz APSP de uma instância preparada atualizada diante de alterações na rede
+    (inserção, remoção e mudança de custo de arestas e arcos), sem recalcular todo o APSP.
+
+    Para cada origem da matriz são guardadas a linha completa de distâncias (todos os nós do grafo)
+    e a árvore de caminhos mínimos. A cada alteração do arco (a, b), só as origens afetadas são
+    reparadas:
+      - redução de custo ou inserção: origens em que d(s, a) + custo < d(s, b); um Dijkstra parcial
+        a partir de b propaga apenas as melhorias;
+      - aumento de custo ou remoção: origens cuja árvore usa o arco (predecessor de b é a); a subárvore
+        de b é invalidada e recalculada a partir dos vizinhos de entrada que ficaram fora dela.
+    A matriz da instância (`short_paths_matrix`) é substituída por uma cópia própria, pois a original
+    pode ser compartilhada pelo cache com outras instâncias da mesma rede; `traversal_costs`,
+    `graph_adj` e o grafo CSR da instância são mantidos coerentes com as alterações.
+    """
+    __slots__ = ('instancia', 'nos', 'indice_no', 'saida', 'entrada', 'origens', 'indices_destino',
+                 'distancias', 'predecessores', 'matriz')
+
+    def __init__(self, instancia):
+        """
+        Args:
+            instancia (InstanciaPreparada): Instância já preparada (ver `preparar_instancia`). As linhas
+                                            de origem e as colunas de destino são as da sua matriz APSP.
+        """
+        self.instancia = instancia
+        grafo = instancia.grafo
+        if instancia.reducao is not None:
+            # O APSP foi calculado no grafo reduzido; as alterações valem para o grafo original
+            grafo = GrafoCSR(instancia.all_graph_nodes, instancia.traversal_costs)
+        self.nos = grafo.nos
+        self.indice_no = grafo.indice_no
+
+        # Adjacência mutável por índice denso: saida[u][v] = custo e entrada[v][u] = custo
+        self.saida = [{} for _ in self.nos]
+        self.entrada = [{} for _ in self.nos]
+        for (u, v), custo in instancia.traversal_costs.items():
+            i, j = self.indice_no[u], self.indice_no[v]
+            self.saida[i][j] = custo
+            self.entrada[j][i] = custo
+
+        matriz_original = instancia.short_paths_matrix
+        self.origens = list(matriz_original.nos)
+        self.indices_destino = [self.indice_no[no] for no in matriz_original.nos_destino]
+
+        # Linhas completas (distância e predecessor para todos os nós) de cada origem da matriz
+        self.distancias = {}
+        self.predecessores = {}
+        for origem in self.origens:
+            predecessores = [-1] * len(self.nos)
+            self.distancias[origem] = dijkstra_csr(grafo, self.indice_no[origem], predecessores)
+            self.predecessores[origem] = predecessores
+
+        # Matriz própria, no mesmo formato (e com predecessores, se a original os tinha)
+        self.matriz = MatrizDistancias(self.origens, nos_destino=matriz_original.nos_destino)
+        if matriz_original.predecessores is not None:
+            self.matriz.predecessores = MatrizPredecessores(self.origens, self.nos)
+        for origem in self.origens:
+            self._gravar_linha(origem)
+        instancia.short_paths_matrix = self.matriz
+        instancia.matriz_servicos = MatrizServicos(instancia.servicos, instancia.depot_node, self.matriz)
+
+    def _gravar_linha(self, origem):
+        """Copia a linha completa de uma origem para a matriz (colunas de destino e predecessores)."""
+        self.matriz.definir_linha_densa(origem, self.distancias[origem], self.indices_destino)
+        if self.matriz.predecessores is not None:
+            self.matriz.predecessores.definir_linha(origem, self.predecessores[origem])
+
+    def _reduzir(self, distancias, predecessores, a, b, custo):
+        """
+        Repara uma linha após o arco (a, b) passar a custar `custo` (menos que antes, ou inserido).
+
+        Returns:
+            bool: True se alguma distância da linha mudou.
+        """
+        dist_a = distancias[a]
+        if dist_a == DISTANCIA_INALCANCAVEL or dist_a + custo >= distancias[b]:
+            return False
+        distancias[b] = dist_a + custo
+        predecessores[b] = a
+        saida = self.saida
+        pq = [(distancias[b], b)]
+        while pq:
+            dist, u = heapq.heappop(pq)
+            if dist > distancias[u]:
+                continue
+            for v, custo_uv in saida[u].items():
+                nova_dist = dist + custo_uv
+                if nova_dist < distancias[v]:
+                    distancias[v] = nova_dist
+                    predecessores[v] = u
+                    heapq.heappush(pq, (nova_dist, v))
+        return True
+
+    def _aumentar(self, distancias, predecessores, a, b):
+        """
+        Repara uma linha após o arco (a, b) ficar mais caro ou ser removido (custo novo já em `saida`).
+
+        Returns:
+            bool: True se a árvore de caminhos mínimos da linha usava o arco (linha reparada).
+        """
+        if predecessores[b] != a:
+            return False # O arco não está na árvore: nenhuma distância aumenta
+
+        # Subárvore de b: nós cujo caminho mínimo passa por b. Os filhos de u na árvore são os vizinhos
+        # de saída v com predecessor u, de modo que a busca só percorre os arcos da própria subárvore
+        saida = self.saida
+        subarvore = [b]
+        for u in subarvore:
+            subarvore.extend(v for v in saida[u] if predecessores[v] == u)
+        for v in subarvore:
+            distancias[v] = DISTANCIA_INALCANCAVEL
+            predecessores[v] = -1
+
+        # Cada nó invalidado recebe o melhor valor vindo de fora da subárvore; depois, Dijkstra entre eles
+        pq = []
+        for v in subarvore:
+            for u, custo_uv in self.entrada[v].items():
+                dist_u = distancias[u]
+                if dist_u != DISTANCIA_INALCANCAVEL and dist_u + custo_uv < distancias[v]:
+                    distancias[v] = dist_u + custo_uv
+                    predecessores[v] = u
+            if distancias[v] != DISTANCIA_INALCANCAVEL:
+                pq.append((distancias[v], v))
+        heapq.heapify(pq)
+        while pq:
+            dist, u = heapq.heappop(pq)
+            if dist > distancias[u]:
+                continue
+            for v, custo_uv in saida[u].items():
+                nova_dist = dist + custo_uv
+                if nova_dist < distancias[v]:
+                    distancias[v] = nova_dist
+                    predecessores[v] = u
+                    heapq.heappush(pq, (nova_dist, v))
+        return True
+
+    def _alterar_arco(self, u, v, custo, linhas_alteradas):
+        """Aplica a alteração de um arco (custo None = remoção) e repara as linhas afetadas."""
+        if u not in self.indice_no or v not in self.indice_no:
+            raise ValueError(f"Arco ({u}, {v}) com extremo fora do grafo da instância.")
+        a, b = self.indice_no[u], self.indice_no[v]
+        custo_antigo = self.saida[a].get(b)
+        if custo == custo_antigo:
+            return
+
+        # Atualiza a adjacência mutável e os dados da instância no formato antigo
+        instancia = self.instancia
+        if custo is None:
+            del self.saida[a][b]
+            del self.entrada[b][a]
+            del instancia.traversal_costs[(u, v)]
+            instancia.graph_adj[u] = [w for w in instancia.graph_adj[u] if w != v]
+        else:
+            self.saida[a][b] = custo
+            self.entrada[b][a] = custo
+            if custo_antigo is None:
+                instancia.graph_adj[u].append(v)
+            instancia.traversal_costs[(u, v)] = custo
+
+        reduziu = custo is not None and (custo_antigo is None or custo < custo_antigo)
+        for origem in self.origens:
+            distancias, predecessores = self.distancias[origem], self.predecessores[origem]
+            if reduziu:
+                alterou = self._reduzir(distancias, predecessores, a, b, custo)
+            else:
+                alterou = self._aumentar(distancias, predecessores, a, b)
+            if alterou:
+                linhas_alteradas.add(origem)
+
+    def aplicar_alteracoes(self, alteracoes):
+        """
+        Aplica uma sequência de alterações na rede e atualiza a matriz APSP da instância.
+
+        Args:
+            alteracoes (list): Tuplas (tipo, u, v, custo), com tipo 'aresta' (os dois sentidos) ou
+                               'arco' (apenas u -> v). custo é o novo custo de travessia (insere o
+                               elemento se ele não existir) ou None para removê-lo.
+
+        Returns:
+            int: Número de linhas (origens) da matriz que foram reparadas.
+        """
+        linhas_alteradas = set()
+        for tipo, u, v, custo in alteracoes:
+            if tipo == 'aresta':
+                self._alterar_arco(u, v, custo, linhas_alteradas)
+                self._alterar_arco(v, u, custo, linhas_alteradas)
+            elif tipo == 'arco':
+                self._alterar_arco(u, v, custo, linhas_alteradas)
+            else:
+                raise ValueError(f"Tipo de alteração desconhecido: '{tipo}'. Opções: aresta, arco")
+
+        for origem in linhas_alteradas:
+            self._gravar_linha(origem)
+        if linhas_alteradas and self.matriz.predecessores is not None:
+            self.matriz.predecessores.caminhos.clear() # Caminhos em cache podem ter mudado
+        if alteracoes:
+            self.instancia.grafo = GrafoCSR(self.instancia.all_graph_nodes, self.instancia.traversal_costs)
+            self.instancia.reducao = None # A redução se referia à rede anterior
+            # Bloqueios podem isolar serviços do depósito (e novos trechos podem reconectá-los)
+            self.instancia.servicos_inviaveis = identificar_servicos_inviaveis(self.instancia)
+        if linhas_alteradas:
+            self.instancia.matriz_servicos = MatrizServicos(self.instancia.servicos, self.instancia.depot_node, self.matriz)
+        return len(linhas_alteradas)
+
+    def definir_custo_aresta(self, u, v, custo):
+        """Insere a aresta {u, v} ou altera o seu custo (nos dois sentidos)."""
+        return self.aplicar_alteracoes([('aresta', u, v, custo)])
+
+    def remover_aresta(self, u, v):
+        """Remove a aresta {u, v} (os dois sentidos), como num bloqueio de rua."""
+        return self.aplicar_alteracoes([('aresta', u, v, None)])
+
+    def definir_custo_arco(self, u, v, custo):
+        """Insere o arco (u, v) ou altera o seu custo."""
+        return self.aplicar_alteracoes([('arco', u, v, custo)])
+
+    def remover_arco(self, u, v):
+        """Remove o arco (u, v)."""
+        return self.aplicar_alteracoes([('arco', u, v, None)])
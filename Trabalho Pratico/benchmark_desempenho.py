@@ -0,0 +1,1156 @@
+# benchmark_desempenho.py
+# Script de medições de desempenho das estruturas e algoritmos usados nas Etapas 2 e 3.
+# Uso: python benchmark_desempenho.py <nome_do_benchmark> [instancia1.dat instancia2.dat ...]
+# Sem instâncias explícitas, cada benchmark usa o seu próprio conjunto padrão da pasta 'instancias'.
+import os       # Importa o módulo 'os' para montar caminhos de arquivos
+import sys      # Importa o módulo 'sys' para ler os argumentos da linha de comando
+import time     # Importa o módulo 'time' para medir tempos de execução
+import random   # Importa o módulo 'random' para sortear as consultas de distância
+import tracemalloc # Importa tracemalloc para medir a memória alocada por cada estrutura
+import contextlib # Importa contextlib para silenciar as mensagens de progresso durante as medições
+import io       # Importa io para descartar a saída silenciada
+from copy import deepcopy # Importa deepcopy para a versão de referência do 2-opt
+
+from leitor_dados import carregar_dados_arquivo
+from grafo_estatisticas import construir_grafo, contar_vertices, componentes_fortemente_conexas
+from matriz_distancias import MatrizDistancias, DISTANCIA_INALCANCAVEL
+from grafo_csr import GrafoCSR
+from instancia_preparada import preparar_instancia
+from apsp_dinamico import APSPDinamico
+from reducao_grafo import reduzir_grafo
+from matriz_servicos import MatrizServicos
+from solucao import Rota, Solucao
+from otimizador_melhorado import (generate_initial_solution_internal, calculate_route_cost_from_segments, calculate_route_demand,
+                                  perform_relocate_intra, perform_2opt, perform_relocate_inter, VIZINHOS_RELOCATE_INTER,
+                                  CacheMovimentos, otimizar_solucao)
+from construtivo import (MODOS_VIZINHO_MAIS_PROXIMO, rotas_vizinho_mais_proximo, executar_portfolio, custo_rotas,
+                         tour_gigante, split_linear, rotas_savings)
+from cache_apsp import familia_instancia
+from caminhos_minimos import (dijkstra_optimized, dijkstra_csr, calcular_apsp, escolher_metodo_apsp, extremos_servicos,
+                              grafo_simetrico, np)
+
+INPUT_DIRECTORY = "instancias" # Pasta padrão das instâncias
+
+def carregar_grafo(instance_filepath):
+    """
+    Carrega uma instância e constrói o grafo, retornando o que os benchmarks de APSP precisam.
+
+    Args:
+        instance_filepath (str): Caminho completo para o arquivo de instância (.dat).
+
+    Returns:
+        tuple: (all_graph_nodes (list), graph_adj (defaultdict), traversal_costs (dict)).
+    """
+    dados_gerais, required_nodes, required_edges, non_required_edges, required_arcs, non_required_arcs = \
+        carregar_dados_arquivo(instance_filepath)
+    total_nodes_count = contar_vertices(required_edges, non_required_edges, required_arcs, non_required_arcs, required_nodes)
+    all_graph_nodes = list(range(1, total_nodes_count + 1))
+    graph_adj, traversal_costs = construir_grafo(required_edges, non_required_edges, required_arcs, non_required_arcs)
+    return all_graph_nodes, graph_adj, traversal_costs
+
+def benchmark_matriz_distancias(instance_filepaths, num_consultas=1_000_000):
+    """
+    Compara o dicionário APSP antigo (chaves (u, v)) com a MatrizDistancias compacta:
+    memória alocada por cada estrutura e latência média de uma consulta de distância.
+
+    Args:
+        instance_filepaths (list): Caminhos das instâncias a medir.
+        num_consultas (int): Número de consultas aleatórias usadas para medir a latência.
+    """
+    print(f"{'Instância':<28} {'Nós':>6} {'Dict (MB)':>10} {'Matriz (MB)':>12} {'Dict (ns)':>10} {'Matriz (ns)':>12}")
+    for instance_filepath in instance_filepaths:
+        all_graph_nodes, graph_adj, traversal_costs = carregar_grafo(instance_filepath)
+        linhas = [(u, dijkstra_optimized(u, graph_adj, traversal_costs, all_graph_nodes)) for u in all_graph_nodes]
+
+        # Memória do dicionário antigo: (u, v) -> distância
+        tracemalloc.start()
+        sp_dict = {}
+        for u, distancias in linhas:
+            for v, dist in distancias.items():
+                sp_dict[(u, v)] = dist
+        memoria_dict = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        # Memória da matriz compacta
+        tracemalloc.start()
+        sp_matriz = MatrizDistancias(all_graph_nodes)
+        for u, distancias in linhas:
+            sp_matriz.definir_linha(u, distancias)
+        memoria_matriz = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        # Mesmas consultas aleatórias para as duas estruturas
+        rng = random.Random(0)
+        consultas = [(rng.choice(all_graph_nodes), rng.choice(all_graph_nodes)) for _ in range(num_consultas)]
+
+        t0 = time.perf_counter()
+        for u, v in consultas:
+            sp_dict.get((u, v), float('inf'))
+        latencia_dict = (time.perf_counter() - t0) / num_consultas * 1e9
+
+        distancia = sp_matriz.distancia
+        t0 = time.perf_counter()
+        for u, v in consultas:
+            distancia(u, v)
+        latencia_matriz = (time.perf_counter() - t0) / num_consultas * 1e9
+
+        print(f"{os.path.basename(instance_filepath):<28} {len(all_graph_nodes):>6} "
+              f"{memoria_dict / 2**20:>10.2f} {memoria_matriz / 2**20:>12.2f} "
+              f"{latencia_dict:>10.1f} {latencia_matriz:>12.1f}")
+
+def medir(funcao, *args, **kwargs):
+    """Executa `funcao` silenciando o que ela imprime e retorna (resultado, tempo em ms)."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        t0 = time.perf_counter()
+        resultado = funcao(*args, **kwargs)
+        tempo_ms = (time.perf_counter() - t0) * 1000
+    return resultado, tempo_ms
+
+def benchmark_apsp_backends(instance_filepaths):
+    """
+    Compara os backends de APSP ('sequencial', 'threads' e 'processos') e reporta o speedup
+    do backend de processos em relação ao de threads. Com 1 CPU, força 2 trabalhadores para
+    que o custo dos backends paralelos ainda possa ser observado.
+
+    Args:
+        instance_filepaths (list): Caminhos das instâncias a medir.
+    """
+    num_workers = max(2, os.cpu_count() or 1)
+    print(f"Trabalhadores: {num_workers} (CPUs disponíveis: {os.cpu_count()})")
+    print(f"{'Instância':<28} {'Nós':>6} {'Seq (ms)':>10} {'Threads (ms)':>13} {'Processos (ms)':>15} {'Speedup':>8}")
+    for instance_filepath in instance_filepaths:
+        all_graph_nodes, graph_adj, traversal_costs = carregar_grafo(instance_filepath)
+        matriz_seq, tempo_seq = medir(calcular_apsp, all_graph_nodes, graph_adj, traversal_costs, 'sequencial')
+        matriz_thr, tempo_thr = medir(calcular_apsp, all_graph_nodes, graph_adj, traversal_costs, 'threads', num_workers)
+        matriz_proc, tempo_proc = medir(calcular_apsp, all_graph_nodes, graph_adj, traversal_costs, 'processos', num_workers)
+        if not (matriz_seq.dados == matriz_thr.dados == matriz_proc.dados):
+            print(f"  AVISO: backends divergiram em '{instance_filepath}'")
+        print(f"{os.path.basename(instance_filepath):<28} {len(all_graph_nodes):>6} {tempo_seq:>10.1f} "
+              f"{tempo_thr:>13.1f} {tempo_proc:>15.1f} {tempo_thr / tempo_proc:>7.2f}x")
+
+def benchmark_apsp_crossover(instance_filepaths):
+    """
+    Mede |V| Dijkstras (sequencial) contra o Floyd-Warshall vetorizado em instâncias de cada família,
+    mostrando onde fica o ponto de cruzamento e qual método o modo 'auto' escolhe.
+    Sem NumPy instalado, apenas o Dijkstra é medido.
+
+    Args:
+        instance_filepaths (list): Caminhos das instâncias a medir.
+    """
+    if np is None:
+        print("AVISO: NumPy não está instalado; o Floyd-Warshall vetorizado não será medido.")
+    print(f"{'Instância':<28} {'Nós':>6} {'Arcos':>6} {'Densidade':>10} {'Dijkstra (ms)':>14} {'Floyd (ms)':>11} {'Auto':>15}")
+    for instance_filepath in instance_filepaths:
+        all_graph_nodes, graph_adj, traversal_costs = carregar_grafo(instance_filepath)
+        n, m = len(all_graph_nodes), len(traversal_costs)
+        matriz_dij, tempo_dij = medir(calcular_apsp, all_graph_nodes, graph_adj, traversal_costs, 'sequencial',
+                                      simetrica=False) # Mesmo formato do Floyd-Warshall, para comparar os dados
+        tempo_fw_txt = "n/d"
+        if np is not None:
+            matriz_fw, tempo_fw = medir(calcular_apsp, all_graph_nodes, graph_adj, traversal_costs, 'floyd_warshall')
+            tempo_fw_txt = f"{tempo_fw:.1f}"
+            if matriz_fw.dados != matriz_dij.dados:
+                print(f"  AVISO: Floyd-Warshall divergiu do Dijkstra em '{instance_filepath}'")
+        densidade = m / (n * (n - 1)) if n > 1 else 0
+        print(f"{os.path.basename(instance_filepath):<28} {n:>6} {m:>6} {densidade:>10.4f} {tempo_dij:>14.1f} "
+              f"{tempo_fw_txt:>11} {escolher_metodo_apsp(n, m):>15}")
+
+def benchmark_apsp_restrito(instance_filepaths):
+    """
+    Compara o APSP completo (Dijkstra de todos os nós) com o APSP restrito aos extremos dos serviços
+    (origens: depósito e fins 'to'; destinos: depósito e inícios 'from'), em tempo e memória,
+    e confere que toda consulta que o solver pode fazer tem o mesmo valor nas duas matrizes.
+
+    Args:
+        instance_filepaths (list): Caminhos das instâncias a medir.
+    """
+    print(f"{'Instância':<28} {'Nós':>6} {'Origens':>8} {'Destinos':>9} {'Completo (ms)':>14} {'Restrito (ms)':>14} "
+          f"{'Completo (MB)':>14} {'Restrito (MB)':>14} {'Iguais':>7}")
+    for instance_filepath in instance_filepaths:
+        dados_gerais, required_nodes, required_edges, _, required_arcs, _ = carregar_dados_arquivo(instance_filepath)
+        depot_node = int(dados_gerais['Depot Node'])
+        servicos = [{'from': int(rn['node'].lstrip('N')), 'to': int(rn['node'].lstrip('N'))} for rn in required_nodes]
+        servicos += [{'from': item['from'], 'to': item['to']} for item in required_edges + required_arcs]
+        origens, destinos = extremos_servicos(servicos, depot_node)
+
+        all_graph_nodes, graph_adj, traversal_costs = carregar_grafo(instance_filepath)
+        completa, tempo_completo = medir(calcular_apsp, all_graph_nodes, graph_adj, traversal_costs, 'sequencial')
+        restrita, tempo_restrito = medir(calcular_apsp, all_graph_nodes, graph_adj, traversal_costs, 'sequencial',
+                                         origens=origens, destinos=destinos)
+        iguais = all(completa.distancia(u, v) == restrita.distancia(u, v) for u in origens for v in destinos)
+        print(f"{os.path.basename(instance_filepath):<28} {len(all_graph_nodes):>6} {len(origens):>8} {len(destinos):>9} "
+              f"{tempo_completo:>14.1f} {tempo_restrito:>14.1f} {completa.tamanho_em_bytes() / 2**20:>14.2f} "
+              f"{restrita.tamanho_em_bytes() / 2**20:>14.2f} {'sim' if iguais else 'NÃO':>7}")
+
+def benchmark_grafo_csr(instance_filepaths):
+    """
+    Compara o Dijkstra sobre lista de adjacência + dicionário de custos (`dijkstra_optimized`) com o
+    Dijkstra sobre o grafo CSR (`dijkstra_csr`), executando-os a partir de todos os nós, e confere
+    que as distâncias são iguais. Mostra também a memória de cada representação do grafo.
+
+    Args:
+        instance_filepaths (list): Caminhos das instâncias a medir.
+    """
+    print(f"{'Instância':<28} {'Nós':>6} {'Arcos':>6} {'Dict (KB)':>10} {'CSR (KB)':>9} {'Dict (ms)':>10} "
+          f"{'CSR (ms)':>9} {'Speedup':>8} {'Iguais':>7}")
+    for instance_filepath in instance_filepaths:
+        all_graph_nodes, graph_adj, traversal_costs = carregar_grafo(instance_filepath)
+
+        tracemalloc.start()
+        adj_copia = {u: list(vizinhos) for u, vizinhos in graph_adj.items()}
+        custos_copia = {(u, v): custo for (u, v), custo in traversal_costs.items()} # Tuplas novas, como no grafo original
+        memoria_dict = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        tracemalloc.start()
+        grafo = GrafoCSR(all_graph_nodes, traversal_costs)
+        memoria_csr = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del adj_copia, custos_copia
+
+        linhas_dict, tempo_dict = medir(lambda: [dijkstra_optimized(u, graph_adj, traversal_costs, all_graph_nodes)
+                                                 for u in all_graph_nodes])
+        linhas_csr, tempo_csr = medir(lambda: [dijkstra_csr(grafo, i) for i in range(len(all_graph_nodes))])
+        iguais = all(linha_dict[v] == (float('inf') if dist == DISTANCIA_INALCANCAVEL else dist)
+                     for linha_dict, linha_csr in zip(linhas_dict, linhas_csr)
+                     for v, dist in zip(all_graph_nodes, linha_csr))
+        print(f"{os.path.basename(instance_filepath):<28} {len(all_graph_nodes):>6} {len(traversal_costs):>6} "
+              f"{memoria_dict / 1024:>10.1f} {memoria_csr / 1024:>9.1f} {tempo_dict:>10.1f} {tempo_csr:>9.1f} "
+              f"{tempo_dict / tempo_csr:>7.2f}x {'sim' if iguais else 'NÃO':>7}")
+
+def benchmark_fila_dial(instance_filepaths):
+    """
+    Compara, no APSP completo (sequencial), o Dijkstra com heap (`dijkstra_csr`) e com a fila de
+    buckets de Dial (`dijkstra_dial`), instância por instância, conferindo que as matrizes são iguais.
+
+    Args:
+        instance_filepaths (list): Caminhos das instâncias a medir (padrão: todas as da pasta).
+    """
+    print(f"{'Instância':<28} {'Nós':>6} {'Custo máx':>10} {'Heap (ms)':>10} {'Dial (ms)':>10} {'Speedup':>8} {'Iguais':>7}")
+    total_heap = total_dial = 0.0
+    divergencias = 0
+    for instance_filepath in instance_filepaths:
+        all_graph_nodes, graph_adj, traversal_costs = carregar_grafo(instance_filepath)
+        grafo = GrafoCSR(all_graph_nodes, traversal_costs)
+        matriz_heap, tempo_heap = medir(calcular_apsp, all_graph_nodes, graph_adj, traversal_costs, 'sequencial',
+                                        grafo=grafo, fila='heap')
+        matriz_dial, tempo_dial = medir(calcular_apsp, all_graph_nodes, graph_adj, traversal_costs, 'sequencial',
+                                        grafo=grafo, fila='dial')
+        iguais = matriz_heap.dados == matriz_dial.dados
+        divergencias += not iguais
+        total_heap += tempo_heap
+        total_dial += tempo_dial
+        print(f"{os.path.basename(instance_filepath):<28} {len(all_graph_nodes):>6} {max(grafo.pesos, default=0):>10} "
+              f"{tempo_heap:>10.1f} {tempo_dial:>10.1f} {tempo_heap / tempo_dial:>7.2f}x {'sim' if iguais else 'NÃO':>7}")
+    print(f"{'Total':<28} {'':>6} {'':>10} {total_heap:>10.1f} {total_dial:>10.1f} {total_heap / total_dial:>7.2f}x "
+          f"{'sim' if not divergencias else f'{divergencias} NÃO':>7}")
+
+def benchmark_predecessores(instance_filepaths):
+    """
+    Mede o custo de guardar os predecessores no APSP restrito (`com_predecessores=True`): memória
+    das distâncias e dos predecessores, tempo do APSP com e sem eles e tempo de reconstruir todos
+    os caminhos origem-destino da matriz, conferindo que o custo de cada caminho é a distância.
+
+    Args:
+        instance_filepaths (list): Caminhos das instâncias a medir.
+    """
+    print(f"{'Instância':<28} {'Nós':>6} {'Dist (MB)':>10} {'Pred (MB)':>10} {'Sem (ms)':>9} {'Com (ms)':>9} "
+          f"{'Caminhos':>9} {'Reconstr. (ms)':>15} {'Corretos':>9}")
+    for instance_filepath in instance_filepaths:
+        dados_gerais, required_nodes, required_edges, _, required_arcs, _ = carregar_dados_arquivo(instance_filepath)
+        depot_node = int(dados_gerais['Depot Node'])
+        servicos = [{'from': int(rn['node'].lstrip('N')), 'to': int(rn['node'].lstrip('N'))} for rn in required_nodes]
+        servicos += [{'from': item['from'], 'to': item['to']} for item in required_edges + required_arcs]
+        origens, destinos = extremos_servicos(servicos, depot_node)
+
+        all_graph_nodes, graph_adj, traversal_costs = carregar_grafo(instance_filepath)
+        grafo = GrafoCSR(all_graph_nodes, traversal_costs)
+        _, tempo_sem = medir(calcular_apsp, all_graph_nodes, graph_adj, traversal_costs, 'sequencial',
+                             origens=origens, destinos=destinos, grafo=grafo)
+        matriz, tempo_com = medir(calcular_apsp, all_graph_nodes, graph_adj, traversal_costs, 'sequencial',
+                                  origens=origens, destinos=destinos, grafo=grafo, com_predecessores=True)
+
+        t0 = time.perf_counter()
+        caminhos = [(u, v, matriz.caminho(u, v)) for u in origens for v in destinos]
+        tempo_reconstrucao = (time.perf_counter() - t0) * 1000
+
+        # Cada caminho deve custar exatamente a distância da matriz (e existir sempre que ela é finita)
+        corretos = all(
+            (caminho is None and matriz.distancia(u, v) == float('inf')) or
+            (caminho is not None and sum(traversal_costs[a, b] for a, b in zip(caminho, caminho[1:])) == matriz.distancia(u, v))
+            for u, v, caminho in caminhos)
+        print(f"{os.path.basename(instance_filepath):<28} {len(all_graph_nodes):>6} {matriz.tamanho_em_bytes() / 2**20:>10.2f} "
+              f"{matriz.predecessores.tamanho_em_bytes() / 2**20:>10.2f} {tempo_sem:>9.1f} {tempo_com:>9.1f} "
+              f"{len(caminhos):>9} {tempo_reconstrucao:>15.1f} {'sim' if corretos else 'NÃO':>9}")
+
+def benchmark_apsp_dinamico(instance_filepaths, num_alteracoes=40, semente=0):
+    """
+    Mede a latência das atualizações incrementais do APSP (`APSPDinamico`) contra a reconstrução
+    completa (grafo CSR + APSP restrito), com uma sequência aleatória de alterações na rede:
+    aumentos e reduções de custo, remoções e inserções de arestas e inserções de arcos.
+    Após cada alteração, a matriz reparada é comparada com a recalculada do zero.
+
+    Args:
+        instance_filepaths (list): Caminhos das instâncias a medir.
+        num_alteracoes (int): Número de alterações aplicadas em cada instância.
+        semente (int): Semente do gerador das alterações (resultados reproduzíveis).
+    """
+    print(f"{'Instância':<28} {'Alteração':<10} {'Qtd':>4} {'Linhas reparadas':>17} {'Incremental (ms)':>17} "
+          f"{'Completo (ms)':>14} {'Speedup':>8} {'Iguais':>7}")
+    for instance_filepath in instance_filepaths:
+        gerador = random.Random(semente)
+        with contextlib.redirect_stdout(io.StringIO()):
+            instancia = preparar_instancia(instance_filepath, apsp_backend='sequencial')
+        dinamico = APSPDinamico(instancia)
+        origens, destinos = dinamico.matriz.nos, dinamico.matriz.nos_destino
+        # Arestas da rede (pares com os dois sentidos), que podem ter o custo alterado ou ser removidas
+        arestas = sorted((u, v) for (u, v) in instancia.traversal_costs if u < v and (v, u) in instancia.traversal_costs)
+
+        estatisticas = {} # tipo de alteração -> [quantidade, linhas reparadas, tempo incremental, tempo completo]
+        divergencias = 0
+        for _ in range(num_alteracoes):
+            tipo_alteracao = gerador.choice(['aumento', 'redução', 'remoção', 'inserção', 'arco novo'])
+            if tipo_alteracao in ('aumento', 'redução', 'remoção'):
+                u, v = arestas.pop(gerador.randrange(len(arestas))) if tipo_alteracao == 'remoção' else gerador.choice(arestas)
+                custo = instancia.traversal_costs[(u, v)]
+                novo_custo = {'aumento': custo * 3 + 10, 'redução': custo // 3, 'remoção': None}[tipo_alteracao]
+                alteracao = ('aresta', u, v, novo_custo)
+            else:
+                u, v = gerador.sample(instancia.all_graph_nodes, 2)
+                alteracao = ('aresta' if tipo_alteracao == 'inserção' else 'arco', u, v, gerador.randint(1, 50))
+
+            t0 = time.perf_counter()
+            linhas = dinamico.aplicar_alteracoes([alteracao])
+            tempo_incremental = (time.perf_counter() - t0) * 1000
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                recalculada, tempo_completo = medir(
+                    lambda: calcular_apsp(instancia.all_graph_nodes, instancia.graph_adj, instancia.traversal_costs,
+                                          'sequencial', origens=origens, destinos=destinos, simetrica=False,
+                                          grafo=GrafoCSR(instancia.all_graph_nodes, instancia.traversal_costs)))
+            divergencias += recalculada.dados != instancia.short_paths_matrix.dados
+
+            registro = estatisticas.setdefault(tipo_alteracao, [0, 0, 0.0, 0.0])
+            registro[0] += 1
+            registro[1] += linhas
+            registro[2] += tempo_incremental
+            registro[3] += tempo_completo
+
+        nome = os.path.basename(instance_filepath)
+        for tipo_alteracao, (quantidade, linhas, tempo_incremental, tempo_completo) in estatisticas.items():
+            print(f"{nome:<28} {tipo_alteracao:<10} {quantidade:>4} {linhas / quantidade:>17.1f} "
+                  f"{tempo_incremental / quantidade:>17.2f} {tempo_completo / quantidade:>14.1f} "
+                  f"{tempo_completo / max(tempo_incremental, 1e-9):>7.1f}x {'-':>7}")
+        total = [sum(registro[k] for registro in estatisticas.values()) for k in range(4)]
+        print(f"{nome:<28} {'total':<10} {total[0]:>4} {total[1] / total[0]:>17.1f} {total[2] / total[0]:>17.2f} "
+              f"{total[3] / total[0]:>14.1f} {total[3] / max(total[2], 1e-9):>7.1f}x "
+              f"{'sim' if not divergencias else f'{divergencias} NÃO':>7}")
+
+def benchmark_apsp_simetrico(instance_filepaths, num_consultas=200_000):
+    """
+    Compara, em grafos não direcionados, a matriz retangular com a triangular (`MatrizDistanciasSimetrica`),
+    no APSP restrito aos extremos dos serviços e no APSP completo: tempo de cálculo (sequencial),
+    memória, custo de uma consulta `distancia(u, v)` e igualdade de todas as consultas do solver.
+    Instâncias com arcos sem o reverso de mesmo custo são apenas listadas.
+
+    Args:
+        instance_filepaths (list): Caminhos das instâncias a medir.
+        num_consultas (int): Número de consultas aleatórias usadas para medir o custo de acesso.
+    """
+    print(f"{'Instância':<28} {'Modo':<9} {'Linhas':>13} {'Ret. (ms)':>10} {'Tri. (ms)':>10} {'Ret. (MB)':>10} "
+          f"{'Tri. (MB)':>10} {'Consulta ret/tri (ns)':>22} {'Iguais':>7}")
+    gerador = random.Random(0)
+    for instance_filepath in instance_filepaths:
+        nome = os.path.basename(instance_filepath)
+        all_graph_nodes, graph_adj, traversal_costs = carregar_grafo(instance_filepath)
+        if not grafo_simetrico(traversal_costs):
+            print(f"{nome:<28} grafo com arcos assimétricos: usa a matriz retangular")
+            continue
+        dados_gerais, required_nodes, required_edges, _, required_arcs, _ = carregar_dados_arquivo(instance_filepath)
+        servicos = [{'from': int(rn['node'].lstrip('N')), 'to': int(rn['node'].lstrip('N'))} for rn in required_nodes]
+        servicos += [{'from': item['from'], 'to': item['to']} for item in required_edges + required_arcs]
+        grafo = GrafoCSR(all_graph_nodes, traversal_costs)
+
+        restrito = extremos_servicos(servicos, int(dados_gerais['Depot Node']))
+        for modo, (origens, destinos) in (('restrito', restrito), ('completo', (all_graph_nodes, all_graph_nodes))):
+            retangular, tempo_ret = medir(calcular_apsp, all_graph_nodes, graph_adj, traversal_costs, 'sequencial',
+                                          origens=origens, destinos=destinos, grafo=grafo, simetrica=False)
+            triangular, tempo_tri = medir(calcular_apsp, all_graph_nodes, graph_adj, traversal_costs, 'sequencial',
+                                          origens=origens, destinos=destinos, grafo=grafo, simetrica=True)
+            iguais = all(retangular.distancia(u, v) == triangular.distancia(u, v) for u in origens for v in destinos)
+
+            # Custo de acesso: as mesmas consultas aleatórias (origem, destino) nas duas matrizes
+            consultas = [(gerador.choice(origens), gerador.choice(destinos)) for _ in range(num_consultas)]
+            tempos_consulta = []
+            for matriz in (retangular, triangular):
+                distancia = matriz.distancia
+                t0 = time.perf_counter()
+                for u, v in consultas:
+                    distancia(u, v)
+                tempos_consulta.append((time.perf_counter() - t0) * 1e9 / num_consultas)
+
+            linhas = f"{len(origens)}->{min(len(origens), len(destinos))}"
+            print(f"{nome:<28} {modo:<9} {linhas:>13} {tempo_ret:>10.1f} {tempo_tri:>10.1f} "
+                  f"{retangular.tamanho_em_bytes() / 2**20:>10.2f} {triangular.tamanho_em_bytes() / 2**20:>10.2f} "
+                  f"{tempos_consulta[0]:>10.0f} / {tempos_consulta[1]:<9.0f} {'sim' if iguais else 'NÃO':>7}")
+
+def benchmark_reducao_grafo(instance_filepaths, repeticoes=7):
+    """
+    Mede a redução do grafo antes do APSP restrito (`reduzir_grafo`): nós e arcos antes e depois,
+    tempo da redução, tempo do APSP (sequencial, melhor de `repeticoes` execuções alternadas) no
+    grafo original e no reduzido, igualdade de todas as distâncias entre os extremos dos serviços e, com predecessores,
+    se cada caminho expandido para o grafo original custa exatamente a distância.
+
+    Args:
+        instance_filepaths (list): Caminhos das instâncias a medir.
+        repeticoes (int): Número de execuções de cada APSP (vale o menor tempo).
+    """
+    print(f"{'Instância':<28} {'Nós':>11} {'Arcos':>11} {'Redução (ms)':>13} {'APSP orig. (ms)':>16} "
+          f"{'APSP red. (ms)':>15} {'Ganho':>7} {'Iguais':>7} {'Caminhos':>9}")
+    for instance_filepath in instance_filepaths:
+        dados_gerais, required_nodes, required_edges, _, required_arcs, _ = carregar_dados_arquivo(instance_filepath)
+        servicos = [{'from': int(rn['node'].lstrip('N')), 'to': int(rn['node'].lstrip('N'))} for rn in required_nodes]
+        servicos += [{'from': item['from'], 'to': item['to']} for item in required_edges + required_arcs]
+        origens, destinos = extremos_servicos(servicos, int(dados_gerais['Depot Node']))
+        all_graph_nodes, graph_adj, traversal_costs = carregar_grafo(instance_filepath)
+
+        reducao, tempo_reducao = medir(reduzir_grafo, all_graph_nodes, traversal_costs, set(origens) | set(destinos))
+        # As execuções nos dois grafos se alternam, para que oscilações da máquina afetem ambos
+        variantes = [(nos, custos, GrafoCSR(nos, custos))
+                     for nos, custos in ((all_graph_nodes, traversal_costs), (reducao.nos, reducao.traversal_costs))]
+        tempos = [float('inf')] * len(variantes)
+        matrizes = [None] * len(variantes)
+        for _ in range(repeticoes):
+            for k, (nos, custos, grafo) in enumerate(variantes):
+                matrizes[k], tempo = medir(calcular_apsp, nos, graph_adj, custos, 'sequencial',
+                                           origens=origens, destinos=destinos, grafo=grafo)
+                tempos[k] = min(tempos[k], tempo)
+        iguais = all(matrizes[0].distancia(u, v) == matrizes[1].distancia(u, v) for u in origens for v in destinos)
+
+        # Caminhos do grafo reduzido, expandidos para as ruas originais, devem custar a distância
+        matriz, _ = medir(calcular_apsp, reducao.nos, graph_adj, reducao.traversal_costs, 'sequencial',
+                          origens=origens, destinos=destinos, com_predecessores=True)
+        matriz.predecessores.reducao = reducao
+        caminhos_corretos = all(
+            caminho is None or
+            sum(traversal_costs[a, b] for a, b in zip(caminho, caminho[1:])) == matriz.distancia(u, v)
+            for u in origens for v in destinos for caminho in (matriz.caminho(u, v),))
+
+        nos_txt = f"{len(all_graph_nodes)}->{len(reducao.nos)}"
+        arcos_txt = f"{len(traversal_costs)}->{len(reducao.traversal_costs)}"
+        print(f"{os.path.basename(instance_filepath):<28} {nos_txt:>11} {arcos_txt:>11} {tempo_reducao:>13.1f} "
+              f"{tempos[0]:>16.1f} {tempos[1]:>15.1f} {1 - tempos[1] / tempos[0]:>7.1%} "
+              f"{'sim' if iguais else 'NÃO':>7} {'sim' if caminhos_corretos else 'NÃO':>9}")
+
+def benchmark_componentes(instance_filepaths, repeticoes=5):
+    """
+    Mede a análise de componentes fortemente conexas feita na preparação para identificar os serviços
+    inviáveis (`identificar_servicos_inviaveis`): tempo (melhor de `repeticoes`), número de componentes,
+    tamanho da componente do depósito e serviços fora dela, comparando o tempo com o do APSP restrito.
+
+    Args:
+        instance_filepaths (list): Caminhos das instâncias a medir.
+        repeticoes (int): Número de execuções da análise (vale o menor tempo).
+    """
+    print(f"{'Instância':<28} {'Nós':>6} {'Componentes':>12} {'Comp. depósito':>15} {'Inviáveis':>10} "
+          f"{'SCC (ms)':>9} {'APSP (ms)':>10}")
+    for instance_filepath in instance_filepaths:
+        dados_gerais, required_nodes, required_edges, _, required_arcs, _ = carregar_dados_arquivo(instance_filepath)
+        depot_node = int(dados_gerais['Depot Node'])
+        servicos = [{'from': int(rn['node'].lstrip('N')), 'to': int(rn['node'].lstrip('N'))} for rn in required_nodes]
+        servicos += [{'from': item['from'], 'to': item['to']} for item in required_edges + required_arcs]
+        all_graph_nodes, graph_adj, traversal_costs = carregar_grafo(instance_filepath)
+
+        tempo_scc = float('inf')
+        for _ in range(repeticoes):
+            componente, tempo = medir(componentes_fortemente_conexas, all_graph_nodes, graph_adj)
+            tempo_scc = min(tempo_scc, tempo)
+        componente_deposito = componente.get(depot_node)
+        inviaveis = sum(1 for servico in servicos if componente.get(servico['from']) != componente_deposito
+                        or componente.get(servico['to']) != componente_deposito)
+
+        origens, destinos = extremos_servicos(servicos, depot_node)
+        _, tempo_apsp = medir(calcular_apsp, all_graph_nodes, graph_adj, traversal_costs, 'sequencial',
+                              origens=origens, destinos=destinos)
+        print(f"{os.path.basename(instance_filepath):<28} {len(all_graph_nodes):>6} {len(set(componente.values())):>12} "
+              f"{sum(1 for c in componente.values() if c == componente_deposito):>15} {inviaveis:>10} "
+              f"{tempo_scc:>9.2f} {tempo_apsp:>10.1f}")
+
+def benchmark_matriz_servicos(instance_filepaths, max_movimentos=200_000):
+    """
+    Mede a vazão de avaliação de movimentos (movimentos/s) dos operadores da Etapa 3 sobre as rotas da
+    solução inicial, antes (matriz APSP + `id_to_service_obj`) e depois (`MatrizServicos`, indexada
+    pelo ID): Relocate intra (custo e demanda da rota candidata inteira) e 2-opt (as quatro arestas
+    das fronteiras do segmento invertido). Mostra também o tempo de construção e a memória da matriz
+    de serviços e confere que as duas formas dão os mesmos custos.
+
+    Args:
+        instance_filepaths (list): Caminhos das instâncias a medir.
+        max_movimentos (int): Limite de movimentos avaliados por operador em cada instância.
+    """
+    print(f"{'Instância':<28} {'Serv.':>6} {'Constr. (ms)':>13} {'Matriz (MB)':>12} {'Operador':<10} "
+          f"{'Movimentos':>11} {'Antes (mov/s)':>14} {'Depois (mov/s)':>15} {'Ganho':>7} {'Iguais':>7}")
+    for instance_filepath in instance_filepaths:
+        instancia, _ = medir(preparar_instancia, instance_filepath)
+        sp_matrix, depot_node, id_map = instancia.short_paths_matrix, instancia.depot_node, instancia.id_to_service_obj
+        capacidade = instancia.capacidade_veiculo
+        matriz_servicos, tempo_construcao = medir(MatrizServicos, instancia.servicos, depot_node, sp_matrix)
+        _, _, rotas = generate_initial_solution_internal(
+            instancia.dados_gerais, instancia.required_nodes, instancia.required_edges, instancia.non_required_edges,
+            instancia.required_arcs, instancia.non_required_arcs, sp_matrix, id_map, instancia.servicos_inviaveis)
+        segmentos = [[v for v in rota['visits'] if v[0] == 'S'] for rota in rotas]
+
+        # Relocate intra: todas as rotas candidatas (serviço i reinserido na posição j), até o limite
+        candidatas = []
+        for segmento in segmentos:
+            for i in range(len(segmento)):
+                sem_servico = segmento[:i] + segmento[i + 1:]
+                candidatas.extend(sem_servico[:j] + [segmento[i]] + sem_servico[j:]
+                                  for j in range(len(sem_servico) + 1) if j != i)
+                if len(candidatas) >= max_movimentos:
+                    break
+            if len(candidatas) >= max_movimentos:
+                break
+        candidatas = candidatas[:max_movimentos]
+
+        def relocate_antes():
+            return [(calculate_route_demand(c, id_map, capacidade)[1],
+                     calculate_route_cost_from_segments(c, sp_matrix, depot_node, id_map)) for c in candidatas]
+
+        def relocate_depois():
+            return [(matriz_servicos.demanda_visitas(c) <= capacidade, matriz_servicos.custo_visitas(c)) for c in candidatas]
+
+        # 2-opt: pares (i, j) de cada rota, com os IDs (0 = depósito) antes e depois do segmento
+        pares = [(segmento[i - 1][1] if i > 0 else 0, segmento[i][1], segmento[j][1],
+                  segmento[j + 1][1] if j < len(segmento) - 1 else 0)
+                 for segmento in segmentos for i in range(len(segmento)) for j in range(i + 1, len(segmento))]
+        pares = pares[:max_movimentos]
+
+        def dois_opt_antes():
+            distancia = sp_matrix.distancia
+            resultado = []
+            for anterior, inicio, fim, seguinte in pares:
+                anterior_to = id_map[anterior]['to'] if anterior else depot_node
+                seguinte_from = id_map[seguinte]['from'] if seguinte else depot_node
+                resultado.append(distancia(anterior_to, id_map[fim]['from']) + distancia(id_map[inicio]['to'], seguinte_from)
+                                 - distancia(anterior_to, id_map[inicio]['from']) - distancia(id_map[fim]['to'], seguinte_from))
+            return resultado
+
+        def dois_opt_depois():
+            custos, n, custo_servico = matriz_servicos.custos, matriz_servicos.n, matriz_servicos.custo_servico
+            return [custos[anterior * n + fim] - custo_servico[fim] + custos[inicio * n + seguinte]
+                    - custos[anterior * n + inicio] - custos[fim * n + seguinte] + custo_servico[inicio]
+                    for anterior, inicio, fim, seguinte in pares]
+
+        nome = os.path.basename(instance_filepath)
+        for operador, antes, depois, movimentos in (('relocate', relocate_antes, relocate_depois, len(candidatas)),
+                                                   ('2-opt', dois_opt_antes, dois_opt_depois, len(pares))):
+            resultado_antes, tempo_antes = medir(antes)
+            resultado_depois, tempo_depois = medir(depois)
+            print(f"{nome:<28} {len(instancia.servicos):>6} {tempo_construcao:>13.1f} "
+                  f"{matriz_servicos.tamanho_em_bytes() / 2**20:>12.2f} {operador:<10} {movimentos:>11} "
+                  f"{movimentos / tempo_antes * 1000:>14,.0f} {movimentos / tempo_depois * 1000:>15,.0f} "
+                  f"{tempo_antes / tempo_depois:>6.1f}x {'sim' if resultado_antes == resultado_depois else 'NÃO':>7}")
+
+def benchmark_construtivo(instance_filepaths, repeticoes=3):
+    """
+    Compara os modos do construtivo da solução inicial (`generate_initial_solution_internal`) em cada
+    instância: tempo de construção (melhor de `repeticoes`) de cada modo, ganho de cada um sobre o
+    modo escalar e igualdade das rotas geradas.
+
+    Args:
+        instance_filepaths (list): Caminhos das instâncias a medir.
+        repeticoes (int): Número de execuções de cada modo (vale o menor tempo).
+    """
+    print(f"{'Instância':<28} {'Serv.':>6} {'Rotas':>6} " + ' '.join(f"{modo + ' (ms)':>15}" for modo in MODOS_VIZINHO_MAIS_PROXIMO)
+          + ' '.join(f"{'x ' + modo:>12}" for modo in MODOS_VIZINHO_MAIS_PROXIMO[1:]) + f" {'Iguais':>7}")
+    for instance_filepath in instance_filepaths:
+        instancia, _ = medir(preparar_instancia, instance_filepath)
+        tempos, resultados = [], []
+        for modo in MODOS_VIZINHO_MAIS_PROXIMO:
+            melhor = float('inf')
+            for _ in range(repeticoes):
+                resultado, tempo = medir(
+                    generate_initial_solution_internal, instancia.dados_gerais, instancia.required_nodes,
+                    instancia.required_edges, instancia.non_required_edges, instancia.required_arcs,
+                    instancia.non_required_arcs, instancia.short_paths_matrix, instancia.id_to_service_obj,
+                    instancia.servicos_inviaveis, instancia.matriz_servicos, modo)
+                melhor = min(melhor, tempo)
+            tempos.append(melhor)
+            resultados.append(resultado)
+        iguais = all(resultado == resultados[0] for resultado in resultados)
+        print(f"{os.path.basename(instance_filepath):<28} {len(instancia.servicos):>6} {resultados[0][1]:>6} "
+              + ' '.join(f"{tempo:>15.1f}" for tempo in tempos)
+              + ' '.join(f"{tempos[0] / tempo:>11.1f}x" for tempo in tempos[1:]) + f" {'sim' if iguais else 'NÃO':>7}")
+
+def benchmark_portfolio(instance_filepaths, num_workers=None):
+    """
+    Compara o início único (regra atual, `rotas_vizinho_mais_proximo`) com o portfólio de construtivos
+    (`executar_portfolio`): tempo de relógio do portfólio em sequência e em processos, sobrecarga em
+    relação ao início único, custo de partida de cada um e variante vencedora.
+
+    Args:
+        instance_filepaths (list): Caminhos das instâncias a medir.
+        num_workers (int, optional): Número de processos do portfólio. Se None, usa o número de CPUs.
+    """
+    if num_workers is None:
+        num_workers = os.cpu_count() if os.cpu_count() else 1
+    print(f"{'Instância':<28} {'Serv.':>6} {'Único (ms)':>11} {'Seq. (ms)':>10} {f'{num_workers} proc. (ms)':>14} "
+          f"{'Sobrecarga':>11} {'Custo único':>12} {'Melhor custo':>13} {'Ganho':>7}  Variante")
+    for instance_filepath in instance_filepaths:
+        instancia, _ = medir(preparar_instancia, instance_filepath)
+        matriz_servicos, capacidade = instancia.matriz_servicos, instancia.capacidade_veiculo
+        rotas, tempo_unico = medir(rotas_vizinho_mais_proximo, matriz_servicos, capacidade, instancia.servicos_inviaveis)
+        custo_unico = custo_rotas(rotas, matriz_servicos)
+        (_, tempo_sequencial), _ = medir(executar_portfolio, matriz_servicos, capacidade, instancia.servicos_inviaveis, 1)
+        (resultados, tempo_processos), _ = medir(executar_portfolio, matriz_servicos, capacidade,
+                                                 instancia.servicos_inviaveis, num_workers)
+        nome, custo, _, _ = min(resultados, key=lambda resultado: resultado[1])
+        print(f"{os.path.basename(instance_filepath):<28} {len(instancia.servicos):>6} {tempo_unico:>11.1f} "
+              f"{tempo_sequencial:>10.1f} {tempo_processos:>14.1f} {tempo_processos - tempo_unico:>+11.1f} "
+              f"{custo_unico:>12} {custo:>13} {(custo_unico - custo) / custo_unico:>7.1%}  {nome}")
+
+def benchmark_split(instance_filepaths, repeticoes=3):
+    """
+    Compara o construtivo guloso atual (`rotas_vizinho_mais_proximo`) com o tour gigante + Split linear
+    (`tour_gigante` e `split_linear`): tempo (melhor de `repeticoes`, com o tempo do Split à parte),
+    número de rotas e custo da solução inicial.
+
+    Args:
+        instance_filepaths (list): Caminhos das instâncias a medir.
+        repeticoes (int): Número de execuções de cada construtivo (vale o menor tempo).
+    """
+    print(f"{'Instância':<28} {'Serv.':>6} {'Guloso (ms)':>12} {'Tour (ms)':>10} {'Split (ms)':>11} {'Rotas':>11} "
+          f"{'Custo guloso':>13} {'Custo Split':>12} {'Ganho':>7}")
+    for instance_filepath in instance_filepaths:
+        instancia, _ = medir(preparar_instancia, instance_filepath)
+        matriz_servicos, capacidade = instancia.matriz_servicos, instancia.capacidade_veiculo
+        tempo_guloso = tempo_tour = tempo_split = float('inf')
+        for _ in range(repeticoes):
+            rotas_gulosas, tempo = medir(rotas_vizinho_mais_proximo, matriz_servicos, capacidade, instancia.servicos_inviaveis)
+            tempo_guloso = min(tempo_guloso, tempo)
+            tour, tempo = medir(tour_gigante, matriz_servicos, instancia.servicos_inviaveis)
+            tempo_tour = min(tempo_tour, tempo)
+            (custo_split, rotas_split), tempo = medir(split_linear, tour, matriz_servicos, capacidade)
+            tempo_split = min(tempo_split, tempo)
+        custo_guloso = custo_rotas(rotas_gulosas, matriz_servicos)
+        print(f"{os.path.basename(instance_filepath):<28} {len(instancia.servicos):>6} {tempo_guloso:>12.1f} "
+              f"{tempo_tour:>10.1f} {tempo_split:>11.2f} {f'{len(rotas_gulosas)} -> {len(rotas_split)}':>11} "
+              f"{custo_guloso:>13} {custo_split:>12} {(custo_guloso - custo_split) / custo_guloso:>7.1%}")
+
+def benchmark_savings(instance_filepaths, repeticoes=3):
+    """
+    Compara o construtivo guloso atual (`rotas_vizinho_mais_proximo`) com as economias de Clarke-Wright
+    (`rotas_savings`) em cada família de instâncias: soma dos tempos de construção (melhor de
+    `repeticoes` por instância), ganho médio, mínimo e máximo de custo inicial e número de instâncias
+    em que as economias partem de uma solução mais barata.
+
+    Args:
+        instance_filepaths (list): Caminhos das instâncias a medir (por padrão, todas).
+        repeticoes (int): Número de execuções de cada construtivo (vale o menor tempo).
+    """
+    por_familia = {} # Família -> [tempos gulosos, tempos savings, ganhos de custo]
+    for instance_filepath in instance_filepaths:
+        instancia, _ = medir(preparar_instancia, instance_filepath)
+        matriz_servicos, capacidade = instancia.matriz_servicos, instancia.capacidade_veiculo
+        tempo_guloso = tempo_savings = float('inf')
+        for _ in range(repeticoes):
+            rotas_gulosas, tempo = medir(rotas_vizinho_mais_proximo, matriz_servicos, capacidade, instancia.servicos_inviaveis)
+            tempo_guloso = min(tempo_guloso, tempo)
+            rotas_economias, tempo = medir(rotas_savings, matriz_servicos, capacidade, instancia.servicos_inviaveis)
+            tempo_savings = min(tempo_savings, tempo)
+        custo_guloso = custo_rotas(rotas_gulosas, matriz_servicos)
+        custo_savings = custo_rotas(rotas_economias, matriz_servicos)
+        dados = por_familia.setdefault(familia_instancia(instancia.nome), [[], [], []])
+        dados[0].append(tempo_guloso)
+        dados[1].append(tempo_savings)
+        dados[2].append((custo_guloso - custo_savings) / custo_guloso if custo_guloso else 0.0)
+
+    print(f"{'Família':<10} {'Inst.':>6} {'Guloso (ms)':>12} {'Savings (ms)':>13} {'Razão':>7} "
+          f"{'Ganho médio':>12} {'Mín.':>7} {'Máx.':>7} {'Melhores':>9}")
+    for familia in sorted(por_familia):
+        tempos_gulosos, tempos_savings, ganhos = por_familia[familia]
+        print(f"{familia:<10} {len(ganhos):>6} {sum(tempos_gulosos):>12.1f} {sum(tempos_savings):>13.1f} "
+              f"{sum(tempos_savings) / sum(tempos_gulosos):>6.1f}x {sum(ganhos) / len(ganhos):>12.1%} "
+              f"{min(ganhos):>7.1%} {max(ganhos):>7.1%} {sum(ganho > 0 for ganho in ganhos):>9}")
+
+def relocate_intra_por_listas(route_services_segment, matriz_servicos, capacity, max_inner_iterations=50):
+    """
+    Versão anterior de `perform_relocate_intra`, mantida como referência para o benchmark: monta a rota
+    candidata inteira para cada par (i, j) e recalcula a sua demanda e o seu custo.
+
+    Returns:
+        tuple: (best_segments (list), best_cost (float), movimentos avaliados (int), movimentos avaliados
+               até o fim da primeira passagem sem melhoria (int), após a qual as passagens seguintes
+               repetem a mesma busca e a versão nova para).
+    """
+    if len(route_services_segment) < 2:
+        return route_services_segment, matriz_servicos.custo_visitas(route_services_segment), 0, 0
+    best_segments = list(route_services_segment)
+    best_cost = matriz_servicos.custo_visitas(best_segments)
+    avaliados = 0
+    avaliados_ate_otimo = None
+    for _ in range(max_inner_iterations):
+        improved = False
+        for i in range(len(best_segments)):
+            service_to_move = best_segments[i]
+            temp_route_without_service = best_segments[:i] + best_segments[i+1:]
+            for j in range(len(temp_route_without_service) + 1):
+                if i == j: continue
+                new_segments_candidate = temp_route_without_service[:j] + [service_to_move] + temp_route_without_service[j:]
+                avaliados += 1
+                if matriz_servicos.demanda_visitas(new_segments_candidate) > capacity:
+                    continue
+                new_cost = matriz_servicos.custo_visitas(new_segments_candidate)
+                if new_cost < best_cost:
+                    best_segments = new_segments_candidate
+                    best_cost = new_cost
+                    improved = True
+                    break
+            if improved:
+                continue
+            else:
+                break
+        if not improved and avaliados_ate_otimo is None:
+            avaliados_ate_otimo = avaliados
+    return best_segments, best_cost, avaliados, avaliados if avaliados_ate_otimo is None else avaliados_ate_otimo
+
+def benchmark_relocate_intra(instance_filepaths, semente=0):
+    """
+    Compara o Relocate intra por deltas O(1) (`perform_relocate_intra`) com a versão anterior, que
+    montava e recalculava a rota candidata inteira (`relocate_intra_por_listas`), na rota mais longa da
+    solução inicial de cada instância: tal como construída e embaralhada (semente fixa), caso em que
+    há muito mais movimentos de melhoria. Mostra os movimentos avaliados por segundo, o tempo até o
+    ótimo local e se as duas versões chegam à mesma rota, com o custo informado pela versão nova (somado
+    pelos deltas) igual ao custo recalculado da rota. A versão anterior repete até o limite de iterações
+    as passagens sem melhoria, que a nova dispensa; por isso cada uma tem a sua contagem.
+
+    Args:
+        instance_filepaths (list): Caminhos das instâncias a medir.
+        semente (int): Semente do embaralhamento da rota.
+
+    Returns:
+        int: Número de rotas em que as duas versões diferem.
+    """
+    diferentes = 0
+    print(f"{'Instância':<28} {'Serv.':>6} {'Rota':<11} {'Mov. antes':>11} {'Mov. depois':>12} {'Antes (mov/s)':>14} {'Depois (mov/s)':>15} "
+          f"{'Antes (ms)':>11} {'Depois (ms)':>12} {'Ganho':>7} {'Custo':>15} {'Iguais':>7}")
+    for instance_filepath in instance_filepaths:
+        instancia, _ = medir(preparar_instancia, instance_filepath)
+        matriz_servicos, capacidade = instancia.matriz_servicos, instancia.capacidade_veiculo
+        _, _, rotas = generate_initial_solution_internal(
+            instancia.dados_gerais, instancia.required_nodes, instancia.required_edges, instancia.non_required_edges,
+            instancia.required_arcs, instancia.non_required_arcs, instancia.short_paths_matrix,
+            instancia.id_to_service_obj, instancia.servicos_inviaveis, matriz_servicos)
+        mais_longa = max(([v for v in rota['visits'] if v[0] == 'S'] for rota in rotas), key=len)
+        embaralhada = list(mais_longa)
+        random.Random(semente).shuffle(embaralhada)
+        for nome_rota, segmento in (('construída', mais_longa), ('embaralhada', embaralhada)):
+            (rota_antes, custo_antes, avaliados, avaliados_depois), tempo_antes = medir(
+                relocate_intra_por_listas, segmento, matriz_servicos, capacidade)
+            (rota_depois, custo_depois), tempo_depois = medir(perform_relocate_intra, Rota(0, [v[1] for v in segmento],
+                                                                                           matriz_servicos),
+                                                              matriz_servicos)
+            iguais = ([v[1] for v in rota_antes] == rota_depois and custo_antes == custo_depois
+                      and Rota(0, rota_depois, matriz_servicos).custo == custo_depois)
+            diferentes += not iguais
+            print(f"{os.path.basename(instance_filepath):<28} {len(segmento):>6} {nome_rota:<11} {avaliados:>11} "
+                  f"{avaliados_depois:>12} {avaliados / tempo_antes * 1000:>14,.0f} {avaliados_depois / tempo_depois * 1000:>15,.0f} "
+                  f"{tempo_antes:>11.1f} {tempo_depois:>12.1f} {tempo_antes / tempo_depois:>6.0f}x "
+                  f"{f'{matriz_servicos.custo_visitas(segmento)} -> {custo_depois}':>15} {'sim' if iguais else 'NÃO':>7}")
+    return diferentes
+
+def dois_opt_por_listas(route_services_segment, matriz_servicos, capacity, max_inner_iterations=50):
+    """
+    Versão anterior de `perform_2opt`, mantida como referência para o benchmark: avalia só as duas
+    arestas das fronteiras do segmento (ignorando os deslocamentos internos, que mudam com a inversão),
+    monta a rota candidata com fatias a cada melhoria e recomeça a busca depois dela.
+
+    Returns:
+        tuple: (best_segments (list), best_cost (float) como estimado pela versão, movimentos avaliados (int)).
+    """
+    if len(route_services_segment) < 2:
+        return route_services_segment, matriz_servicos.custo_visitas(route_services_segment), 0
+    best_segments = deepcopy(route_services_segment)
+    best_cost = matriz_servicos.custo_visitas(best_segments)
+    custos, n, custo_servico = matriz_servicos.custos, matriz_servicos.n, matriz_servicos.custo_servico
+    avaliados = 0
+    for _ in range(max_inner_iterations):
+        improved_in_iteration = False
+        for i in range(len(best_segments)):
+            for j in range(i + 1, len(best_segments)):
+                avaliados += 1
+                service_before_segment = best_segments[i-1][1] if i > 0 else 0
+                service_segment_start = best_segments[i][1]
+                service_segment_end = best_segments[j][1]
+                service_after_segment = best_segments[j+1][1] if j < len(best_segments) - 1 else 0
+                cost_old_1 = custos[service_before_segment * n + service_segment_start] - custo_servico[service_segment_start]
+                cost_old_2 = custos[service_segment_end * n + service_after_segment] - custo_servico[service_after_segment]
+                cost_new_1 = custos[service_before_segment * n + service_segment_end] - custo_servico[service_segment_end]
+                cost_new_2 = custos[service_segment_start * n + service_after_segment] - custo_servico[service_after_segment]
+                cost_change = (cost_new_1 + cost_new_2) - (cost_old_1 + cost_old_2)
+                if cost_change < 0:
+                    temp_segments = best_segments[:i] + best_segments[i:j+1][::-1] + best_segments[j+1:]
+                    if matriz_servicos.demanda_visitas(temp_segments) > capacity:
+                        continue
+                    best_segments = temp_segments
+                    best_cost += cost_change
+                    improved_in_iteration = True
+                    break
+            if improved_in_iteration:
+                continue
+            else:
+                break
+    return best_segments, best_cost, avaliados
+
+def benchmark_dois_opt(instance_filepaths, max_inner_iterations=50):
+    """
+    Compara o 2-opt com somas de prefixo e inversão no lugar (`perform_2opt`) com a versão anterior
+    (`dois_opt_por_listas`) sobre todas as rotas da solução inicial de cada instância: movimentos
+    avaliados por segundo, tempo total até o fim da busca e custo final real (`custo_visitas`) de cada
+    versão. A coluna "Estimado antes" mostra o custo que a versão anterior informava, que ignora a
+    mudança dos deslocamentos internos do segmento invertido e por isso difere do custo real; a coluna
+    "Iguais" indica se o custo informado pela versão nova (somado pelos deltas) é o custo real em todas
+    as rotas.
+
+    Args:
+        instance_filepaths (list): Caminhos das instâncias a medir.
+        max_inner_iterations (int): Limite de iterações/passagens das duas versões.
+
+    Returns:
+        int: Número de instâncias em que o custo informado pela versão nova difere do custo real.
+    """
+    diferentes = 0
+    print(f"{'Instância':<28} {'Serv.':>6} {'Mov. antes':>11} {'Mov. depois':>12} {'Antes (mov/s)':>14} "
+          f"{'Depois (mov/s)':>15} {'Antes (ms)':>11} {'Depois (ms)':>12} {'Inicial':>9} {'Estimado antes':>15} "
+          f"{'Real antes':>11} {'Depois':>9} {'Iguais':>7}")
+    for instance_filepath in instance_filepaths:
+        instancia, _ = medir(preparar_instancia, instance_filepath)
+        matriz_servicos, capacidade = instancia.matriz_servicos, instancia.capacidade_veiculo
+        _, _, rotas = generate_initial_solution_internal(
+            instancia.dados_gerais, instancia.required_nodes, instancia.required_edges, instancia.non_required_edges,
+            instancia.required_arcs, instancia.non_required_arcs, instancia.short_paths_matrix,
+            instancia.id_to_service_obj, instancia.servicos_inviaveis, matriz_servicos)
+        segmentos = [[v for v in rota['visits'] if v[0] == 'S'] for rota in rotas]
+
+        avaliados_antes = tempo_antes = tempo_depois = estimado_antes = real_antes = custo_depois = 0
+        iguais = True
+        for segmento in segmentos:
+            (rota, custo, avaliados), tempo = medir(dois_opt_por_listas, segmento, matriz_servicos, capacidade,
+                                                    max_inner_iterations)
+            avaliados_antes += avaliados
+            tempo_antes += tempo
+            estimado_antes += custo
+            real_antes += matriz_servicos.custo_visitas(rota)
+            (rota, custo), tempo = medir(perform_2opt, Rota(0, [v[1] for v in segmento], matriz_servicos),
+                                         matriz_servicos, max_inner_iterations)
+            tempo_depois += tempo
+            custo_depois += custo
+            iguais = iguais and Rota(0, rota, matriz_servicos).custo == custo
+        # Movimentos da versão nova: pares (i, j) de cada passagem (uma a mais que as passagens com melhoria)
+        avaliados_depois = 0
+        for segmento in segmentos:
+            pares = len(segmento) * (len(segmento) - 1) // 2
+            rota, passagens = [v[1] for v in segmento], 0
+            while passagens < max_inner_iterations:
+                passagens += 1
+                nova_rota, _ = perform_2opt(Rota(0, rota, matriz_servicos), matriz_servicos, 1)
+                if nova_rota == rota:
+                    break
+                rota = nova_rota
+            avaliados_depois += pares * passagens
+        custo_inicial = sum(matriz_servicos.custo_visitas(segmento) for segmento in segmentos)
+        print(f"{os.path.basename(instance_filepath):<28} {len(instancia.servicos):>6} {avaliados_antes:>11} "
+              f"{avaliados_depois:>12} {avaliados_antes / tempo_antes * 1000:>14,.0f} "
+              f"{avaliados_depois / tempo_depois * 1000:>15,.0f} {tempo_antes:>11.1f} {tempo_depois:>12.1f} "
+              f"{custo_inicial:>9} {estimado_antes:>15} {real_antes:>11} {custo_depois:>9} {'sim' if iguais else 'NÃO':>7}")
+        diferentes += not iguais
+    return diferentes
+
+def relocate_inter_por_listas(all_routes_data, matriz_servicos, depot_node, capacity):
+    """
+    Versão anterior de `perform_relocate_inter`, mantida como referência para o benchmark: tenta cada
+    serviço em cada posição de cada outra rota, recalcula os custos das duas rotas inteiras para cada
+    candidato e retorna na primeira melhoria (quem chama repete a busca desde o início).
+
+    Returns:
+        bool: True se alguma melhoria foi encontrada e aplicada, False caso contrário.
+    """
+    total_improved = False # Flag global para indicar se houve QUALQUER melhoria nesta função
+
+    # Loop principal para continuar buscando melhorias enquanto elas forem encontradas
+    while True:
+        improved_in_iteration = False # Flag para indicar se houve melhoria nesta iteração completa de todos os pares de rotas
+        
+        # Itera sobre todas as rotas como rota de origem (r1)
+        for r1_idx in range(len(all_routes_data)):
+            r1 = all_routes_data[r1_idx]
+            r1_services = [v for v in r1['visits'] if v[0] == 'S'] # Serviços da rota de origem
+            if not r1_services: continue # Rota de origem vazia, não há serviços para mover
+
+            # Itera sobre cada serviço na rota de origem (o serviço a ser movido)
+            for s_idx in range(len(r1_services)):
+                service_to_move = r1_services[s_idx]
+                
+                # Cria uma versão temporária da rota de origem sem o serviço
+                r1_temp_services = r1_services[:s_idx] + r1_services[s_idx+1:]
+                
+                # Calcula o custo e demanda da rota de origem APÓS a remoção
+                r1_cost_after_removal = matriz_servicos.custo_visitas(r1_temp_services)
+                r1_demand_after_removal = matriz_servicos.demanda_visitas(r1_temp_services)
+                
+                if r1_demand_after_removal > capacity: # Se a rota de origem ficar inviável (improvável para remoção), pula
+                    continue
+
+                # Itera sobre todas as outras rotas como rota de destino (r2)
+                for r2_idx in range(len(all_routes_data)):
+                    if r1_idx == r2_idx: continue # Não tenta mover para a mesma rota
+
+                    r2 = all_routes_data[r2_idx]
+                    r2_services = [v for v in r2['visits'] if v[0] == 'S'] # Serviços da rota de destino
+                    
+                    # Tenta inserir o serviço em todas as posições possíveis na rota de destino
+                    for insert_pos in range(len(r2_services) + 1):
+                        r2_temp_services = r2_services[:insert_pos] + [service_to_move] + r2_services[insert_pos:]
+                        
+                        # Verifica a viabilidade da rota de destino com o novo serviço
+                        r2_demand_after_insertion = matriz_servicos.demanda_visitas(r2_temp_services)
+                        
+                        if r2_demand_after_insertion > capacity: # Se a rota de destino ficar inviável, pula
+                            continue
+                        
+                        # Calcula o novo custo da rota de destino
+                        r2_cost_after_insertion = matriz_servicos.custo_visitas(r2_temp_services)
+
+                        # Calcula a mudança total de custo na solução (custo_novo_par - custo_antigo_par)
+                        old_total_cost_pair = r1['cost'] + r2['cost']
+                        new_total_cost_pair = r1_cost_after_removal + r2_cost_after_insertion
+                        
+                        if new_total_cost_pair < old_total_cost_pair: # Se encontrou uma melhoria global
+                            # --- Aplica a melhoria (modifica as rotas in-place) ---
+                            # Atualiza rota de origem (r1)
+                            r1['visits'] = [('D', 0, depot_node, depot_node)] + r1_temp_services + [('D', 0, depot_node, depot_node)]
+                            r1['demand'] = r1_demand_after_removal
+                            r1['cost'] = r1_cost_after_removal
+
+                            # Atualiza rota de destino (r2)
+                            r2['visits'] = [('D', 0, depot_node, depot_node)] + r2_temp_services + [('D', 0, depot_node, depot_node)]
+                            r2['demand'] = r2_demand_after_insertion
+                            r2['cost'] = r2_cost_after_insertion
+                            
+                            improved_in_iteration = True # Marca que houve melhoria nesta iteração da função
+                            total_improved = True # Marca que houve melhoria global na execução da função
+                            # Retorna True imediatamente para reiniciar a busca local global,
+                            # pois a estrutura das rotas mudou e pode abrir novas oportunidades.
+                            return True 
+
+        if not improved_in_iteration: # Se nenhuma melhoria foi encontrada após tentar todas as combinações
+            break # Sai do loop de busca inter-rota
+
+    return total_improved # Retorna True se houve alguma melhoria total na função perform_relocate_inter
+
+def benchmark_relocate_inter(instance_filepaths, limite_segundos=60):
+    """
+    Compara o Relocate inter-rotas granular (`perform_relocate_inter`) com a versão anterior
+    (`relocate_inter_por_listas`) a partir da solução inicial de cada instância. A versão anterior aplica
+    um único movimento por chamada, então é chamada repetidamente até não haver melhoria (ou até o
+    limite de tempo), como se o laço global não tivesse limite de iterações. Mostra o custo e o tempo
+    de cada uma, o tempo do cálculo das listas de vizinhança, incluído no tempo da versão nova, e
+    sinaliza (coluna 'Pior') as instâncias em que a versão nova termina com custo maior.
+
+    Args:
+        instance_filepaths (list): Caminhos das instâncias a medir.
+        limite_segundos (float): Tempo máximo da versão anterior por instância.
+
+    Returns:
+        int: Número de instâncias em que a versão nova termina com custo maior.
+    """
+    interrompidas, piores = 0, 0
+    print(f"{'Instância':<28} {'Serv.':>6} {'Rotas':>6} {'Inicial':>9} {'Antes':>9} {'Movim.':>7} {'Antes (ms)':>11} "
+          f"{'Depois':>9} {'Depois (ms)':>12} {'Vizinhos (ms)':>14} {'Ganho':>7} {'Pior':>5}")
+    for instance_filepath in instance_filepaths:
+        instancia, _ = medir(preparar_instancia, instance_filepath)
+        matriz_servicos, capacidade = instancia.matriz_servicos, instancia.capacidade_veiculo
+        _, _, rotas = generate_initial_solution_internal(
+            instancia.dados_gerais, instancia.required_nodes, instancia.required_edges, instancia.non_required_edges,
+            instancia.required_arcs, instancia.non_required_arcs, instancia.short_paths_matrix,
+            instancia.id_to_service_obj, instancia.servicos_inviaveis, matriz_servicos)
+        custo_inicial = sum(rota['cost'] for rota in rotas)
+
+        rotas_antes, movimentos = deepcopy(rotas), 0
+        t0 = time.perf_counter()
+        while time.perf_counter() - t0 < limite_segundos and relocate_inter_por_listas(
+                rotas_antes, matriz_servicos, instancia.depot_node, capacidade):
+            movimentos += 1
+        tempo_antes = (time.perf_counter() - t0) * 1000
+        convergiu = time.perf_counter() - t0 < limite_segundos
+        interrompidas += not convergiu
+
+        solucao = Solucao.de_rotas_saida(rotas, matriz_servicos)
+        t0 = time.perf_counter()
+        vizinhanca = matriz_servicos.vizinhos(VIZINHOS_RELOCATE_INTER, [s for rota in solucao.rotas for s in rota.servicos])
+        tempo_vizinhos = (time.perf_counter() - t0) * 1000
+        perform_relocate_inter(solucao, matriz_servicos, capacidade, vizinhanca)
+        tempo_depois = (time.perf_counter() - t0) * 1000
+
+        custo_antes = sum(rota['cost'] for rota in rotas_antes)
+        pior = solucao.custo > custo_antes
+        piores += pior
+        print(f"{os.path.basename(instance_filepath):<28} {len(instancia.servicos):>6} {len(rotas):>6} {custo_inicial:>9} "
+              f"{str(custo_antes) + ('' if convergiu else '*'):>9} {movimentos:>7} {tempo_antes:>11.1f} {solucao.custo:>9} "
+              f"{tempo_depois:>12.1f} {tempo_vizinhos:>14.1f} {tempo_antes / tempo_depois:>6.0f}x {'SIM' if pior else 'não':>5}")
+    if interrompidas:
+        print(f"* versão anterior interrompida pelo limite de {limite_segundos} s")
+    print(f"Instâncias em que a versão nova termina com custo maior: {piores} de {len(instance_filepaths)}")
+    return piores
+
+def benchmark_cache_movimentos(instance_filepaths, num_threads=1):
+    """
+    Mede a busca local da Etapa 3 (`otimizar_solucao`) com e sem o cache de movimentos (`CacheMovimentos`)
+    sobre a mesma instância preparada: número de iterações globais, tempo médio por iteração e das
+    iterações após a primeira (em que o cache pode acertar), taxa de acertos de cada operador e se o
+    custo final é o mesmo (o cache só evita trabalho cujo resultado já é conhecido).
+
+    Args:
+        instance_filepaths (list): Caminhos das instâncias a medir.
+        num_threads (int): Threads dos operadores intra-rota (1 para medições estáveis).
+
+    Returns:
+        int: Número de instâncias em que as soluções com e sem o cache diferem.
+    """
+    diferentes = 0
+    print(f"{'Instância':<28} {'Iter.':>6} {'Antes (ms/it)':>14} {'Depois (ms/it)':>15} {'Antes 2+ (ms)':>14} "
+          f"{'Depois 2+ (ms)':>15} {'2-opt':>7} {'Rel. intra':>11} {'Rel. inter':>11} {'Custo':>9} {'Iguais':>7}")
+    for instance_filepath in instance_filepaths:
+        instancia, _ = medir(preparar_instancia, instance_filepath)
+        resultados = []
+        for ativo in (False, True):
+            cache = CacheMovimentos(ativo=ativo)
+            with contextlib.redirect_stdout(io.StringIO()):
+                custo, _, _, _, rotas = otimizar_solucao(instancia, num_threads=num_threads, cache_movimentos=cache)
+            resultados.append((cache, custo, rotas))
+        (sem_cache, custo_antes, rotas_antes), (com_cache, custo_depois, rotas_depois) = resultados
+        tempos_antes, tempos_depois = sem_cache.tempos_iteracao, com_cache.tempos_iteracao
+        iguais = custo_antes == custo_depois and [r['visits'] for r in rotas_antes] == [r['visits'] for r in rotas_depois]
+        taxas = [f"{com_cache.taxa_acertos(operador):.0%}" for operador in CacheMovimentos.OPERADORES]
+        print(f"{os.path.basename(instance_filepath):<28} {len(tempos_depois):>6} "
+              f"{sum(tempos_antes) / len(tempos_antes):>14.1f} {sum(tempos_depois) / len(tempos_depois):>15.1f} "
+              f"{sum(tempos_antes[1:]):>14.1f} {sum(tempos_depois[1:]):>15.1f} {taxas[0]:>7} {taxas[1]:>11} {taxas[2]:>11} "
+              f"{custo_depois:>9} {'sim' if iguais else 'NÃO':>7}")
+        diferentes += not iguais
+    return diferentes
+
+def benchmark_solucao_compacta(instance_filepaths, num_threads=1, repeticoes=5):
+    """
+    Compara a representação compacta da solução da busca local (`Solucao`/`Rota`: IDs em arrays, carga
+    e custo guardados em somas de prefixo) com a anterior (lista de dicionários com as visitas
+    ('S', id, from, to) entre visitas do depósito), a partir da solução inicial de cada instância:
+    tamanho de cada uma (sys.getsizeof dos objetos próprios, sem os ints compartilhados), tempo de uma
+    cópia com `deepcopy` (que a busca fazia a cada execução) contra o de montar a `Solucao`, e tempo da
+    conversão para a saída. Mede também a busca completa (`otimizar_solucao`): pico de memória
+    (tracemalloc, dominado pelas listas de vizinhança do Relocate inter) e o menor tempo médio por
+    iteração global em `repeticoes` execuções.
+
+    Args:
+        instance_filepaths (list): Caminhos das instâncias a medir.
+        num_threads (int): Threads dos operadores intra-rota (1 para medições estáveis).
+        repeticoes (int): Execuções da busca para o tempo por iteração.
+    """
+    print(f"{'Instância':<28} {'Serv.':>6} {'Rotas':>6} {'Dicts (KiB)':>12} {'Compacta (KiB)':>15} {'deepcopy (ms)':>14} "
+          f"{'Solucao (ms)':>13} {'Saída (ms)':>11} {'Pico busca (KiB)':>17} {'ms/iteração':>12}")
+    for instance_filepath in instance_filepaths:
+        instancia, _ = medir(preparar_instancia, instance_filepath)
+        matriz_servicos = instancia.matriz_servicos
+        _, _, rotas = generate_initial_solution_internal(
+            instancia.dados_gerais, instancia.required_nodes, instancia.required_edges, instancia.non_required_edges,
+            instancia.required_arcs, instancia.non_required_arcs, instancia.short_paths_matrix,
+            instancia.id_to_service_obj, instancia.servicos_inviaveis, matriz_servicos)
+
+        tamanho_dicts = sys.getsizeof(rotas) + sum(sys.getsizeof(r) + sys.getsizeof(r['visits'])
+                                                   + sum(sys.getsizeof(visita) for visita in r['visits']) for r in rotas)
+        _, tempo_deepcopy = medir(deepcopy, rotas)
+        solucao, tempo_solucao = medir(Solucao.de_rotas_saida, rotas, matriz_servicos)
+        _, tempo_saida = medir(solucao.para_saida, matriz_servicos, instancia.depot_node)
+
+        # Busca completa: pico de memória (execução com tracemalloc) e tempo por iteração (execuções sem ele)
+        tempos_iteracao = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            tracemalloc.start()
+            otimizar_solucao(instancia, num_threads=num_threads)
+            pico_busca = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            for _ in range(repeticoes):
+                cache = CacheMovimentos()
+                otimizar_solucao(instancia, num_threads=num_threads, cache_movimentos=cache)
+                tempos_iteracao.append(sum(cache.tempos_iteracao) / len(cache.tempos_iteracao))
+        print(f"{os.path.basename(instance_filepath):<28} {len(instancia.servicos):>6} {len(rotas):>6} "
+              f"{tamanho_dicts / 1024:>12.1f} {solucao.tamanho_em_bytes() / 1024:>15.1f} {tempo_deepcopy:>14.2f} "
+              f"{tempo_solucao:>13.2f} {tempo_saida:>11.2f} {pico_busca / 1024:>17.1f} {min(tempos_iteracao):>12.1f}")
+
+# Cada benchmark: nome na linha de comando -> (função, instâncias padrão). Os que comparam duas versões
+# retornam o número de instâncias em que a comparação falhou, e o script termina então com código 1
+BENCHMARKS = {
+    'matriz': (benchmark_matriz_distancias, ['BHW14.dat', 'CBMix12.dat', 'DI-NEARP-n240-Q16k.dat', 'DI-NEARP-n833-Q16k.dat']),
+    'apsp_backends': (benchmark_apsp_backends, ['DI-NEARP-n240-Q16k.dat', 'DI-NEARP-n422-Q16k.dat', 'DI-NEARP-n442-Q16k.dat',
+                                                'DI-NEARP-n477-Q16k.dat', 'DI-NEARP-n699-Q16k.dat', 'DI-NEARP-n833-Q16k.dat']),
+    'apsp_crossover': (benchmark_apsp_crossover, ['mggdb_0.25_1.dat', 'mgval_0.25_1A.dat', 'mgval_0.25_10D.dat', 'BHW1.dat',
+                                                  'BHW14.dat', 'CBMix12.dat', 'DI-NEARP-n240-Q16k.dat', 'DI-NEARP-n477-Q16k.dat',
+                                                  'DI-NEARP-n833-Q16k.dat']),
+    'apsp_restrito': (benchmark_apsp_restrito, ['BHW14.dat', 'CBMix12.dat', 'mgval_0.25_10D.dat', 'DI-NEARP-n240-Q16k.dat',
+                                                'DI-NEARP-n422-Q16k.dat', 'DI-NEARP-n442-Q16k.dat', 'DI-NEARP-n477-Q16k.dat',
+                                                'DI-NEARP-n699-Q16k.dat', 'DI-NEARP-n833-Q16k.dat']),
+    'grafo_csr': (benchmark_grafo_csr, ['BHW14.dat', 'CBMix12.dat', 'DI-NEARP-n477-Q16k.dat', 'DI-NEARP-n699-Q16k.dat',
+                                        'DI-NEARP-n833-Q16k.dat']),
+    'fila_dial': (benchmark_fila_dial, sorted(f for f in os.listdir(INPUT_DIRECTORY) if f.endswith('.dat'))
+                  if os.path.isdir(INPUT_DIRECTORY) else []),
+    'predecessores': (benchmark_predecessores, ['BHW14.dat', 'CBMix12.dat', 'DI-NEARP-n240-Q16k.dat',
+                                                'DI-NEARP-n477-Q16k.dat', 'DI-NEARP-n833-Q16k.dat']),
+    'apsp_dinamico': (benchmark_apsp_dinamico, ['BHW14.dat', 'DI-NEARP-n833-Q16k.dat']),
+    'apsp_simetrico': (benchmark_apsp_simetrico, ['BHW14.dat', 'mggdb_0.25_1.dat', 'CBMix12.dat', 'DI-NEARP-n240-Q16k.dat',
+                                                  'DI-NEARP-n477-Q16k.dat', 'DI-NEARP-n833-Q16k.dat']),
+    'reducao_grafo': (benchmark_reducao_grafo, ['BHW14.dat', 'CBMix12.dat', 'DI-NEARP-n240-Q16k.dat',
+                                                'DI-NEARP-n422-Q16k.dat', 'DI-NEARP-n442-Q16k.dat', 'DI-NEARP-n477-Q16k.dat',
+                                                'DI-NEARP-n699-Q16k.dat', 'DI-NEARP-n833-Q16k.dat']),
+    'componentes': (benchmark_componentes, ['BHW14.dat', 'CBMix12.dat', 'mgval_0.25_10D.dat', 'DI-NEARP-n240-Q16k.dat',
+                                            'DI-NEARP-n699-Q16k.dat', 'DI-NEARP-n833-Q16k.dat']),
+    'matriz_servicos': (benchmark_matriz_servicos, ['CBMix1.dat', 'CBMix12.dat', 'CBMix23.dat', 'DI-NEARP-n240-Q16k.dat',
+                                                    'DI-NEARP-n477-Q2k.dat', 'DI-NEARP-n833-Q16k.dat']),
+    'construtivo': (benchmark_construtivo, ['BHW14.dat', 'CBMix12.dat', 'mgval_0.50_4D.dat', 'DI-NEARP-n240-Q16k.dat',
+                                            'DI-NEARP-n442-Q2k.dat', 'DI-NEARP-n477-Q16k.dat', 'DI-NEARP-n699-Q2k.dat',
+                                            'DI-NEARP-n833-Q2k.dat', 'DI-NEARP-n833-Q16k.dat']),
+    'portfolio': (benchmark_portfolio, ['BHW14.dat', 'CBMix12.dat', 'mgval_0.50_4D.dat', 'mggdb_0.25_1.dat',
+                                        'DI-NEARP-n240-Q16k.dat', 'DI-NEARP-n477-Q2k.dat', 'DI-NEARP-n833-Q2k.dat',
+                                        'DI-NEARP-n833-Q16k.dat']),
+    'split': (benchmark_split, ['BHW1.dat', 'BHW14.dat', 'CBMix1.dat', 'CBMix12.dat', 'mggdb_0.25_1.dat',
+                                'mgval_0.50_4D.dat', 'DI-NEARP-n240-Q16k.dat', 'DI-NEARP-n477-Q2k.dat',
+                                'DI-NEARP-n699-Q2k.dat', 'DI-NEARP-n833-Q2k.dat', 'DI-NEARP-n833-Q16k.dat']),
+    'savings': (benchmark_savings, sorted(f for f in os.listdir(INPUT_DIRECTORY) if f.endswith('.dat'))
+                if os.path.isdir(INPUT_DIRECTORY) else []),
+    'relocate_intra': (benchmark_relocate_intra, ['DI-NEARP-n240-Q16k.dat', 'DI-NEARP-n422-Q16k.dat', 'DI-NEARP-n442-Q16k.dat',
+                                                  'DI-NEARP-n477-Q16k.dat', 'DI-NEARP-n699-Q16k.dat', 'DI-NEARP-n833-Q16k.dat']),
+    'dois_opt': (benchmark_dois_opt, ['BHW14.dat', 'CBMix12.dat', 'CBMix23.dat', 'mgval_0.50_4D.dat', 'DI-NEARP-n240-Q16k.dat',
+                                      'DI-NEARP-n477-Q2k.dat', 'DI-NEARP-n699-Q16k.dat', 'DI-NEARP-n833-Q16k.dat']),
+    'relocate_inter': (benchmark_relocate_inter, ['BHW14.dat', 'CBMix1.dat', 'CBMix12.dat', 'CBMix23.dat', 'mgval_0.50_4D.dat',
+                                                  'DI-NEARP-n240-Q2k.dat', 'DI-NEARP-n477-Q2k.dat', 'DI-NEARP-n833-Q2k.dat']),
+    # Conjunto fixo em que a versão nova do Relocate inter não pode terminar acima da anterior
+    'verificar_relocate_inter': (benchmark_relocate_inter, ['BHW1.dat', 'BHW5.dat', 'BHW7.dat', 'BHW14.dat', 'CBMix1.dat',
+                                                            'CBMix7.dat', 'CBMix11.dat', 'CBMix12.dat', 'CBMix18.dat',
+                                                            'CBMix23.dat', 'mgval_0.50_4D.dat']),
+    'cache_movimentos': (benchmark_cache_movimentos, sorted(f for f in os.listdir(INPUT_DIRECTORY)
+                                                            if f.startswith(('CBMix', 'DI-NEARP')))
+                         if os.path.isdir(INPUT_DIRECTORY) else []),
+    'solucao_compacta': (benchmark_solucao_compacta, ['BHW14.dat', 'CBMix12.dat', 'CBMix21.dat', 'mgval_0.50_4D.dat',
+                                                      'DI-NEARP-n240-Q2k.dat', 'DI-NEARP-n477-Q2k.dat', 'DI-NEARP-n699-Q16k.dat',
+                                                      'DI-NEARP-n833-Q2k.dat', 'DI-NEARP-n833-Q16k.dat']),
+}
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print(f"Uso: python {os.path.basename(sys.argv[0])} <{'|'.join(BENCHMARKS)}> [instancias...]")
+        sys.exit(1)
+
+    funcao_benchmark, instancias_padrao = BENCHMARKS[sys.argv[1]]
+    instancias = sys.argv[2:] or instancias_padrao
+    falhas = funcao_benchmark([os.path.join(INPUT_DIRECTORY, nome) for nome in instancias])
+    if falhas:
+        print(f"FALHA: {falhas} instância(s) não passaram na verificação")
+        sys.exit(1)
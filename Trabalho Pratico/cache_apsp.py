@@ -0,0 +1,287 @@
+import os # Importa os para manipular o diretório e os arquivos do cache
+import re # Importa re para extrair a família (prefixo) do nome de cada instância
+import json # Importa json para o índice instância -> entrada do cache
+import hashlib # Importa hashlib para calcular a impressão digital (hash) do grafo
+import mmap # Importa mmap para abrir a matriz do disco sem leitura/parsing
+import struct # Importa struct para ler/escrever o cabeçalho binário dos arquivos
+import time # Importa time para medir o tempo de cálculo de cada matriz
+from array import array # Importa array para serializar listas de inteiros em bytes
+from collections import defaultdict # Importa defaultdict para agrupar instâncias por rede
+
+from leitor_dados import carregar_dados_arquivo
+from grafo_estatisticas import construir_grafo
+from caminhos_minimos import extremos_servicos
+from instancia_preparada import montar_servicos
+from matriz_distancias import MatrizDistancias, MatrizDistanciasSimetrica
+
+# Formato do arquivo (.apsp), todo em inteiros de 8 bytes após o cabeçalho:
+#   cabeçalho: magic (4 bytes) | versão (uint32) | hash sha256 (32 bytes) | nº origens (int64) | nº destinos (int64)
+#              | tempo de cálculo da matriz em ms (float64)
+#   origens (int64 * nº origens) | destinos (int64 * nº destinos) | distâncias (int64 * origens * destinos, row-major)
+# Matrizes simétricas (`MatrizDistanciasSimetrica`) são gravadas com nº destinos = -1, sem a lista de destinos,
+# e com o triângulo superior das distâncias (int64 * k * (k + 1) / 2, onde k = nº origens).
+MAGIC_CACHE = b'APSP'
+VERSAO_CACHE = 3
+DESTINOS_SIMETRICA = -1 # Valor de "nº destinos" que identifica uma matriz simétrica
+FORMATO_CABECALHO = '<4sI32sqqd'
+TAMANHO_CABECALHO = struct.calcsize(FORMATO_CABECALHO) # 64 bytes (múltiplo de 8)
+ARQUIVO_INDICE = 'indice.json' # Instância -> hash da entrada usada na última execução
+
+def impressao_digital_rede(traversal_costs):
+    """
+    Calcula o hash da rede: lista de arestas/arcos com seus custos de travessia
+    (como devolvida por `construir_grafo`). Instâncias com a mesma rede têm o mesmo hash,
+    mesmo que os serviços requeridos ou a capacidade sejam diferentes.
+
+    Args:
+        traversal_costs (dict): Dicionário de custos de travessia (chave: (u, v), valor: custo).
+
+    Returns:
+        bytes: O digest sha256 (32 bytes).
+    """
+    arcos = array('q')
+    for (u, v), custo in sorted(traversal_costs.items()):
+        arcos.extend((u, v, custo))
+    return hashlib.sha256(arcos.tobytes()).digest()
+
+def impressao_digital_grafo(traversal_costs, origens, destinos):
+    """
+    Calcula o hash que identifica uma matriz APSP: a rede (ver `impressao_digital_rede`)
+    mais as origens e destinos da matriz.
+
+    Args:
+        traversal_costs (dict): Dicionário de custos de travessia (chave: (u, v), valor: custo).
+        origens (list): Nós de origem (linhas) da matriz.
+        destinos (list): Nós de destino (colunas) da matriz.
+
+    Returns:
+        bytes: O digest sha256 (32 bytes).
+    """
+    h = hashlib.sha256(impressao_digital_rede(traversal_costs))
+    h.update(b'|')
+    h.update(array('q', origens).tobytes())
+    h.update(b'|')
+    h.update(array('q', destinos).tobytes())
+    return h.digest()
+
+def familia_instancia(nome_instancia):
+    """Retorna a família de uma instância pelo prefixo do nome (ex: 'mgval_0.25_1A' -> 'mgval')."""
+    match = re.match(r'[A-Za-z]+(?:-[A-Za-z]+)?', nome_instancia)
+    return match.group(0) if match else nome_instancia
+
+class CacheAPSP:
+    """
+    Cache das matrizes APSP, em memória e (opcionalmente) em disco, indexado pela impressão digital
+    do grafo. Num acerto em disco, a matriz é aberta com mmap (cópia sob escrita), sem parsing e sem
+    recalcular o APSP. Quando o grafo de uma instância muda, a impressão digital muda e a entrada
+    antiga deixa de ser usada (e é removida se nenhuma outra instância a usa).
+    Registra, por instância, se houve acerto e quanto tempo de APSP foi poupado, para os resumos
+    das execuções em lote.
+    """
+
+    def __init__(self, diretorio=None):
+        """
+        Args:
+            diretorio (str, optional): Pasta onde os arquivos .apsp serão guardados (criada se não existir).
+                                       Se None, o cache vale apenas durante a execução (em memória).
+        """
+        self.diretorio = diretorio
+        self.acertos = 0
+        self.faltas = 0
+        self.memoria = {} # hash -> (matriz, tempo de cálculo em ms): reaproveitamento dentro da mesma execução
+        self.registro = [] # Lista de (nome_instancia, acerto, tempo_calculo_ms, tempo_obtencao_ms)
+        self.indice = {}
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+            try:
+                with open(os.path.join(diretorio, ARQUIVO_INDICE)) as f:
+                    self.indice = json.load(f)
+            except (FileNotFoundError, ValueError):
+                self.indice = {}
+
+    def _caminho(self, digest):
+        return os.path.join(self.diretorio, f"{digest.hex()}.apsp")
+
+    def carregar(self, caminho, digest):
+        """
+        Abre uma matriz do cache via mmap. Retorna None se o arquivo não existir ou não
+        corresponder ao formato/impressão digital esperados.
+
+        Returns:
+            tuple | None: (matriz (MatrizDistancias), tempo de cálculo original em ms).
+        """
+        try:
+            with open(caminho, 'rb') as f:
+                mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        if len(mapa) < TAMANHO_CABECALHO:
+            return None
+        magic, versao, digest_arquivo, num_origens, num_destinos, tempo_calculo_ms = \
+            struct.unpack_from(FORMATO_CABECALHO, mapa, 0)
+        if magic != MAGIC_CACHE or versao != VERSAO_CACHE or digest_arquivo != digest:
+            return None
+        simetrica = num_destinos == DESTINOS_SIMETRICA
+        if simetrica:
+            inicio_dados = TAMANHO_CABECALHO + 8 * num_origens
+            num_celulas = MatrizDistanciasSimetrica.num_celulas(num_origens)
+        else:
+            inicio_dados = TAMANHO_CABECALHO + 8 * (num_origens + num_destinos)
+            num_celulas = num_origens * num_destinos
+        if num_origens < 0 or num_destinos < DESTINOS_SIMETRICA or len(mapa) != inicio_dados + 8 * num_celulas:
+            return None
+
+        visao = memoryview(mapa)
+        origens = visao[TAMANHO_CABECALHO:TAMANHO_CABECALHO + 8 * num_origens].cast('q').tolist()
+        # As distâncias não são lidas: a matriz aponta diretamente para as páginas mapeadas do arquivo
+        if simetrica:
+            return MatrizDistanciasSimetrica(origens, buffer=visao[inicio_dados:]), tempo_calculo_ms
+        destinos = visao[TAMANHO_CABECALHO + 8 * num_origens:inicio_dados].cast('q').tolist()
+        return MatrizDistancias(origens, buffer=visao[inicio_dados:], nos_destino=destinos), tempo_calculo_ms
+
+    def salvar(self, caminho, digest, matriz, tempo_calculo_ms):
+        """Grava a matriz no formato binário do cache (escrita atômica via arquivo temporário)."""
+        caminho_temporario = caminho + '.tmp'
+        simetrica = isinstance(matriz, MatrizDistanciasSimetrica)
+        num_destinos = DESTINOS_SIMETRICA if simetrica else len(matriz.nos_destino)
+        with open(caminho_temporario, 'wb') as f:
+            f.write(struct.pack(FORMATO_CABECALHO, MAGIC_CACHE, VERSAO_CACHE, digest,
+                                len(matriz.nos), num_destinos, tempo_calculo_ms))
+            f.write(array('q', matriz.nos).tobytes())
+            if not simetrica:
+                f.write(array('q', matriz.nos_destino).tobytes())
+            f.write(matriz.dados.tobytes())
+        os.replace(caminho_temporario, caminho)
+
+    def _atualizar_indice(self, nome_instancia, digest_hex):
+        """Associa a instância à entrada atual e remove a entrada antiga se ninguém mais a usa."""
+        digest_antigo = self.indice.get(nome_instancia)
+        self.indice[nome_instancia] = digest_hex
+        if digest_antigo and digest_antigo != digest_hex and digest_antigo not in self.indice.values():
+            try:
+                os.remove(os.path.join(self.diretorio, f"{digest_antigo}.apsp"))
+            except FileNotFoundError:
+                pass
+        caminho_temporario = os.path.join(self.diretorio, ARQUIVO_INDICE + '.tmp')
+        with open(caminho_temporario, 'w') as f:
+            json.dump(self.indice, f, indent=0, sort_keys=True)
+        os.replace(caminho_temporario, os.path.join(self.diretorio, ARQUIVO_INDICE))
+
+    def obter(self, nome_instancia, traversal_costs, origens, destinos, calcular):
+        """
+        Retorna a matriz APSP da instância, do cache se possível ou calculando-a (e gravando-a).
+
+        Args:
+            nome_instancia (str): Nome da instância (ex: 'BHW1'), usado no índice e nos resumos.
+            traversal_costs (dict): Custos de travessia do grafo (base da impressão digital).
+            origens (list): Nós de origem (linhas) da matriz.
+            destinos (list): Nós de destino (colunas) da matriz.
+            calcular (callable): Função sem argumentos que calcula a matriz em caso de falta.
+
+        Returns:
+            tuple: (matriz (MatrizDistancias), acerto (bool)).
+        """
+        t0 = time.perf_counter()
+        digest = impressao_digital_grafo(traversal_costs, origens, destinos)
+
+        encontrada = self.memoria.get(digest)
+        if encontrada is None and self.diretorio:
+            encontrada = self.carregar(self._caminho(digest), digest)
+            if encontrada is not None:
+                self.memoria[digest] = encontrada
+
+        if encontrada is not None:
+            matriz, tempo_calculo_ms = encontrada
+            acerto = True
+            self.acertos += 1
+        else:
+            matriz = calcular()
+            tempo_calculo_ms = (time.perf_counter() - t0) * 1000
+            acerto = False
+            self.faltas += 1
+            self.memoria[digest] = (matriz, tempo_calculo_ms)
+            if self.diretorio:
+                self.salvar(self._caminho(digest), digest, matriz, tempo_calculo_ms)
+
+        if self.diretorio:
+            self._atualizar_indice(nome_instancia, digest.hex())
+        self.registro.append((nome_instancia, acerto, tempo_calculo_ms, (time.perf_counter() - t0) * 1000))
+        return matriz, acerto
+
+    def resumo(self):
+        """Retorna uma linha de texto com os acertos e faltas do cache."""
+        total = self.acertos + self.faltas
+        taxa = (100.0 * self.acertos / total) if total else 0.0
+        local = f"'{self.diretorio}'" if self.diretorio else "em memória"
+        return f"Cache APSP ({local}): {self.acertos} acertos, {self.faltas} faltas ({taxa:.1f}% de acertos)"
+
+    def resumo_por_familia(self):
+        """
+        Retorna linhas de texto com, para cada família de instâncias, o número de instâncias,
+        de APSPs efetivamente calculados e o tempo de APSP poupado pelos acertos
+        (tempo de cálculo original da matriz menos o tempo para obtê-la do cache).
+        """
+        por_familia = defaultdict(lambda: [0, 0, 0.0, 0.0]) # [instâncias, cálculos, tempo gasto, tempo poupado]
+        for nome_instancia, acerto, tempo_calculo_ms, tempo_obtencao_ms in self.registro:
+            dados = por_familia[familia_instancia(nome_instancia)]
+            dados[0] += 1
+            dados[2] += tempo_obtencao_ms
+            if acerto:
+                dados[3] += max(0.0, tempo_calculo_ms - tempo_obtencao_ms)
+            else:
+                dados[1] += 1
+
+        linhas = [f"{'Família':<10} {'Instâncias':>10} {'APSPs calculados':>17} {'APSP gasto (ms)':>16} {'APSP poupado (ms)':>18}"]
+        for familia in sorted(por_familia):
+            instancias, calculos, gasto, poupado = por_familia[familia]
+            linhas.append(f"{familia:<10} {instancias:>10} {calculos:>17} {gasto:>16.1f} {poupado:>18.1f}")
+        return linhas
+
+def extremos_instancia(instance_filepath):
+    """
+    Lê uma instância e retorna a impressão digital da sua rede e os extremos dos serviços, os mesmos
+    do APSP restrito de uma instância isolada (ver `extremos_servicos`).
+
+    Returns:
+        tuple: (digest_rede (bytes), origens (list), destinos (list)).
+    """
+    dados_gerais, required_nodes, required_edges, non_required_edges, required_arcs, non_required_arcs = \
+        carregar_dados_arquivo(instance_filepath)
+    _, traversal_costs = construir_grafo(required_edges, non_required_edges, required_arcs, non_required_arcs)
+    servicos = montar_servicos(required_nodes, required_edges, required_arcs)
+    origens, destinos = extremos_servicos(servicos, int(dados_gerais['Depot Node']))
+    return impressao_digital_rede(traversal_costs), origens, destinos
+
+def agrupar_instancias_por_rede(instance_filepaths):
+    """
+    Agrupa instâncias que compartilham a mesma rede (mesmas arestas, arcos e custos de travessia),
+    como as famílias mgval/mggdb, que repetem cada rede com várias taxas de demanda.
+    Para cada grupo, une os extremos de serviço de todas as instâncias, de forma que uma única
+    matriz APSP atenda todas elas.
+
+    Args:
+        instance_filepaths (list): Caminhos das instâncias do lote.
+
+    Returns:
+        dict: Caminho da instância -> (origens (list), destinos (list)) do seu grupo, ambas ordenadas.
+              Instâncias que não puderam ser lidas ficam fora do dicionário.
+    """
+    extremos = {}
+    for caminho in instance_filepaths:
+        try:
+            extremos[caminho] = extremos_instancia(caminho)
+        except Exception:
+            continue # Instância ilegível: fica fora dos grupos e o erro aparece ao processá-la
+
+    uniao_por_rede = defaultdict(lambda: (set(), set()))
+    for digest_rede, origens, destinos in extremos.values():
+        uniao_origens, uniao_destinos = uniao_por_rede[digest_rede]
+        uniao_origens.update(origens)
+        uniao_destinos.update(destinos)
+
+    extremos_grupo = {}
+    for caminho, (digest_rede, _, _) in extremos.items():
+        uniao_origens, uniao_destinos = uniao_por_rede[digest_rede]
+        extremos_grupo[caminho] = (sorted(uniao_origens), sorted(uniao_destinos))
+    return extremos_grupo
@@ -0,0 +1,549 @@
+import heapq # Importa heapq, uma implementação de fila de prioridade para Dijkstra
+import os # Importa os para obter o número de CPUs disponíveis
+from concurrent.futures import ThreadPoolExecutor # Para o backend de APSP com threads
+from multiprocessing import Pool, shared_memory # Para o backend de APSP com processos e memória compartilhada
+
+from matriz_distancias import MatrizDistancias, MatrizDistanciasSimetrica, MatrizPredecessores, DISTANCIA_INALCANCAVEL
+from grafo_csr import GrafoCSR
+
+try:
+    import numpy as np # Dependência opcional: necessária apenas para o Floyd-Warshall vetorizado
+except ImportError:
+    np = None
+
+# Backends disponíveis para o cálculo do All-Pairs Shortest Path (APSP).
+# 'auto' escolhe entre Floyd-Warshall vetorizado e Dijkstra (em processos) pelo tamanho e densidade do grafo.
+BACKENDS_APSP = ('auto', 'sequencial', 'threads', 'processos', 'floyd_warshall')
+
+# Filas de prioridade disponíveis para os Dijkstras do APSP: 'heap' (heapq, custos quaisquer)
+# ou 'dial' (buckets de Dial, apenas para custos de travessia inteiros não negativos).
+FILAS_DIJKSTRA = ('heap', 'dial')
+
+# Constantes de custo (em segundos) usadas para estimar o tempo de cada método de APSP.
+# Foram calibradas medindo as duas implementações nas instâncias da pasta 'instancias', com o
+# Dijkstra sobre o grafo CSR (`dijkstra_csr`) e o grafo reduzido do modo restrito (ver `reduzir_grafo`).
+CUSTO_RELAXACAO_DIJKSTRA = 4e-7    # Por (arco + nó) processado em um Dijkstra sobre o grafo CSR
+CUSTO_CELULA_FLOYD = 2.4e-9        # Por célula da matriz atualizada em um pivô do Floyd-Warshall (NumPy)
+CUSTO_PIVO_FLOYD = 5e-6            # Custo fixo de cada pivô do Floyd-Warshall (chamadas NumPy, alocação)
+
+def dijkstra_optimized(start_node, graph_adj, traversal_costs, all_nodes):
+    """
+    Calcula as distâncias dos caminhos mais curtos de um nó inicial para todos os outros nós.
+    Implementação otimizada do algoritmo de Dijkstra usando uma fila de prioridade (heap).
+
+    Args:
+        start_node (int): O nó de origem.
+        graph_adj (defaultdict): Lista de adjacência do grafo.
+        traversal_costs (dict): Dicionário de custos de travessia (chave: (u, v), valor: custo).
+        all_nodes (list): Lista de todos os nós no grafo.
+
+    Returns:
+        dict: Dicionário onde as chaves são os nós e os valores são as distâncias mais curtas de start_node.
+    """
+    distances = {node: float('inf') for node in all_nodes} # Inicializa distâncias com infinito
+    distances[start_node] = 0 # Distância do nó inicial para si mesmo é 0
+    pq = [(0, start_node)] # Fila de prioridade: (custo_acumulado, nó)
+
+    while pq:
+        dist, current_node = heapq.heappop(pq) # Extrai o nó com menor custo
+        if dist > distances[current_node]: # Se já encontrou um caminho melhor, ignora
+            continue
+        for neighbor in graph_adj.get(current_node, []): # Itera sobre os vizinhos do nó atual
+            cost_to_neighbor = traversal_costs.get((current_node, neighbor), float('inf')) # Custo da aresta/arco
+            if cost_to_neighbor == float('inf'): # Se o caminho não existe ou é inválido, pula
+                continue
+            if distances[current_node] + cost_to_neighbor < distances[neighbor]: # Se encontrou um caminho mais curto
+                distances[neighbor] = distances[current_node] + cost_to_neighbor # Atualiza a distância
+                heapq.heappush(pq, (distances[neighbor], neighbor)) # Adiciona/atualiza na fila de prioridade
+    return distances
+
+def dijkstra_csr(grafo, origem, predecessores=None):
+    """
+    Dijkstra sobre o grafo em formato CSR: os arcos de saída de cada nó são percorridos por índice
+    nos vetores `vizinhos`/`pesos`, sem tuplas (u, v) nem consultas a dicionário a cada relaxação.
+
+    Args:
+        grafo (GrafoCSR): O grafo em formato CSR.
+        origem (int): Índice denso (em `grafo.nos`) do nó de origem.
+        predecessores (list, optional): Lista com um valor por índice denso (inicialmente -1). Se
+                                        informada, recebe o predecessor de cada nó no caminho mínimo.
+
+    Returns:
+        list: Distância mais curta da origem para cada índice denso do grafo
+              (DISTANCIA_INALCANCAVEL para nós sem caminho).
+    """
+    inicio, vizinhos, pesos = grafo.inicio, grafo.vizinhos, grafo.pesos
+    heappop, heappush = heapq.heappop, heapq.heappush
+    distancias = [DISTANCIA_INALCANCAVEL] * len(grafo.nos)
+    distancias[origem] = 0
+    pq = [(0, origem)] # Fila de prioridade: (custo_acumulado, índice do nó)
+
+    while pq:
+        dist, u = heappop(pq)
+        if dist > distancias[u]: # Entrada obsoleta: o nó já foi fechado com custo menor
+            continue
+        for k in range(inicio[u], inicio[u + 1]): # Arcos de saída de u, contíguos no CSR
+            v = vizinhos[k]
+            nova_dist = dist + pesos[k]
+            if nova_dist < distancias[v]:
+                distancias[v] = nova_dist
+                heappush(pq, (nova_dist, v))
+                if predecessores is not None:
+                    predecessores[v] = u
+    return distancias
+
+def dijkstra_csr_alvos(grafo, origem, posicao_alvo, primeiro_alvo, num_alvos):
+    """
+    Dijkstra sobre o grafo CSR que para assim que todos os nós-alvo são fechados. Os alvos são os
+    nós com `posicao_alvo[j] >= primeiro_alvo`: na matriz simétrica, a linha i só precisa das
+    distâncias para os nós das posições i..k-1 (as demais já estão nas linhas anteriores).
+
+    Args:
+        grafo (GrafoCSR): O grafo em formato CSR.
+        origem (int): Índice denso (em `grafo.nos`) do nó de origem.
+        posicao_alvo (list): Posição de cada índice denso do grafo na matriz simétrica (-1 se não pertence).
+        primeiro_alvo (int): Menor posição considerada alvo.
+        num_alvos (int): Número de alvos (nós com posição >= `primeiro_alvo`).
+
+    Returns:
+        list: Distâncias por índice denso. Apenas as dos alvos (e dos nós já fechados) são definitivas.
+    """
+    inicio, vizinhos, pesos = grafo.inicio, grafo.vizinhos, grafo.pesos
+    heappop, heappush = heapq.heappop, heapq.heappush
+    distancias = [DISTANCIA_INALCANCAVEL] * len(grafo.nos)
+    distancias[origem] = 0
+    alvos_restantes = num_alvos
+    pq = [(0, origem)]
+
+    while pq:
+        dist, u = heappop(pq)
+        if dist > distancias[u]:
+            continue
+        if posicao_alvo[u] >= primeiro_alvo:
+            alvos_restantes -= 1
+            if alvos_restantes == 0: # Todos os alvos fechados: o restante do grafo não interessa
+                break
+        for k in range(inicio[u], inicio[u + 1]):
+            v = vizinhos[k]
+            nova_dist = dist + pesos[k]
+            if nova_dist < distancias[v]:
+                distancias[v] = nova_dist
+                heappush(pq, (nova_dist, v))
+    return distancias
+
+def dijkstra_dial(grafo, origem, custo_maximo=None, predecessores=None):
+    """
+    Dijkstra com a fila de buckets de Dial, para custos de travessia inteiros (como os lidos pelo
+    `leitor_dados`). Os nós com distância provisória d ficam no bucket d % (C + 1), onde C é o maior
+    custo de arco: como toda relaxação a partir da distância d cai em (d, d + C], C + 1 buckets
+    circulares bastam. Os buckets são visitados em ordem crescente de distância, sem heap.
+
+    Args:
+        grafo (GrafoCSR): O grafo em formato CSR (pesos inteiros não negativos).
+        origem (int): Índice denso (em `grafo.nos`) do nó de origem.
+        custo_maximo (int, optional): Maior custo de arco do grafo. Se None, é calculado.
+        predecessores (list, optional): Como em `dijkstra_csr`.
+
+    Returns:
+        list: Distância mais curta da origem para cada índice denso do grafo
+              (DISTANCIA_INALCANCAVEL para nós sem caminho), igual à de `dijkstra_csr`.
+    """
+    inicio, vizinhos, pesos = grafo.inicio, grafo.vizinhos, grafo.pesos
+    if custo_maximo is None:
+        custo_maximo = max(pesos, default=0)
+    num_buckets = custo_maximo + 1
+    buckets = [[] for _ in range(num_buckets)]
+    distancias = [DISTANCIA_INALCANCAVEL] * len(grafo.nos)
+    distancias[origem] = 0
+    buckets[0].append(origem)
+
+    dist = 0 # Distância do bucket atual
+    maior_pendente = 0 # Maior distância provisória já enfileirada: quando dist a ultrapassa, não há mais nós
+    while dist <= maior_pendente:
+        posicao = dist % num_buckets
+        bucket = buckets[posicao]
+        if bucket:
+            buckets[posicao] = [] # Relaxações caem sempre em outros buckets (custos em 1..C, ou 0 tratado abaixo)
+            for u in bucket:
+                if distancias[u] != dist: # Entrada obsoleta: o nó foi reinserido com distância menor
+                    continue
+                for k in range(inicio[u], inicio[u + 1]):
+                    v = vizinhos[k]
+                    nova_dist = dist + pesos[k]
+                    if nova_dist < distancias[v]:
+                        distancias[v] = nova_dist
+                        if predecessores is not None:
+                            predecessores[v] = u
+                        if nova_dist == dist:
+                            bucket.append(v) # Arco de custo zero: o nó entra no bucket que está sendo percorrido
+                        else:
+                            buckets[nova_dist % num_buckets].append(v)
+                            if nova_dist > maior_pendente:
+                                maior_pendente = nova_dist
+        dist += 1
+    return distancias
+
+def _funcao_dijkstra(grafo, fila):
+    """
+    Retorna a função (origem, predecessores) -> linha de distâncias (índices densos) para a fila de
+    prioridade pedida.
+    """
+    if fila == 'dial':
+        custo_maximo = max(grafo.pesos, default=0)
+        if any(not isinstance(peso, int) or peso < 0 for peso in grafo.pesos):
+            raise ValueError("A fila de Dial requer custos de travessia inteiros e não negativos.")
+        return lambda origem, predecessores=None: dijkstra_dial(grafo, origem, custo_maximo, predecessores)
+    return lambda origem, predecessores=None: dijkstra_csr(grafo, origem, predecessores)
+
+def _funcao_dijkstra_simetrica(grafo, fila, nos, num_comuns):
+    """
+    Como `_funcao_dijkstra`, para as linhas da matriz simétrica sobre `nos` (ver `ordem_matriz_simetrica`).
+    Com a fila heap, o Dijkstra da linha i (i < num_comuns) para ao fechar os nós das posições
+    i..k-1, as únicas gravadas nessa linha; as demais linhas usam o Dijkstra completo.
+    """
+    if fila == 'dial':
+        return _funcao_dijkstra(grafo, fila)
+    posicao_alvo = [-1] * len(grafo.nos)
+    for posicao, no in enumerate(nos):
+        posicao_alvo[grafo.indice_no[no]] = posicao
+    num_nos = len(nos)
+
+    def dijkstra(origem, predecessores=None):
+        posicao = posicao_alvo[origem]
+        if posicao < num_comuns:
+            return dijkstra_csr_alvos(grafo, origem, posicao_alvo, posicao, num_nos - posicao)
+        return dijkstra_csr(grafo, origem)
+    return dijkstra
+
+def grafo_simetrico(traversal_costs):
+    """
+    Verifica se o grafo é não direcionado: todo arco (u, v) tem o reverso (v, u) com o mesmo custo
+    (é o caso das instâncias só com arestas, como as DI-NEARP, e de arcos que vêm sempre aos pares).
+
+    Args:
+        traversal_costs (dict): Dicionário de custos de travessia (chave: (u, v), valor: custo).
+
+    Returns:
+        bool: True se a matriz de distâncias é simétrica.
+    """
+    return all(traversal_costs.get((v, u)) == custo for (u, v), custo in traversal_costs.items())
+
+def ordem_matriz_simetrica(grafo, origens, destinos):
+    """
+    Ordena os nós da matriz simétrica e escolhe as linhas que precisam de Dijkstra. Toda consulta
+    vai de uma origem a um destino, e d(u, v) == d(v, u); a célula {u, v} é gravada pela linha do
+    nó que vem primeiro. A ordem é: nós comuns (origem e destino), depois os exclusivos do lado
+    menor, depois os do lado maior. Os do lado maior só formam pares com nós anteriores e não
+    precisam de Dijkstra, de modo que as linhas calculadas são min(|origens|, |destinos|).
+    Os nós comuns vêm do mais distante ao mais próximo de um nó de referência: as últimas linhas,
+    cujos alvos ficam concentrados ao redor dela, param o Dijkstra mais cedo.
+
+    Args:
+        grafo (GrafoCSR): O grafo (não direcionado) em formato CSR.
+        origens (list): Nós de origem das consultas.
+        destinos (list): Nós de destino das consultas.
+
+    Returns:
+        tuple: (nos (list): ordem dos nós da matriz, num_comuns (int): quantos nós comuns abrem a ordem,
+                linhas (list): nós cujas linhas são calculadas, o início de `nos`).
+    """
+    conjunto_origens, conjunto_destinos = set(origens), set(destinos)
+    comuns = conjunto_origens & conjunto_destinos
+    exclusivos = sorted((sorted(conjunto_origens - comuns), sorted(conjunto_destinos - comuns)), key=len)
+    if comuns:
+        distancias = dijkstra_csr(grafo, grafo.indice_no[min(comuns)])
+        comuns = sorted(comuns, key=lambda no: (-distancias[grafo.indice_no[no]], no))
+    nos = list(comuns) + exclusivos[0] + exclusivos[1]
+    return nos, len(comuns), nos[:len(comuns) + len(exclusivos[0])]
+
+def _nova_matriz(origens, destinos, simetrica, buffer=None):
+    """Cria a matriz de distâncias do APSP: triangular (sobre `destinos`) ou retangular."""
+    if simetrica:
+        return MatrizDistanciasSimetrica(destinos, buffer=buffer)
+    return MatrizDistancias(origens, buffer=buffer, nos_destino=destinos)
+
+def _preencher_linha(matriz, grafo, dijkstra, no_origem, indices_destino):
+    """Executa o Dijkstra de uma origem e grava a linha de distâncias (e de predecessores, se houver)."""
+    predecessores = None if matriz.predecessores is None else [-1] * len(grafo.nos)
+    distancias = dijkstra(grafo.indice_no[no_origem], predecessores)
+    matriz.definir_linha_densa(no_origem, distancias, indices_destino)
+    if predecessores is not None:
+        matriz.predecessores.definir_linha(no_origem, predecessores)
+
+# --- Backend de processos: estado e funções executadas dentro de cada processo trabalhador ---
+
+_estado_worker = None # (memórias compartilhadas, matriz, grafo CSR, índices das colunas, Dijkstra) do processo trabalhador atual
+
+def _inicializar_worker_apsp(nome_memoria, grafo, origens, destinos, fila, nome_memoria_predecessores=None,
+                            num_comuns=None):
+    """
+    Executada uma única vez em cada processo trabalhador: recebe o grafo CSR (enviado apenas uma vez)
+    e se conecta à memória compartilhada onde as linhas da matriz APSP serão escritas.
+    """
+    global _estado_worker
+    memorias = [shared_memory.SharedMemory(name=nome_memoria)]
+    matriz = _nova_matriz(origens, destinos, num_comuns is not None, buffer=memorias[0].buf)
+    if nome_memoria_predecessores is not None:
+        memorias.append(shared_memory.SharedMemory(name=nome_memoria_predecessores))
+        matriz.predecessores = MatrizPredecessores(origens, grafo.nos, buffer=memorias[1].buf)
+    if num_comuns is not None:
+        dijkstra = _funcao_dijkstra_simetrica(grafo, fila, destinos, num_comuns)
+    else:
+        dijkstra = _funcao_dijkstra(grafo, fila)
+    _estado_worker = (memorias, matriz, grafo, [grafo.indice_no[no] for no in destinos], dijkstra)
+
+def _calcular_linhas_worker_apsp(origens):
+    """
+    Executa Dijkstra para um lote de nós de origem e escreve cada linha diretamente na
+    matriz compartilhada. Nada além do número de linhas calculadas volta para o processo principal.
+    """
+    _, matriz, grafo, indices_destino, dijkstra = _estado_worker
+    for origem in origens:
+        _preencher_linha(matriz, grafo, dijkstra, origem, indices_destino)
+    return len(origens)
+
+def _apsp_processos(grafo, num_workers, origens, destinos, fila='heap', com_predecessores=False, num_comuns=None):
+    """
+    Calcula o APSP distribuindo os nós de origem entre processos (contornando o GIL).
+    Os processos escrevem as linhas em um bloco de memória compartilhada (e, com predecessores,
+    em um segundo bloco de int32), que ao final é copiado para a matriz devolvida.
+    Com `num_comuns` (ver `ordem_matriz_simetrica`), a matriz é triangular sobre `destinos` e
+    `origens` são as linhas a calcular.
+    """
+    n = len(origens)
+    simetrica = num_comuns is not None
+    num_celulas = MatrizDistanciasSimetrica.num_celulas(len(destinos)) if simetrica else n * len(destinos)
+    memorias = [shared_memory.SharedMemory(create=True, size=max(num_celulas * 8, 1))]
+    if com_predecessores:
+        memorias.append(shared_memory.SharedMemory(create=True, size=max(n * len(grafo.nos) * 4, 1)))
+    try:
+        short_paths_matrix = _nova_matriz(origens, destinos, simetrica, buffer=memorias[0].buf)
+        short_paths_matrix.preencher_inalcancavel()
+        if com_predecessores:
+            short_paths_matrix.predecessores = MatrizPredecessores(origens, grafo.nos, buffer=memorias[1].buf)
+
+        # Divide os nós de origem em lotes (alguns por processo) para equilibrar a carga
+        tamanho_lote = max(1, n // (num_workers * 4))
+        lotes = [origens[i:i + tamanho_lote] for i in range(0, n, tamanho_lote)]
+
+        # O grafo CSR é enviado apenas uma vez para cada processo (via initializer)
+        nome_memoria_predecessores = memorias[1].name if com_predecessores else None
+        with Pool(processes=num_workers, initializer=_inicializar_worker_apsp,
+                  initargs=(memorias[0].name, grafo, origens, destinos, fila, nome_memoria_predecessores,
+                            num_comuns)) as pool:
+            for _ in pool.imap_unordered(_calcular_linhas_worker_apsp, lotes):
+                pass
+
+        short_paths_matrix.copiar_para_memoria_propria() # Libera a memória compartilhada
+        if com_predecessores:
+            short_paths_matrix.predecessores.copiar_para_memoria_propria()
+    finally:
+        for memoria in memorias:
+            memoria.close()
+            memoria.unlink()
+    return short_paths_matrix
+
+def floyd_warshall_vetorizado(all_graph_nodes, traversal_costs, origens=None, destinos=None):
+    """
+    Calcula o APSP com o algoritmo de Floyd-Warshall vetorizado em NumPy: para cada pivô k,
+    a matriz inteira é atualizada de uma vez com `minimum(dist, dist[:, k] + dist[k, :])`.
+    Indicado para grafos pequenos e densos, onde |V| Dijkstras em Python custam mais.
+
+    Args:
+        all_graph_nodes (list): Lista de todos os nós do grafo.
+        traversal_costs (dict): Dicionário de custos de travessia (chave: (u, v), valor: custo).
+        origens (list, optional): Nós de origem a manter na matriz devolvida (padrão: todos).
+        destinos (list, optional): Nós de destino a manter na matriz devolvida (padrão: todos).
+
+    Returns:
+        MatrizDistancias: A matriz com as distâncias mais curtas entre os pares pedidos.
+    """
+    if np is None:
+        raise ImportError("O Floyd-Warshall vetorizado requer o pacote 'numpy'.")
+
+    n = len(all_graph_nodes)
+    indice_no = {no: idx for idx, no in enumerate(all_graph_nodes)}
+
+    # Matriz de custos diretos: sentinela onde não há aresta/arco, zero na diagonal
+    dist = np.full((n, n), DISTANCIA_INALCANCAVEL, dtype=np.int64)
+    for (u, v), custo in traversal_costs.items():
+        if u in indice_no and v in indice_no:
+            dist[indice_no[u], indice_no[v]] = custo
+    np.fill_diagonal(dist, 0)
+
+    # Um pivô por vez: a soma de dois sentinelas ainda cabe em int64, então não há overflow
+    for k in range(n):
+        np.minimum(dist, dist[:, k, None] + dist[k, None, :], out=dist)
+
+    # O Floyd-Warshall sempre calcula a matriz completa; no modo restrito, recorta as linhas/colunas pedidas
+    origens = all_graph_nodes if origens is None else origens
+    destinos = all_graph_nodes if destinos is None else destinos
+    if origens is not all_graph_nodes or destinos is not all_graph_nodes:
+        dist = dist[np.ix_([indice_no[no] for no in origens], [indice_no[no] for no in destinos])]
+
+    short_paths_matrix = MatrizDistancias(origens, nos_destino=destinos)
+    short_paths_matrix.carregar_bytes(np.ascontiguousarray(dist).tobytes())
+    return short_paths_matrix
+
+def escolher_metodo_apsp(num_nos, num_arcos, num_origens=None):
+    """
+    Escolhe o método de APSP mais barato para o grafo, comparando o custo estimado dos
+    Dijkstras em Python (um por origem) com o de um Floyd-Warshall vetorizado (O(|V|^3) em NumPy).
+
+    Args:
+        num_nos (int): Número de nós do grafo.
+        num_arcos (int): Número de pares (u, v) com custo de travessia direto.
+        num_origens (int, optional): Número de origens pedidas (modo restrito). Padrão: todos os nós.
+
+    Returns:
+        str: 'floyd_warshall' ou 'dijkstra'. Sem NumPy instalado, sempre 'dijkstra'.
+    """
+    if np is None or num_nos == 0:
+        return 'dijkstra'
+    if num_origens is None:
+        num_origens = num_nos
+    custo_dijkstra = num_origens * (num_nos + num_arcos) * CUSTO_RELAXACAO_DIJKSTRA
+    custo_floyd = num_nos * (num_nos * num_nos * CUSTO_CELULA_FLOYD + CUSTO_PIVO_FLOYD)
+    return 'floyd_warshall' if custo_floyd < custo_dijkstra else 'dijkstra'
+
+def extremos_servicos(servicos, depot_node):
+    """
+    Determina os únicos nós de origem e de destino que o solver consulta na matriz APSP.
+    Toda consulta parte do depósito ou do fim ('to') de um serviço e chega ao depósito ou
+    ao início ('from') de um serviço.
+
+    Args:
+        servicos (iterable): Objetos de serviço (dicionários com as chaves 'from' e 'to').
+        depot_node (int): O nó do depósito.
+
+    Returns:
+        tuple: (origens (list), destinos (list)), ambas ordenadas e incluindo o depósito.
+    """
+    origens = {depot_node}
+    destinos = {depot_node}
+    for service_obj in servicos:
+        origens.add(service_obj['to'])
+        destinos.add(service_obj['from'])
+    return sorted(origens), sorted(destinos)
+
+def calcular_apsp(all_graph_nodes, graph_adj, traversal_costs, backend='auto', num_workers=None,
+                  origens=None, destinos=None, grafo=None, fila='heap', com_predecessores=False, simetrica='auto'):
+    """
+    Calcula o All-Pairs Shortest Path (APSP) executando Dijkstra a partir de cada nó
+    ou, para grafos pequenos e densos, o Floyd-Warshall vetorizado.
+    Com `origens`/`destinos` (ver `extremos_servicos`), calcula apenas as linhas e colunas
+    que o solver consulta, executando Dijkstra somente a partir das origens pedidas.
+    Os backends de Dijkstra percorrem o grafo em formato CSR (ver `GrafoCSR` e `dijkstra_csr`).
+
+    Args:
+        all_graph_nodes (list): Lista de todos os nós do grafo.
+        graph_adj (defaultdict): Lista de adjacência do grafo.
+        traversal_costs (dict): Dicionário de custos de travessia (chave: (u, v), valor: custo).
+        backend (str): 'auto' (escolhe pelo tamanho e densidade do grafo), 'sequencial',
+                       'threads' (ThreadPoolExecutor), 'processos' (Pool de processos escrevendo em
+                       memória compartilhada) ou 'floyd_warshall' (vetorizado, requer NumPy).
+        num_workers (int, optional): Número de threads/processos. Se None, usa o número de CPUs.
+        origens (list, optional): Nós de origem (linhas) a calcular. Padrão: todos os nós.
+        destinos (list, optional): Nós de destino (colunas) a armazenar. Padrão: todos os nós.
+        grafo (GrafoCSR, optional): O grafo já convertido para CSR. Se None, é construído a partir
+                                    de `all_graph_nodes` e `traversal_costs`.
+        fila (str): Fila de prioridade dos Dijkstras: 'heap' (padrão) ou 'dial' (buckets de Dial,
+                    requer custos inteiros). Não se aplica ao Floyd-Warshall.
+        com_predecessores (bool): Se True, guarda também a árvore de caminhos mínimos de cada origem
+                                  (int32 por nó do grafo) em `matriz.predecessores`, permitindo
+                                  reconstruir os caminhos com `matriz.caminho(u, v)`. Usa sempre Dijkstra.
+        simetrica (str | bool): 'auto' (padrão) usa a matriz triangular (`MatrizDistanciasSimetrica`)
+                                quando o grafo é não direcionado (ver `grafo_simetrico`) e origens e
+                                destinos são os mesmos nós; True a exige (também no modo restrito) e
+                                False a desativa. Na forma triangular, os nós da matriz são a união de
+                                origens e destinos (ver `ordem_matriz_simetrica`). Não se aplica com
+                                predecessores nem ao Floyd-Warshall.
+
+    Returns:
+        MatrizDistancias: A matriz com as distâncias mais curtas entre os pares pedidos.
+    """
+    if backend not in BACKENDS_APSP:
+        raise ValueError(f"Backend de APSP desconhecido: '{backend}'. Opções: {', '.join(BACKENDS_APSP)}")
+    if fila not in FILAS_DIJKSTRA:
+        raise ValueError(f"Fila de prioridade desconhecida: '{fila}'. Opções: {', '.join(FILAS_DIJKSTRA)}")
+
+    if simetrica not in ('auto', True, False):
+        raise ValueError(f"Opção de simetria inválida: {simetrica!r}. Opções: 'auto', True, False")
+
+    if backend == 'floyd_warshall' and com_predecessores:
+        raise ValueError("O Floyd-Warshall vetorizado não guarda predecessores; use um backend de Dijkstra.")
+
+    if origens is None:
+        origens = all_graph_nodes
+    if destinos is None:
+        destinos = all_graph_nodes
+
+    # Matriz triangular: apenas para grafos não direcionados, sem predecessores e com Dijkstra.
+    # No modo 'auto', só quando origens e destinos coincidem (ex: APSP completo), caso em que ela guarda
+    # metade das células; no APSP restrito, a união dos extremos economiza pouco e cada consulta fica
+    # um pouco mais cara (troca de índices), o que pesa na busca local.
+    usar_simetrica = False
+    if simetrica is True or (simetrica == 'auto' and (origens is destinos or set(origens) == set(destinos))):
+        usar_simetrica = not com_predecessores and backend != 'floyd_warshall' and grafo_simetrico(traversal_costs)
+        if simetrica is True and not usar_simetrica:
+            raise ValueError("A matriz simétrica requer um grafo não direcionado (todo arco com o reverso de mesmo "
+                             "custo), sem predecessores e com Dijkstra.")
+
+    if backend == 'auto':
+        # Na forma triangular, as linhas calculadas são min(|origens|, |destinos|)
+        num_origens = min(len(origens), len(destinos)) if usar_simetrica else len(origens)
+        if not com_predecessores and escolher_metodo_apsp(len(all_graph_nodes), len(traversal_costs), num_origens) == 'floyd_warshall':
+            backend = 'floyd_warshall'
+            usar_simetrica = False
+        else:
+            backend = 'processos'
+
+    if backend == 'floyd_warshall':
+        print("  Calculando APSP com Floyd-Warshall vetorizado...")
+        return floyd_warshall_vetorizado(all_graph_nodes, traversal_costs, origens, destinos)
+
+    if grafo is None:
+        grafo = GrafoCSR(all_graph_nodes, traversal_costs)
+    num_comuns = None
+    if usar_simetrica:
+        # Os nós da matriz (colunas) passam a ser a união de origens e destinos, e as linhas calculadas o início deles
+        destinos, num_comuns, origens = ordem_matriz_simetrica(grafo, origens, destinos)
+
+    if num_workers is None:
+        num_workers = os.cpu_count() if os.cpu_count() else 1
+
+    indices_destino = [grafo.indice_no[no] for no in destinos] # Índice denso no grafo de cada coluna
+    if usar_simetrica:
+        dijkstra = _funcao_dijkstra_simetrica(grafo, fila, destinos, num_comuns)
+    else:
+        dijkstra = _funcao_dijkstra(grafo, fila)
+
+    # Sem paralelismo disponível (1 CPU) ou grafo trivial: executa sequencialmente
+    if backend == 'sequencial' or num_workers <= 1 or len(origens) <= 1:
+        print("  Calculando APSP sequencialmente...")
+        short_paths_matrix = _nova_matriz(origens, destinos, usar_simetrica)
+        if com_predecessores:
+            short_paths_matrix.predecessores = MatrizPredecessores(origens, grafo.nos)
+        for start_node in origens:
+            _preencher_linha(short_paths_matrix, grafo, dijkstra, start_node, indices_destino)
+        return short_paths_matrix
+
+    if backend == 'processos':
+        print(f"  Paralelizando cálculo APSP com {num_workers} processos...")
+        return _apsp_processos(grafo, num_workers, origens, destinos, fila, com_predecessores, num_comuns)
+
+    # Backend 'threads': limitado pelo GIL, mantido para comparação
+    print(f"  Paralelizando cálculo APSP com {num_workers} threads...")
+    short_paths_matrix = _nova_matriz(origens, destinos, usar_simetrica)
+    if com_predecessores:
+        short_paths_matrix.predecessores = MatrizPredecessores(origens, grafo.nos)
+
+    # Função auxiliar para ThreadPoolExecutor: executa Dijkstra para um nó de origem e grava a sua linha
+    # (cada thread escreve apenas na fatia da sua origem).
+    def run_dijkstra_for_node(start_node_for_worker):
+        _preencher_linha(short_paths_matrix, grafo, dijkstra, start_node_for_worker, indices_destino)
+
+    with ThreadPoolExecutor(max_workers=num_workers) as executor:
+        for _ in executor.map(run_dijkstra_for_node, origens):
+            pass
+    return short_paths_matrix
@@ -0,0 +1,673 @@
+import heapq # Importa heapq para as listas de candidatos dos construtivos e a fila de economias do Clarke-Wright
+import os # Importa os para obter o número de CPUs (processos do portfólio)
+import random # Importa random para o vizinho mais próximo aleatorizado (sementes fixas)
+import time # Importa time para medir o tempo de cada variante do portfólio
+from collections import deque # Importa deque para a janela de predecessores do Split
+from itertools import compress, islice, repeat # Filtra os serviços pendentes e limita os candidatos sem laço em Python
+from multiprocessing import Pool # Para executar as variantes do portfólio em processos
+from operator import add, le, sub # Soma/subtração/comparação elemento a elemento das linhas de custo
+
+from matriz_servicos import INDICE_DEPOSITO
+
+try:
+    import numpy as np # Dependência opcional: necessária apenas para o modo vetorizado
+except ImportError:
+    np = None
+
+# Modos do construtivo "Nearest Neighbor modificado" das Etapas 2 e 3 (todos geram as mesmas rotas).
+# 'escalar' é o laço original das Etapas 2 e 3; os demais usam as funções deste módulo.
+MODOS_VIZINHO_MAIS_PROXIMO = ('escalar', 'indexado', 'vetorizado')
+# Modos aceitos por `modo_construtivo`: os acima, o tour gigante com Split (ver `rotas_tour_gigante_split`),
+# as economias de Clarke-Wright (ver `rotas_savings`) e o portfólio de variantes (ver `rotas_portfolio`)
+MODOS_CONSTRUTIVO = MODOS_VIZINHO_MAIS_PROXIMO + ('split', 'savings', 'portfolio')
+
+def rotas_vizinho_mais_proximo(matriz_servicos, capacidade, servicos_inviaveis=()):
+    """
+    Constrói as rotas com a mesma regra do construtivo das Etapas 2 e 3: cada rota começa no depósito
+    e, enquanto houver serviço pendente que caiba na capacidade restante, segue para o que minimiza
+    d(local atual, início) + custo de serviço + d(fim, depósito), com empate decidido pelo menor ID.
+    O primeiro serviço de cada rota é a mesma consulta feita a partir do depósito.
+
+    Em vez de percorrer todos os serviços a cada passo, cada local (depósito ou fim de serviço) tem a
+    lista dos seus `CANDIDATOS_POR_LOCAL` melhores serviços pendentes por esse critério, montada na
+    primeira consulta a partir dele, com descarte preguiçoso dos já atendidos (ver `_ListasCandidatos`).
+    A consulta normalmente para nos primeiros candidatos; só percorre todos os pendentes quando nenhum
+    candidato da lista cabe na capacidade restante.
+
+    Args:
+        matriz_servicos (MatrizServicos): Custos serviço -> serviço indexados pelo ID (depósito = 0).
+        capacidade (int): Capacidade do veículo.
+        servicos_inviaveis (dict | set): IDs dos serviços que ficam fora da solução
+                                         (ver `identificar_servicos_inviaveis`).
+
+    Returns:
+        list: Uma lista de IDs de serviço por rota, na ordem de atendimento.
+    """
+    n, custos = matriz_servicos.n, matriz_servicos.custos
+    retorno = custos[INDICE_DEPOSITO::n] # retorno[s] = d(fim de s, depósito)
+
+    def criterios(local):
+        # Critério a partir do local: célula da matriz (deslocamento + custo de serviço) + retorno
+        base = local * n
+        return list(map(add, custos[base:base + n], retorno))
+    pendente = _pendentes_iniciais(matriz_servicos, servicos_inviaveis)
+    listas = _ListasCandidatos(criterios, pendente, matriz_servicos)
+
+    def escolher(local, carga):
+        return next(listas.candidatos(local, capacidade - carga), None)
+
+    return _construir_rotas(matriz_servicos, pendente, escolher)
+
+def rotas_vizinho_mais_proximo_vetorizado(matriz_servicos, capacidade, servicos_inviaveis=()):
+    """
+    Mesma regra e mesmas rotas de `rotas_vizinho_mais_proximo`, com cada passo resolvido por poucas
+    operações vetorizadas do NumPy sobre todos os serviços: a linha de critérios do local atual
+    (montada uma única vez para todos os locais, somando a cada célula o retorno ao depósito), a
+    máscara dos pendentes que cabem na capacidade restante e um argmin, que devolve o primeiro
+    mínimo (o menor ID), como o desempate do laço escalar.
+
+    Args:
+        matriz_servicos (MatrizServicos): Custos serviço -> serviço indexados pelo ID (depósito = 0).
+        capacidade (int): Capacidade do veículo.
+        servicos_inviaveis (dict | set): IDs dos serviços que ficam fora da solução.
+
+    Returns:
+        list: Uma lista de IDs de serviço por rota, na ordem de atendimento.
+    """
+    if np is None:
+        raise ImportError("O construtivo vetorizado requer o pacote 'numpy'.")
+    n = matriz_servicos.n
+    custos = matriz_servicos.como_ndarray()
+    chaves = custos + custos[:, INDICE_DEPOSITO] # chaves[a, s] = custo(a, s) + d(fim de s, depósito)
+    demanda = np.array(matriz_servicos.demanda)
+    pendente = np.ones(n, dtype=bool)
+    pendente[INDICE_DEPOSITO] = False
+    pendente[list(servicos_inviaveis)] = False
+    num_pendentes = int(pendente.sum())
+
+    rotas = []
+    while num_pendentes:
+        rota = []
+        capacidade_livre = capacidade
+        local = INDICE_DEPOSITO
+        while True:
+            candidatos = np.where(pendente & (demanda <= capacidade_livre), chaves[local], np.inf)
+            s = int(candidatos.argmin())
+            if candidatos[s] == np.inf:
+                break # Nenhum pendente cabe na capacidade restante
+            rota.append(s)
+            capacidade_livre -= matriz_servicos.demanda[s]
+            pendente[s] = False
+            num_pendentes -= 1
+            local = s
+        if not rota:
+            break # Nenhum pendente cabe numa rota vazia (não ocorre sem serviços inviáveis)
+        rotas.append(rota)
+    return rotas
+
+def _menores(chave, ids, quantidade):
+    """
+    Os `quantidade` IDs de menor chave, em ordem crescente de chave (empates na ordem de `ids`, que vem
+    em ordem crescente). Equivale a `sorted(ids, key=chave.__getitem__)[:quantidade]`, mas em O(len(ids))
+    no caso esperado: o 4º menor valor de uma amostra (um ID a cada `quantidade`) serve de limite, e só
+    os IDs com chave até ele (cerca de 4 * quantidade) são ordenados. A filtragem usa apenas funções embutidas (map/compress), sem laço em
+    Python; se o limite deixar passar menos de `quantidade` IDs, a ordenação completa resolve.
+    """
+    if len(ids) <= 4 * quantidade:
+        return sorted(ids, key=chave.__getitem__)[:quantidade]
+    valores = list(map(chave.__getitem__, ids))
+    amostra = sorted(valores[::quantidade])
+    limite = amostra[min(3, len(amostra) - 1)]
+    selecionados = list(compress(ids, map(le, valores, repeat(limite))))
+    if len(selecionados) < quantidade:
+        selecionados = ids # Amostra pouco representativa: ordena todos
+    # Os IDs fora da seleção têm chave maior que o limite, e portanto vêm depois de todos os selecionados
+    return sorted(selecionados, key=chave.__getitem__)[:quantidade]
+
+# Tamanho das listas de candidatos de cada local nos construtivos sequenciais (ver `_ListasCandidatos`)
+CANDIDATOS_POR_LOCAL = 32
+
+class _ListasCandidatos:
+    """
+    Listas de candidatos dos construtivos sequenciais: para cada local, os `tamanho` serviços pendentes
+    de menor chave a partir dele (empates na ordem dos IDs), montadas na primeira consulta a partir do
+    nó de fim do local, como as listas de `MatrizServicos.vizinhos`. `chave_linha(local)` devolve a
+    chave de cada serviço (lista de tamanho S + 1) a partir do fim de `local`.
+
+    Como os pendentes só diminuem, a lista, sem os já atendidos (descartados de forma preguiçosa no
+    início dela), continua sendo o começo da ordem dos pendentes. Quando ela se esgota, é montada de
+    novo com os pendentes atuais; quando nenhum dos seus candidatos cabe na capacidade restante, os
+    demais pendentes são percorridos por completo, na mesma ordem. Cada consulta custa O(tamanho) no
+    caso comum, em vez de ordenar ou percorrer todos os S serviços.
+    """
+    __slots__ = ('chave_linha', 'pendente', 'demanda', 'fim', 'tamanho', 'listas')
+
+    def __init__(self, chave_linha, pendente, matriz_servicos, tamanho=CANDIDATOS_POR_LOCAL):
+        self.chave_linha = chave_linha
+        self.pendente = pendente # bytearray compartilhado com o construtivo (1 = não atendido)
+        self.demanda = matriz_servicos.demanda
+        self.fim = matriz_servicos.fim
+        self.tamanho = tamanho
+        self.listas = {} # Nó -> [os `tamanho` melhores pendentes em ordem de chave, posição do primeiro não descartado]
+
+    def candidatos(self, local, capacidade_livre):
+        """Gera, em ordem crescente de chave, os serviços pendentes que cabem em `capacidade_livre`."""
+        pendente, demanda = self.pendente, self.demanda
+        chave = None
+        entrada = self.listas.get(self.fim[local])
+        if entrada is not None:
+            lista, posicao = entrada
+            while posicao < len(lista) and not pendente[lista[posicao]]:
+                posicao += 1 # Descarta de vez os serviços já atendidos no início da lista
+            entrada[1] = posicao
+        if entrada is None or entrada[1] == len(entrada[0]):
+            # Primeira consulta ou lista esgotada: os melhores entre os pendentes atuais
+            chave = self.chave_linha(local)
+            entrada = self.listas[self.fim[local]] = [
+                _menores(chave, list(compress(range(len(pendente)), pendente)), self.tamanho), 0]
+        lista, posicao = entrada
+        for k in range(posicao, len(lista)):
+            s = lista[k]
+            if pendente[s] and demanda[s] <= capacidade_livre:
+                yield s
+        if len(lista) < self.tamanho:
+            return # A lista tinha todos os pendentes quando foi montada
+
+        # Candidatos da lista esgotados (em geral, nenhum cabe na capacidade restante): os demais pendentes
+        # que cabem vêm todos depois deles na ordem. O filtro de capacidade não tem laço em Python, e
+        # perto do fim da rota costuma não sobrar ninguém; os que sobram saem de um heap (chave, ID)
+        ids = list(compress(range(len(pendente)), pendente))
+        na_lista = set(lista)
+        restantes = [s for s in compress(ids, map(le, map(demanda.__getitem__, ids), repeat(capacidade_livre)))
+                     if s not in na_lista]
+        if not restantes:
+            return
+        if chave is None:
+            chave = self.chave_linha(local)
+        restantes = [(chave[s], s) for s in restantes]
+        heapq.heapify(restantes)
+        while restantes:
+            yield heapq.heappop(restantes)[1]
+
+def _pendentes_iniciais(matriz_servicos, servicos_inviaveis):
+    """Marcação dos serviços a atender (1 = pendente), sem o depósito e os serviços inviáveis."""
+    pendente = bytearray([1]) * matriz_servicos.n
+    pendente[INDICE_DEPOSITO] = 0
+    for service_id in servicos_inviaveis:
+        pendente[service_id] = 0
+    return pendente
+
+def _construir_rotas(matriz_servicos, pendente, escolher):
+    """
+    Laço comum dos construtivos sequenciais: abre uma rota no depósito e acrescenta o serviço devolvido
+    por `escolher(local, carga)` (ou None para fechar a rota) até atender todos os pendentes.
+
+    Returns:
+        list: Uma lista de IDs de serviço por rota, na ordem de atendimento.
+    """
+    demanda = matriz_servicos.demanda
+    num_pendentes = sum(pendente)
+
+    rotas = []
+    while num_pendentes:
+        rota = []
+        carga = 0
+        local = INDICE_DEPOSITO
+        while True:
+            s = escolher(local, carga)
+            if s is None:
+                break
+            rota.append(s)
+            carga += demanda[s]
+            pendente[s] = 0
+            num_pendentes -= 1
+            local = s
+        if not rota:
+            break # Nenhum pendente cabe numa rota vazia (não ocorre sem serviços inviáveis)
+        rotas.append(rota)
+    return rotas
+
+# Critérios de desempate do path-scanning entre os candidatos de menor deslocamento (menor valor vence)
+CRITERIOS_PATH_SCANNING = ('max_retorno', 'min_retorno', 'max_razao', 'min_razao', 'misto')
+
+def rotas_path_scanning(matriz_servicos, capacidade, servicos_inviaveis=(), criterio='max_retorno'):
+    """
+    Path-scanning (Golden, DeArmon e Baker): a partir do local atual, segue para o serviço pendente de
+    menor deslocamento que cabe na capacidade restante. Entre os empatados nesse deslocamento, decide
+    o critério:
+      - 'max_retorno' / 'min_retorno': maior / menor distância do fim do serviço ao depósito;
+      - 'max_razao' / 'min_razao': maior / menor razão demanda / custo de serviço;
+      - 'misto': 'max_retorno' enquanto a carga não passa da metade da capacidade, depois 'min_retorno'.
+    Persistindo o empate, vence o menor ID.
+
+    Args:
+        matriz_servicos (MatrizServicos): Custos serviço -> serviço indexados pelo ID (depósito = 0).
+        capacidade (int): Capacidade do veículo.
+        servicos_inviaveis (dict | set): IDs dos serviços que ficam fora da solução.
+        criterio (str): Um dos `CRITERIOS_PATH_SCANNING`.
+
+    Returns:
+        list: Uma lista de IDs de serviço por rota, na ordem de atendimento.
+    """
+    if criterio not in CRITERIOS_PATH_SCANNING:
+        raise ValueError(f"Critério do path-scanning desconhecido: '{criterio}'. Opções: {', '.join(CRITERIOS_PATH_SCANNING)}")
+    n, custos, custo_servico = matriz_servicos.n, matriz_servicos.custos, matriz_servicos.custo_servico
+    retorno = custos[INDICE_DEPOSITO::n]
+    razao = [demanda / custo if custo else float('inf') for demanda, custo in zip(matriz_servicos.demanda, custo_servico)]
+    # Chave de cada critério (menor vence); 'misto' escolhe entre as duas primeiras conforme a carga
+    chaves_criterio = {'max_retorno': [-r for r in retorno], 'min_retorno': retorno,
+                       'max_razao': [-r for r in razao], 'min_razao': razao}
+
+    def deslocamentos(local):
+        base = local * n
+        return list(map(sub, custos[base:base + n], custo_servico))
+    pendente = _pendentes_iniciais(matriz_servicos, servicos_inviaveis)
+    listas = _ListasCandidatos(deslocamentos, pendente, matriz_servicos)
+
+    def escolher(local, carga):
+        base = local * n
+        empatados = []
+        for s in listas.candidatos(local, capacidade - carga):
+            deslocamento = custos[base + s] - custo_servico[s]
+            if empatados and deslocamento != menor:
+                break # A lista está em ordem de deslocamento: acabaram os empatados
+            menor = deslocamento
+            empatados.append(s)
+        if not empatados:
+            return None
+        nome = criterio
+        if criterio == 'misto':
+            nome = 'max_retorno' if carga <= capacidade / 2 else 'min_retorno'
+        chave = chaves_criterio[nome]
+        return min(empatados, key=lambda s: (chave[s], s))
+
+    return _construir_rotas(matriz_servicos, pendente, escolher)
+
+def rotas_vizinho_aleatorio(matriz_servicos, capacidade, servicos_inviaveis=(), k=3, semente=0):
+    """
+    Vizinho mais próximo aleatorizado: com o critério de `rotas_vizinho_mais_proximo`, sorteia o
+    próximo serviço entre os `k` melhores candidatos que cabem na capacidade restante. A semente fixa
+    torna o resultado reprodutível.
+
+    Args:
+        matriz_servicos (MatrizServicos): Custos serviço -> serviço indexados pelo ID (depósito = 0).
+        capacidade (int): Capacidade do veículo.
+        servicos_inviaveis (dict | set): IDs dos serviços que ficam fora da solução.
+        k (int): Número de candidatos sorteados a cada passo.
+        semente (int): Semente do gerador de números aleatórios.
+
+    Returns:
+        list: Uma lista de IDs de serviço por rota, na ordem de atendimento.
+    """
+    n, custos = matriz_servicos.n, matriz_servicos.custos
+    retorno = custos[INDICE_DEPOSITO::n]
+    gerador = random.Random(semente)
+
+    def criterios(local):
+        base = local * n
+        return list(map(add, custos[base:base + n], retorno))
+    pendente = _pendentes_iniciais(matriz_servicos, servicos_inviaveis)
+    listas = _ListasCandidatos(criterios, pendente, matriz_servicos)
+
+    def escolher(local, carga):
+        melhores = list(islice(listas.candidatos(local, capacidade - carga), k))
+        return gerador.choice(melhores) if melhores else None
+
+    return _construir_rotas(matriz_servicos, pendente, escolher)
+
+def rotas_preenchimento_capacidade(matriz_servicos, capacidade, servicos_inviaveis=()):
+    """
+    Construtivo que prioriza encher o veículo: segue para o serviço pendente que cabe na capacidade
+    restante com o menor deslocamento por unidade de demanda (serviços sem demanda contam como uma
+    unidade), de modo que serviços de demanda alta e próximos entram primeiro. Empate: menor ID.
+
+    Args:
+        matriz_servicos (MatrizServicos): Custos serviço -> serviço indexados pelo ID (depósito = 0).
+        capacidade (int): Capacidade do veículo.
+        servicos_inviaveis (dict | set): IDs dos serviços que ficam fora da solução.
+
+    Returns:
+        list: Uma lista de IDs de serviço por rota, na ordem de atendimento.
+    """
+    n, custos, custo_servico = matriz_servicos.n, matriz_servicos.custos, matriz_servicos.custo_servico
+    unidades = [max(demanda, 1) for demanda in matriz_servicos.demanda]
+
+    def deslocamento_por_unidade(local):
+        base = local * n
+        return [(custo - servico) / unidade
+                for custo, servico, unidade in zip(custos[base:base + n], custo_servico, unidades)]
+    pendente = _pendentes_iniciais(matriz_servicos, servicos_inviaveis)
+    listas = _ListasCandidatos(deslocamento_por_unidade, pendente, matriz_servicos)
+
+    def escolher(local, carga):
+        return next(listas.candidatos(local, capacidade - carga), None)
+
+    return _construir_rotas(matriz_servicos, pendente, escolher)
+
+def tour_gigante(matriz_servicos, servicos_inviaveis=()):
+    """
+    Tour gigante (sem capacidade) sobre todos os serviços viáveis: a partir do depósito, segue sempre
+    para o serviço pendente de menor deslocamento (empate: menor ID).
+
+    Args:
+        matriz_servicos (MatrizServicos): Custos serviço -> serviço indexados pelo ID (depósito = 0).
+        servicos_inviaveis (dict | set): IDs dos serviços que ficam fora do tour.
+
+    Returns:
+        list: Os IDs dos serviços na ordem do tour.
+    """
+    n, custos, custo_servico = matriz_servicos.n, matriz_servicos.custos, matriz_servicos.custo_servico
+
+    def deslocamentos(local):
+        base = local * n
+        return list(map(sub, custos[base:base + n], custo_servico))
+    pendente = _pendentes_iniciais(matriz_servicos, servicos_inviaveis)
+    listas = _ListasCandidatos(deslocamentos, pendente, matriz_servicos)
+
+    tour = []
+    local = INDICE_DEPOSITO
+    while True:
+        s = next(listas.candidatos(local, float('inf')), None)
+        if s is None:
+            return tour
+        tour.append(s)
+        pendente[s] = 0
+        local = s
+
+def split_linear(tour, matriz_servicos, capacidade):
+    """
+    Split em tempo linear (Vidal, 2016): divide o tour gigante, sem mudar a ordem dos serviços, nas
+    rotas de custo total mínimo que respeitam a capacidade. Com p[i] o custo ótimo dos i primeiros
+    serviços do tour, a rota com os serviços i+1..j custa
+        d(depósito, t[i+1]) + D[j] - D[i+1] + d(t[j], depósito),
+    em que D são as somas de prefixo das células entre serviços consecutivos do tour. O termo que
+    depende de i, f(i) = p[i] + d(depósito, t[i+1]) - D[i+1], é minimizado numa janela deslizante
+    (a demanda de i+1..j não pode passar da capacidade), mantida numa deque com f crescente: cada
+    índice entra e sai uma única vez.
+
+    Args:
+        tour (list): IDs dos serviços na ordem do tour gigante (cada um cabe sozinho num veículo).
+        matriz_servicos (MatrizServicos): Custos serviço -> serviço indexados pelo ID (depósito = 0).
+        capacidade (int): Capacidade do veículo.
+
+    Returns:
+        tuple: (custo total (int), rotas (list)), com uma lista de IDs de serviço por rota.
+    """
+    n, custos, demanda = matriz_servicos.n, matriz_servicos.custos, matriz_servicos.demanda
+    num_servicos = len(tour)
+    if not num_servicos:
+        return 0, []
+
+    # Somas de prefixo: carga[k] = demanda de t[1..k]; percurso[k] = células de t[1] até t[k] (D acima)
+    carga = [0] * (num_servicos + 1)
+    percurso = [0] * (num_servicos + 1)
+    for k in range(1, num_servicos + 1):
+        carga[k] = carga[k - 1] + demanda[tour[k - 1]]
+        if k > 1:
+            percurso[k] = percurso[k - 1] + custos[tour[k - 2] * n + tour[k - 1]]
+
+    custo_otimo = [0] * (num_servicos + 1)  # p[i]
+    predecessor = [0] * (num_servicos + 1)  # Início (exclusivo) da última rota na divisão ótima de 1..j
+    f = [0] * (num_servicos + 1)
+    f[0] = custos[INDICE_DEPOSITO * n + tour[0]] - percurso[1]
+    janela = deque([0]) # Candidatos i em ordem crescente de índice e de f
+    for j in range(1, num_servicos + 1):
+        while carga[j] - carga[janela[0]] > capacidade:
+            janela.popleft() # Rota i+1..j excede a capacidade (e continuará excedendo para j maiores)
+        i = janela[0]
+        custo_otimo[j] = f[i] + percurso[j] + custos[tour[j - 1] * n + INDICE_DEPOSITO]
+        predecessor[j] = i
+        if j < num_servicos:
+            f[j] = custo_otimo[j] + custos[INDICE_DEPOSITO * n + tour[j]] - percurso[j + 1]
+            while janela and f[janela[-1]] >= f[j]:
+                janela.pop() # Dominado: j entrou depois, sai da janela depois e não é pior
+            janela.append(j)
+
+    # Reconstrói as rotas de trás para frente
+    rotas = []
+    j = num_servicos
+    while j > 0:
+        i = predecessor[j]
+        rotas.append(tour[i:j])
+        j = i
+    rotas.reverse()
+    return custo_otimo[num_servicos], rotas
+
+def rotas_tour_gigante_split(matriz_servicos, capacidade, servicos_inviaveis=()):
+    """
+    Construtivo "rota primeiro, agrupamento depois": monta o tour gigante (`tour_gigante`) e o divide
+    de forma ótima em rotas viáveis com `split_linear`.
+
+    Args:
+        matriz_servicos (MatrizServicos): Custos serviço -> serviço indexados pelo ID (depósito = 0).
+        capacidade (int): Capacidade do veículo.
+        servicos_inviaveis (dict | set): IDs dos serviços que ficam fora da solução.
+
+    Returns:
+        list: Uma lista de IDs de serviço por rota, na ordem de atendimento.
+    """
+    _, rotas = split_linear(tour_gigante(matriz_servicos, servicos_inviaveis), matriz_servicos, capacidade)
+    return rotas
+
+def rotas_savings(matriz_servicos, capacidade, servicos_inviaveis=(), vizinhos=25):
+    """
+    Economias de Clarke-Wright para serviços com sentido fixo: cada serviço viável começa numa rota
+    própria, e ligar o fim da rota que termina em a ao início da rota que começa em b economiza
+        d(fim de a, depósito) + d(depósito, início de b) - d(fim de a, início de b).
+    As economias positivas ficam num heap e são aplicadas da maior para a menor sempre que a ainda é o
+    último serviço de uma rota, b o primeiro de outra e a carga somada cabe na capacidade (empate:
+    menores IDs). As rotas são mantidas por union-find: a raiz de cada rota guarda o primeiro e o
+    último serviço e a carga, e `proximo` encadeia os serviços na ordem de atendimento.
+
+    Para não gerar as S² economias, a lista inicial tem só os pares (a, b) com b entre os `vizinhos`
+    serviços de menor custo a partir do fim de a. Esgotada essa lista, uma segunda fase considera todos
+    os pares (fim de uma rota, início de outra) das rotas restantes, que são poucas: uma ligação entre
+    serviços distantes, fora das listas de vizinhos, ainda pode valer a pena (ex: o retorno ao depósito
+    de uma rota e a saída da seguinte).
+
+    Args:
+        matriz_servicos (MatrizServicos): Custos serviço -> serviço indexados pelo ID (depósito = 0).
+        capacidade (int): Capacidade do veículo.
+        servicos_inviaveis (dict | set): IDs dos serviços que ficam fora da solução.
+        vizinhos (int): Tamanho da lista de vizinhos de cada serviço na primeira fase.
+
+    Returns:
+        list: Uma lista de IDs de serviço por rota, na ordem de atendimento.
+    """
+    n, custos = matriz_servicos.n, matriz_servicos.custos
+    viaveis = [s for s in range(1, n) if s not in servicos_inviaveis]
+    retorno = custos[INDICE_DEPOSITO::n]         # retorno[a] = d(fim de a, depósito)
+    saida = custos[INDICE_DEPOSITO * n:(INDICE_DEPOSITO + 1) * n] # saida[b] = célula (depósito, b)
+
+    # Union-find das rotas: raiz -> primeiro e último serviço e carga da rota
+    pai = list(range(n))
+    primeiro = list(range(n))
+    ultimo = list(range(n))
+    carga = list(matriz_servicos.demanda)
+    proximo = [0] * n
+
+    def raiz(s):
+        while pai[s] != s:
+            pai[s] = pai[pai[s]] # Compressão de caminho pela metade
+            s = pai[s]
+        return s
+
+    def aplicar_economias(economias):
+        """Aplica as ligações viáveis de uma lista de (-economia, a, b), da maior economia para a menor."""
+        heapq.heapify(economias)
+        while economias:
+            _, a, b = heapq.heappop(economias)
+            rota_a, rota_b = raiz(a), raiz(b)
+            if (rota_a == rota_b or ultimo[rota_a] != a or primeiro[rota_b] != b
+                    or carga[rota_a] + carga[rota_b] > capacidade):
+                continue
+            proximo[a] = b
+            pai[rota_b] = rota_a
+            ultimo[rota_a] = ultimo[rota_b]
+            carga[rota_a] += carga[rota_b]
+
+    # 1ª fase: economias entre cada serviço e os seus vizinhos mais próximos
+    economias = []
+    for a in viaveis:
+        base = a * n
+        linha = custos[base:base + n]
+        for b in heapq.nsmallest(vizinhos + 1, viaveis, key=linha.__getitem__):
+            economia = retorno[a] + saida[b] - linha[b]
+            if b != a and economia > 0:
+                economias.append((-economia, a, b))
+    aplicar_economias(economias)
+
+    # 2ª fase: todos os pares (fim de uma rota, início de outra) entre as rotas que sobraram
+    raizes = [s for s in viaveis if raiz(s) == s]
+    economias = []
+    for rota_a in raizes:
+        a = ultimo[rota_a]
+        base = a * n
+        for rota_b in raizes:
+            b = primeiro[rota_b]
+            economia = retorno[a] + saida[b] - custos[base + b]
+            if rota_b != rota_a and economia > 0:
+                economias.append((-economia, a, b))
+    aplicar_economias(economias)
+
+    rotas = []
+    for s in viaveis:
+        rota_s = raiz(s)
+        if primeiro[rota_s] == s:
+            rota = [s]
+            while rota[-1] != ultimo[rota_s]:
+                rota.append(proximo[rota[-1]])
+            rotas.append(rota)
+    return rotas
+
+def custo_rotas(rotas, matriz_servicos):
+    """Custo total de rotas dadas como listas de IDs (cada uma saindo do depósito e voltando a ele)."""
+    custos, n = matriz_servicos.custos, matriz_servicos.n
+    total = 0
+    for rota in rotas:
+        anterior = INDICE_DEPOSITO
+        for s in rota:
+            total += custos[anterior * n + s]
+            anterior = s
+        total += custos[anterior * n + INDICE_DEPOSITO]
+    return total
+
+# --- Portfólio de construtivos: variantes executadas em processos, vence a de menor custo ---
+
+# Variantes do portfólio: (nome, função, argumentos extras). A primeira é a regra atual (início único);
+# em caso de empate no custo, vence a variante que aparece antes.
+VARIANTES_PORTFOLIO = (
+    [('vizinho_mais_proximo', rotas_vizinho_mais_proximo, {})]
+    + [(f'path_scanning_{criterio}', rotas_path_scanning, {'criterio': criterio}) for criterio in CRITERIOS_PATH_SCANNING]
+    + [(f'aleatorio_top3_s{semente}', rotas_vizinho_aleatorio, {'k': 3, 'semente': semente}) for semente in range(1, 5)]
+    + [('preenchimento_capacidade', rotas_preenchimento_capacidade, {})]
+    + [('tour_gigante_split', rotas_tour_gigante_split, {})]
+    + [('savings', rotas_savings, {})]
+)
+
+def _executar_variante(indice, matriz_servicos, capacidade, servicos_inviaveis):
+    """Executa uma variante do portfólio e retorna (índice, custo, rotas, tempo em ms)."""
+    _, funcao, argumentos = VARIANTES_PORTFOLIO[indice]
+    t0 = time.perf_counter()
+    rotas = funcao(matriz_servicos, capacidade, servicos_inviaveis, **argumentos)
+    tempo_ms = (time.perf_counter() - t0) * 1000
+    return indice, custo_rotas(rotas, matriz_servicos), rotas, tempo_ms
+
+_estado_worker_portfolio = None # (matriz de serviços, capacidade, serviços inviáveis) do processo trabalhador atual
+
+def _inicializar_worker_portfolio(matriz_servicos, capacidade, servicos_inviaveis):
+    """Executada uma única vez em cada processo: recebe a matriz de serviços (somente leitura) e os dados da instância."""
+    global _estado_worker_portfolio
+    _estado_worker_portfolio = (matriz_servicos, capacidade, servicos_inviaveis)
+
+def _executar_variante_worker(indice):
+    """Executa uma variante com o estado recebido pelo processo (ver `_inicializar_worker_portfolio`)."""
+    return _executar_variante(indice, *_estado_worker_portfolio)
+
+def executar_portfolio(matriz_servicos, capacidade, servicos_inviaveis=(), num_workers=None):
+    """
+    Executa todas as `VARIANTES_PORTFOLIO`, distribuídas entre processos. A matriz de serviços é enviada
+    uma única vez para cada processo (via initializer) e só é lida pelas variantes; cada tarefa devolve
+    apenas o custo e as rotas da sua variante. Com uma única CPU (ou `num_workers` <= 1), as variantes
+    rodam em sequência no próprio processo.
+
+    Args:
+        matriz_servicos (MatrizServicos): Custos serviço -> serviço indexados pelo ID (depósito = 0).
+        capacidade (int): Capacidade do veículo.
+        servicos_inviaveis (dict | set): IDs dos serviços que ficam fora da solução.
+        num_workers (int, optional): Número de processos. Se None, usa o número de CPUs.
+
+    Returns:
+        tuple: (resultados (list), tempo_total (float)): uma tupla (nome, custo, rotas, tempo em ms) por
+               variante, na ordem de `VARIANTES_PORTFOLIO`, e o tempo de relógio do portfólio (ms).
+    """
+    if num_workers is None:
+        num_workers = os.cpu_count() if os.cpu_count() else 1
+    num_workers = min(num_workers, len(VARIANTES_PORTFOLIO))
+    t0 = time.perf_counter()
+    if num_workers <= 1:
+        brutos = [_executar_variante(indice, matriz_servicos, capacidade, servicos_inviaveis)
+                  for indice in range(len(VARIANTES_PORTFOLIO))]
+    else:
+        with Pool(processes=num_workers, initializer=_inicializar_worker_portfolio,
+                  initargs=(matriz_servicos, capacidade, servicos_inviaveis)) as pool:
+            brutos = list(pool.imap_unordered(_executar_variante_worker, range(len(VARIANTES_PORTFOLIO))))
+    tempo_total = (time.perf_counter() - t0) * 1000
+    brutos.sort()
+    resultados = [(VARIANTES_PORTFOLIO[indice][0], custo, rotas, tempo) for indice, custo, rotas, tempo in brutos]
+    return resultados, tempo_total
+
+def rotas_portfolio(matriz_servicos, capacidade, servicos_inviaveis=(), num_workers=None):
+    """
+    Modo 'portfolio': executa as variantes de `VARIANTES_PORTFOLIO` (ver `executar_portfolio`) e
+    devolve as rotas da de menor custo (empate: a que vem antes, de modo que a regra atual só é
+    substituída por uma partida estritamente melhor). Informa no console a variante vencedora e a
+    sobrecarga de tempo de relógio em relação ao início único (a primeira variante).
+
+    Args:
+        matriz_servicos (MatrizServicos): Custos serviço -> serviço indexados pelo ID (depósito = 0).
+        capacidade (int): Capacidade do veículo.
+        servicos_inviaveis (dict | set): IDs dos serviços que ficam fora da solução.
+        num_workers (int, optional): Número de processos. Se None, usa o número de CPUs.
+
+    Returns:
+        list: Uma lista de IDs de serviço por rota, na ordem de atendimento.
+    """
+    resultados, tempo_total = executar_portfolio(matriz_servicos, capacidade, servicos_inviaveis, num_workers)
+    melhor = min(resultados, key=lambda resultado: resultado[1]) # min devolve o primeiro em caso de empate
+    nome_unico, custo_unico, _, tempo_unico = resultados[0]
+    print(f"  Portfólio construtivo: {len(resultados)} variantes em {tempo_total:.1f} ms "
+          f"(início único: {tempo_unico:.1f} ms, sobrecarga {tempo_total - tempo_unico:+.1f} ms). "
+          f"Melhor: '{melhor[0]}' (custo {melhor[1]}; '{nome_unico}': {custo_unico})")
+    return melhor[2]
+
+# Construtivos deste módulo por modo (o modo 'escalar' fica nas próprias Etapas 2 e 3)
+FUNCOES_CONSTRUTIVO = {'indexado': rotas_vizinho_mais_proximo, 'vetorizado': rotas_vizinho_mais_proximo_vetorizado,
+                       'split': rotas_tour_gigante_split, 'savings': rotas_savings, 'portfolio': rotas_portfolio}
+
+def montar_rotas_saida(rotas, matriz_servicos, depot_node):
+    """
+    Converte rotas em listas de IDs para o formato `all_routes_output_data` das Etapas 2 e 3.
+
+    Args:
+        rotas (list): Uma lista de IDs de serviço por rota.
+        matriz_servicos (MatrizServicos): Custos serviço -> serviço indexados pelo ID (depósito = 0).
+        depot_node (int): O nó do depósito.
+
+    Returns:
+        tuple: (total_solution_cost (float), all_routes_output_data (list)), com os IDs das rotas a partir de 1.
+    """
+    inicio, fim, demanda = matriz_servicos.inicio, matriz_servicos.fim, matriz_servicos.demanda
+    all_routes_output_data = []
+    total_solution_cost = 0
+    for route_id, rota in enumerate(rotas, start=1):
+        visitas = [('S', s, inicio[s], fim[s]) for s in rota]
+        custo = matriz_servicos.custo_visitas(visitas)
+        total_solution_cost += custo
+        all_routes_output_data.append({
+            'route_id': route_id,
+            'demand': sum(demanda[s] for s in rota),
+            'cost': custo,
+            'visits': [('D', 0, depot_node, depot_node)] + visitas + [('D', 0, depot_node, depot_node)]
+        })
+    return total_solution_cost, all_routes_output_data
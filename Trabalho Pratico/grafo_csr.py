@@ -0,0 +1,94 @@
+import sys # Importa sys para medir o tamanho dos vetores do grafo
+
+from grafo_estatisticas import construir_grafo
+
+class GrafoCSR:
+    """
+    Grafo em formato CSR (Compressed Sparse Row): os arcos de saída de cada nó ficam contíguos
+    em dois vetores paralelos (vizinho e peso), e `inicio[i]:inicio[i + 1]` delimita os arcos do
+    nó de índice denso i. Os nós são identificados por índices densos 0..n-1 (ver `indice_no`).
+    Substitui, nos algoritmos de caminho mínimo, o par lista de adjacência + dicionário de custos
+    com chaves (u, v): cada relaxação passa a ser um acesso por índice, sem criar tuplas.
+    Os vetores são listas de inteiros: em Python puro, ler um elemento de uma lista é mais rápido
+    que de um array.array (que cria um novo objeto int a cada acesso).
+    """
+    __slots__ = ('nos', 'indice_no', 'inicio', 'vizinhos', 'pesos')
+
+    def __init__(self, nos, traversal_costs):
+        """
+        Args:
+            nos (list): Lista dos nós do grafo. A posição de cada nó define o seu índice denso.
+            traversal_costs (dict): Dicionário de custos de travessia (chave: (u, v), valor: custo),
+                                    como devolvido por `construir_grafo`. Arcos com extremos fora
+                                    de `nos` são ignorados.
+        """
+        self.nos = list(nos)
+        self.indice_no = {no: idx for idx, no in enumerate(self.nos)} # Nó -> índice denso
+        n = len(self.nos)
+
+        # Conta os arcos de saída de cada nó e acumula os deslocamentos de cada linha
+        arcos = [(self.indice_no[u], self.indice_no[v], custo) for (u, v), custo in traversal_costs.items()
+                 if u in self.indice_no and v in self.indice_no]
+        grau_saida = [0] * n
+        for i, _, _ in arcos:
+            grau_saida[i] += 1
+        self.inicio = [0] * (n + 1)
+        for i in range(n):
+            self.inicio[i + 1] = self.inicio[i] + grau_saida[i]
+
+        # Preenche os vetores de vizinhos e pesos, na ordem dos nós de origem
+        proxima_posicao = self.inicio[:-1]
+        self.vizinhos = [0] * len(arcos)
+        self.pesos = [0] * len(arcos)
+        for i, j, custo in arcos:
+            posicao = proxima_posicao[i]
+            self.vizinhos[posicao] = j
+            self.pesos[posicao] = custo
+            proxima_posicao[i] = posicao + 1
+
+    @property
+    def num_nos(self):
+        """Número de nós do grafo."""
+        return len(self.nos)
+
+    @property
+    def num_arcos(self):
+        """Número de arcos (u, v) com custo direto (cada aresta conta nos dois sentidos)."""
+        return len(self.vizinhos)
+
+    def arcos_saida(self, u):
+        """
+        Retorna os arcos de saída do nó u como pares (vizinho, custo), nos identificadores originais.
+
+        Args:
+            u (int): O nó de origem.
+
+        Returns:
+            list: Lista de tuplas (v, custo).
+        """
+        i = self.indice_no[u]
+        return [(self.nos[self.vizinhos[k]], self.pesos[k]) for k in range(self.inicio[i], self.inicio[i + 1])]
+
+    def tamanho_em_bytes(self):
+        """Retorna o tamanho (em bytes) das listas inicio, vizinhos e pesos (sem contar os ints compartilhados)."""
+        return sum(sys.getsizeof(vetor) for vetor in (self.inicio, self.vizinhos, self.pesos))
+
+def construir_grafo_csr(required_edges, non_required_edges, required_arcs, non_required_arcs, nos):
+    """
+    Constrói o grafo em formato CSR a partir dos mesmos dados de `construir_grafo`.
+    Mantém o formato antigo disponível: retorna também a lista de adjacência e os custos.
+
+    Args:
+        required_edges (list): Lista de arestas requeridas.
+        non_required_edges (list): Lista de arestas não requeridas.
+        required_arcs (list): Lista de arcos requeridos.
+        non_required_arcs (list): Lista de arcos não requeridos.
+        nos (list): Lista de todos os nós do grafo (define os índices densos).
+
+    Returns:
+        tuple: grafo (GrafoCSR): O grafo em formato CSR.
+               graph_adj (defaultdict): Lista de adjacência do grafo (formato antigo).
+               traversal_costs (dict): Dicionário de custos de travessia (formato antigo).
+    """
+    graph_adj, traversal_costs = construir_grafo(required_edges, non_required_edges, required_arcs, non_required_arcs)
+    return GrafoCSR(nos, traversal_costs), graph_adj, traversal_costs
@@ -66,4 +66,64 @@ def contar_vertices(required_edges, non_required_edges, required_arcs, non_requi
             # Em caso de erro na conversão (e.g., 'N' ausente ou formato inválido), ignora o item
             pass 
             
-    return len(vertices) # Retorna o número de elementos únicos no conjunto
\ No newline at end of file
+    return len(vertices) # Retorna o número de elementos únicos no conjunto
+
+
+def componentes_fortemente_conexas(all_graph_nodes, graph_adj):
+    """
+    Identifica as componentes fortemente conexas do grafo (algoritmo de Tarjan em versão iterativa,
+    sem recursão, para não esbarrar no limite de profundidade do Python em grafos grandes). Custa O(V + A).
+
+    Args:
+        all_graph_nodes (list): Lista de todos os nós do grafo.
+        graph_adj (defaultdict): Lista de adjacência do grafo, como devolvida por `construir_grafo`.
+
+    Returns:
+        dict: Mapeamento nó -> índice da sua componente. Dois nós têm o mesmo índice se e somente se
+              cada um alcança o outro.
+    """
+    ordem = {}       # Nó -> ordem de descoberta na busca em profundidade
+    menor = {}       # Nó -> menor ordem alcançável a partir da sua subárvore (low-link)
+    componente = {}  # Nó -> índice da componente (definido quando a componente é fechada)
+    pilha = []       # Nós visitados cuja componente ainda não foi fechada
+    contador = 0
+    num_componentes = 0
+
+    for raiz in all_graph_nodes:
+        if raiz in ordem:
+            continue
+        ordem[raiz] = menor[raiz] = contador
+        contador += 1
+        pilha.append(raiz)
+        busca = [(raiz, iter(graph_adj.get(raiz, ())))] # Pilha explícita da busca: (nó, vizinhos restantes)
+        while busca:
+            u, vizinhos = busca[-1]
+            avancou = False
+            for v in vizinhos:
+                if v not in ordem:
+                    ordem[v] = menor[v] = contador
+                    contador += 1
+                    pilha.append(v)
+                    busca.append((v, iter(graph_adj.get(v, ()))))
+                    avancou = True
+                    break
+                if v not in componente and ordem[v] < menor[u]:
+                    menor[u] = ordem[v] # v ainda está na pilha: aresta de retorno
+            if avancou:
+                continue
+
+            # Todos os vizinhos de u foram explorados
+            busca.pop()
+            if busca:
+                pai = busca[-1][0]
+                if menor[u] < menor[pai]:
+                    menor[pai] = menor[u]
+            if menor[u] == ordem[u]:
+                # u é a raiz de uma componente: desempilha todos os seus nós
+                while True:
+                    w = pilha.pop()
+                    componente[w] = num_componentes
+                    if w == u:
+                        break
+                num_componentes += 1
+    return componente
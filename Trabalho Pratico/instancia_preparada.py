@@ -0,0 +1,204 @@
+import os # Importa os para extrair o nome da instância (chave do cache de APSP)
+import time # Importa time para medir o tempo de preparação e do APSP
+
+from leitor_dados import carregar_dados_arquivo
+from grafo_estatisticas import construir_grafo, contar_vertices, componentes_fortemente_conexas
+from grafo_csr import GrafoCSR
+from caminhos_minimos import calcular_apsp, extremos_servicos
+from reducao_grafo import reduzir_grafo
+from matriz_servicos import MatrizServicos
+
+# Arquivo, na pasta de saída de cada lote, com os serviços deixados fora das soluções
+ARQUIVO_SERVICOS_INVIAVEIS = 'servicos_inviaveis.txt'
+
+class InstanciaPreparada:
+    """
+    Resultado do pré-processamento de uma instância, compartilhado pelas Etapas 2 e 3:
+    dados lidos do arquivo, tabela de serviços requeridos com IDs globais, grafo e matriz APSP.
+    Preparar a instância uma única vez evita ler o arquivo e calcular o APSP duas vezes quando
+    as duas etapas são executadas sobre a mesma instância (ver `main_execucao_completa.py`).
+    Os objetos são apenas lidos pelas etapas e podem ser reutilizados livremente.
+    """
+    __slots__ = ('instance_filepath', 'nome', 'dados_gerais', 'required_nodes', 'required_edges',
+                 'non_required_edges', 'required_arcs', 'non_required_arcs', 'capacidade_veiculo',
+                 'depot_node', 'all_graph_nodes', 'graph_adj', 'traversal_costs', 'reducao', 'grafo',
+                 'servicos', 'id_to_service_obj', 'servicos_inviaveis', 'short_paths_matrix', 'matriz_servicos',
+                 'clocks_apsp', 'clocks_preparacao')
+
+def montar_servicos(required_nodes, required_edges, required_arcs):
+    """
+    Monta a tabela unificada de serviços requeridos (nós, depois arestas, depois arcos),
+    atribuindo a cada um um ID global único a partir de 1.
+
+    Args:
+        required_nodes (list): Lista de nós requeridos.
+        required_edges (list): Lista de arestas requeridas.
+        required_arcs (list): Lista de arcos requeridos.
+
+    Returns:
+        list: Lista de dicionários de serviço com as chaves 'id', 'type', 'from', 'to', 'demand',
+              'service_cost' e 'original_data' ('node_val' para nós, 'traversal_cost' para arestas/arcos).
+    """
+    servicos = []
+    service_id_counter = 1 # Contador para IDs únicos de serviço
+
+    # Processa nós requeridos: para nós, 'from' e 'to' são o próprio nó
+    for rn in required_nodes:
+        node_val = int(rn['node'].lstrip('N')) # Remove o prefixo 'N' do nome do nó (ex: 'N4' vira 4)
+        servicos.append({
+            'id': service_id_counter, 'type': 'node', 'node_val': node_val,
+            'demand': rn['demand'], 'service_cost': rn['service_cost'],
+            'from': node_val, 'to': node_val, 'original_data': rn
+        })
+        service_id_counter += 1
+
+    # Processa arestas e arcos requeridos
+    for s_type, itens in (('edge', required_edges), ('arc', required_arcs)):
+        for item in itens:
+            servicos.append({
+                'id': service_id_counter, 'type': s_type, 'from': item['from'], 'to': item['to'],
+                'traversal_cost': item['traversal_cost'],
+                'demand': item['demand'], 'service_cost': item['service_cost'], 'original_data': item
+            })
+            service_id_counter += 1
+    return servicos
+
+def identificar_servicos_inviaveis(instancia):
+    """
+    Identifica os serviços que nenhuma rota pode atender: os que o veículo não consegue alcançar a partir
+    do depósito ou dos quais não consegue voltar a ele, e os que sozinhos excedem a capacidade.
+    Um serviço é alcançável nos dois sentidos se e somente se os seus extremos estão na mesma componente
+    fortemente conexa do depósito (o próprio serviço liga 'from' a 'to'). Nesse caso, a distância entre
+    quaisquer extremos de serviços viáveis é finita, e os construtivos dispensam o teste de float('inf').
+
+    Args:
+        instancia (InstanciaPreparada): Instância com os serviços e o grafo (`graph_adj`) já montados.
+
+    Returns:
+        dict: Mapeamento service_id -> motivo ('inalcancavel' ou 'capacidade'), vazio se todos são viáveis.
+    """
+    componente = componentes_fortemente_conexas(instancia.all_graph_nodes, instancia.graph_adj)
+    componente_deposito = componente.get(instancia.depot_node)
+    inviaveis = {}
+    for servico in instancia.servicos:
+        if componente.get(servico['from']) != componente_deposito or componente.get(servico['to']) != componente_deposito:
+            inviaveis[servico['id']] = 'inalcancavel'
+        elif servico['demand'] > instancia.capacidade_veiculo:
+            inviaveis[servico['id']] = 'capacidade'
+    return inviaveis
+
+def salvar_servicos_inviaveis(filepath, inviaveis_por_instancia):
+    """
+    Grava os serviços deixados fora das soluções de um lote (ver `identificar_servicos_inviaveis`), um
+    por linha: instância, ID do serviço e motivo. O arquivo é regravado a cada lote, mesmo sem serviços
+    inviáveis, para não sobrar a lista de uma execução anterior ao lado das soluções novas.
+
+    Args:
+        filepath (str): Caminho do arquivo (ex: `ARQUIVO_SERVICOS_INVIAVEIS` na pasta de saída).
+        inviaveis_por_instancia (dict): Nome da instância -> mapeamento service_id -> motivo.
+    """
+    with open(filepath, 'w') as f:
+        f.write("# instancia service_id motivo\n")
+        for nome_instancia, inviaveis in inviaveis_por_instancia.items():
+            for service_id, motivo in sorted(inviaveis.items()):
+                f.write(f"{nome_instancia} {service_id} {motivo}\n")
+
+def preparar_instancia(instance_filepath, apsp_backend='auto', apsp_restrito=True, cache_apsp=None, extremos_apsp=None,
+                       com_predecessores=False, contrair_grafo=True):
+    """
+    Lê a instância, monta a tabela de serviços, constrói o grafo e calcula a matriz APSP.
+
+    Args:
+        instance_filepath (str): Caminho completo para o arquivo de instância (.dat).
+        apsp_backend (str): Backend do cálculo do APSP (ver `calcular_apsp`).
+        apsp_restrito (bool): Se True, calcula apenas as distâncias que o solver consulta (origens no
+                              depósito e nos fins dos serviços, destinos no depósito e nos inícios dos
+                              serviços), em vez da matriz completa entre todos os nós.
+        cache_apsp (CacheAPSP, optional): Cache das matrizes APSP. Num acerto, o APSP não é recalculado.
+        extremos_apsp (tuple, optional): (origens, destinos) da matriz APSP no modo restrito, quando a
+                                         instância faz parte de um grupo que compartilha a mesma rede
+                                         (ver `agrupar_instancias_por_rede`). Se None, usa os extremos
+                                         dos serviços da própria instância.
+        com_predecessores (bool): Se True, a matriz guarda também os predecessores (ver `calcular_apsp`),
+                                  permitindo expandir cada deslocamento em sua sequência de ruas.
+                                  O cache, que só guarda distâncias, não é usado neste caso.
+        contrair_grafo (bool): Se True (e no modo restrito), o APSP roda sobre o grafo reduzido por
+                               `reduzir_grafo`, sem os nós fora dos extremos com até dois vizinhos;
+                               as distâncias entre os extremos não mudam. `all_graph_nodes`,
+                               `graph_adj` e `traversal_costs` continuam sendo os do grafo original.
+
+    Returns:
+        InstanciaPreparada: A instância pronta para as Etapas 2 e 3.
+    """
+    t0_preparacao = time.perf_counter()
+    instancia = InstanciaPreparada()
+    instancia.instance_filepath = instance_filepath
+    instancia.nome = os.path.splitext(os.path.basename(instance_filepath))[0]
+
+    # 1. Carregar os dados da instância usando o módulo leitor_dados
+    (instancia.dados_gerais, instancia.required_nodes, instancia.required_edges, instancia.non_required_edges,
+     instancia.required_arcs, instancia.non_required_arcs) = carregar_dados_arquivo(instance_filepath)
+    instancia.capacidade_veiculo = int(instancia.dados_gerais['Capacity']) # Capacidade máxima de carga de um veículo
+    instancia.depot_node = int(instancia.dados_gerais['Depot Node'])     # Nó do depósito
+
+    # 2. Mapeamento de Serviços Requeridos com IDs globais
+    instancia.servicos = montar_servicos(instancia.required_nodes, instancia.required_edges, instancia.required_arcs)
+    instancia.id_to_service_obj = {s['id']: s for s in instancia.servicos}
+
+    # 3. Grafo: lista ordenada de nós, adjacência + custos diretos
+    start_time_path_finding = time.perf_counter()
+    total_nodes_count = contar_vertices(instancia.required_edges, instancia.non_required_edges, instancia.required_arcs,
+                                        instancia.non_required_arcs, instancia.required_nodes)
+    instancia.all_graph_nodes = list(range(1, total_nodes_count + 1))
+    instancia.graph_adj, instancia.traversal_costs = construir_grafo(
+        instancia.required_edges, instancia.non_required_edges, instancia.required_arcs, instancia.non_required_arcs)
+
+    # Serviços que nenhuma rota pode atender são identificados uma única vez (e informados)
+    instancia.servicos_inviaveis = identificar_servicos_inviaveis(instancia)
+    if instancia.servicos_inviaveis:
+        print(f"  AVISO: {len(instancia.servicos_inviaveis)} serviço(s) inviável(is) em '{instancia.nome}', "
+              f"fora da solução: " + ', '.join(f"{service_id} ({motivo})"
+                                             for service_id, motivo in sorted(instancia.servicos_inviaveis.items())))
+
+    # 4. APSP: no modo restrito, só são calculadas as linhas/colunas consultadas pelos construtivos e operadores
+    if apsp_restrito and extremos_apsp is not None:
+        # Extremos unidos de todas as instâncias com a mesma rede: uma única matriz atende o grupo inteiro
+        origens_apsp, destinos_apsp = extremos_apsp
+    elif apsp_restrito:
+        origens_apsp, destinos_apsp = extremos_servicos(instancia.servicos, instancia.depot_node)
+    else:
+        origens_apsp, destinos_apsp = instancia.all_graph_nodes, instancia.all_graph_nodes
+
+    # Redução: contrai as cadeias de nós que não são extremos (depósito, nós requeridos e extremos dos
+    # serviços); o grafo CSR usado pelo Dijkstra é o do grafo reduzido
+    instancia.reducao = None
+    nos_apsp, custos_apsp = instancia.all_graph_nodes, instancia.traversal_costs
+    if contrair_grafo and apsp_restrito:
+        instancia.reducao = reduzir_grafo(instancia.all_graph_nodes, instancia.traversal_costs,
+                                          set(origens_apsp) | set(destinos_apsp))
+        nos_apsp, custos_apsp = instancia.reducao.nos, instancia.reducao.traversal_costs
+    instancia.grafo = GrafoCSR(nos_apsp, custos_apsp)
+
+    def calcular_matriz():
+        matriz = calcular_apsp(nos_apsp, instancia.graph_adj, custos_apsp, backend=apsp_backend,
+                               origens=origens_apsp, destinos=destinos_apsp, grafo=instancia.grafo,
+                               com_predecessores=com_predecessores)
+        if matriz.predecessores is not None:
+            matriz.predecessores.reducao = instancia.reducao # Caminhos expandidos para o grafo original
+        return matriz
+
+    if cache_apsp is not None and not com_predecessores:
+        # A chave do cache é a impressão digital do grafo: se a rede não mudou, a matriz é reaproveitada
+        instancia.short_paths_matrix, _ = cache_apsp.obter(instancia.nome, instancia.traversal_costs,
+                                                           origens_apsp, destinos_apsp, calcular_matriz)
+    else:
+        instancia.short_paths_matrix = calcular_matriz()
+
+    instancia.clocks_apsp = (time.perf_counter() - start_time_path_finding) * 1000 # Tempo do grafo + APSP (ms)
+
+    # 5. Matriz serviço -> serviço (deslocamento + custo de serviço), consultada pelos operadores da Etapa 3
+    instancia.matriz_servicos = MatrizServicos(instancia.servicos, instancia.depot_node, instancia.short_paths_matrix)
+
+    end_time = time.perf_counter()
+    instancia.clocks_preparacao = (end_time - t0_preparacao) * 1000 # Tempo total da preparação (ms)
+    return instancia
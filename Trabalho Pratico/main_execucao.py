@@ -6,9 +6,11 @@ import sys   # Importa o módulo 'sys' para interagir com o sistema (ex: sair do
 # Importa a função principal do otimizador da Etapa 2
 # Esta função é responsável por carregar os dados, construir o grafo,
 # calcular o APSP e gerar a solução inicial.
-from otimizador import gerar_solucao_inicial_aprimorada 
+from instancia_preparada import preparar_instancia, salvar_servicos_inviaveis, ARQUIVO_SERVICOS_INVIAVEIS
+from otimizador import gerar_solucao_inicial_aprimorada
+from cache_apsp import CacheAPSP, agrupar_instancias_por_rede # Cache das matrizes APSP (entre instâncias e execuções)
 
-def processar_arquivos(input_directory, output_directory):
+def processar_arquivos(input_directory, output_directory, cache_directory=None):
     """
     Processa todos os arquivos .dat de um diretório de entrada, gera as soluções
     da Etapa 2 para cada um e salva os resultados em um diretório de saída.
@@ -16,6 +18,9 @@ def processar_arquivos(input_directory, output_directory):
     Args:
         input_directory (str): O caminho para o diretório contendo os arquivos .dat de instância.
         output_directory (str): O caminho para o diretório onde as soluções serão salvas.
+        cache_directory (str, optional): Pasta do cache em disco das matrizes APSP. Se None, o cache
+                                         vale apenas durante a execução: instâncias com a mesma rede
+                                         ainda compartilham o APSP, mas nada é gravado em disco.
     """
     # Tenta criar o diretório de saída. Se já existir, a função não faz nada (exist_ok=True).
     try:
@@ -58,7 +63,14 @@ def processar_arquivos(input_directory, output_directory):
     print(f"Arquivos de entrada em: '{input_directory}'")
     print(f"Arquivos de saída serão salvos em: '{output_directory}'\n")
 
+    # Cache das matrizes APSP (chave: impressão digital do grafo de cada instância), em disco se houver pasta
+    cache_apsp = CacheAPSP(cache_directory)
+    # Instâncias com a mesma rede (ex: mgval/mggdb com diferentes taxas de demanda) usam os extremos
+    # unidos do grupo, de modo que o APSP é calculado uma única vez por rede distinta
+    extremos_por_instancia = agrupar_instancias_por_rede([os.path.join(input_directory, f) for f in dat_files])
+
     processed_count = 0 # Contador de arquivos processados
+    inviaveis_por_instancia = {} # Serviços fora das soluções (ver `identificar_servicos_inviaveis`)
     start_time_batch = time.perf_counter() # Marca o tempo de início do processamento em lote
 
     # Itera sobre cada arquivo .dat encontrado
@@ -76,10 +88,15 @@ def processar_arquivos(input_directory, output_directory):
         print(f"[{processed_count}/{len(dat_files)}] Processando: '{dat_file}'...")
 
         try:
+            # A instância é preparada aqui para que os serviços inviáveis entrem no resumo do lote
+            instancia = preparar_instancia(full_instance_filepath, cache_apsp=cache_apsp,
+                                           extremos_apsp=extremos_por_instancia.get(full_instance_filepath))
+            if instancia.servicos_inviaveis:
+                inviaveis_por_instancia[dat_file] = instancia.servicos_inviaveis
             # Chama a função principal da Etapa 2 para gerar a solução inicial
             # Retorna custo total, número de rotas, tempo de execução total, tempo de APSP e os dados das rotas.
             total_cost, num_routes, clocks_ref_exec, clocks_ref_find, routes_data = \
-                gerar_solucao_inicial_aprimorada(full_instance_filepath)
+                gerar_solucao_inicial_aprimorada(instancia)
             
             # Abre o arquivo de saída no modo de escrita ('w')
             with open(full_output_filepath, 'w') as f:
@@ -122,6 +139,13 @@ def processar_arquivos(input_directory, output_directory):
     print(f"\n--- Processamento de todos os arquivos concluído ---")
     print(f"Total de arquivos processados: {processed_count}")
     print(f"Tempo total de execução: {total_elapsed_batch_time:.2f} segundos")
+    total_inviaveis = sum(len(inviaveis) for inviaveis in inviaveis_por_instancia.values())
+    print(f"Serviços inviáveis, fora das soluções: {total_inviaveis} (em {len(inviaveis_por_instancia)} instância(s))")
+    # IDs e motivos também ficam registrados ao lado das soluções
+    salvar_servicos_inviaveis(os.path.join(output_directory, ARQUIVO_SERVICOS_INVIAVEIS), inviaveis_por_instancia)
+    print(cache_apsp.resumo())
+    for linha in cache_apsp.resumo_por_familia():
+        print(linha)
     print(f"Todos os arquivos de saída foram gerados em: '{output_directory}'")
 
 # Este bloco garante que o código abaixo só será executado quando o script for chamado diretamente
@@ -133,6 +157,9 @@ if __name__ == "__main__":
     # 2. ***CONFIGURAÇÃO DO DIRETÓRIO DE SAÍDA***
     # Define a pasta onde os arquivos de solução da Etapa 2 serão salvos.
     output_directory = "saidas" 
+
+    # Define a pasta onde as matrizes APSP são guardadas entre execuções (reaproveitadas se o grafo não mudar).
+    cache_directory = "cache_apsp"
     
     # Chama a função principal para iniciar o processamento dos arquivos
-    processar_arquivos(input_directory, output_directory)
\ No newline at end of file
+    processar_arquivos(input_directory, output_directory, cache_directory)
\ No newline at end of file
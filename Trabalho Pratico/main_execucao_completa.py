@@ -0,0 +1,207 @@
+# main_execucao_completa.py
+import os    # Importa o módulo 'os' para interagir com o sistema operacional (ex: criar diretórios, listar arquivos)
+import re    # Importa o módulo 're' para usar expressões regulares (útil para ordenar nomes de arquivos)
+import time  # Importa o módulo 'time' para medir o tempo de execução
+import sys   # Importa o módulo 'sys' para interagir com o sistema (ex: sair do script em caso de erro)
+
+# Executa as Etapas 2 e 3 sobre a mesma instância preparada uma única vez:
+# o arquivo é lido e o APSP é calculado apenas uma vez por instância (e por rede, com o cache).
+from instancia_preparada import preparar_instancia, salvar_servicos_inviaveis, ARQUIVO_SERVICOS_INVIAVEIS
+from otimizador import gerar_solucao_inicial_aprimorada
+from otimizador_melhorado import otimizar_solucao
+from cache_apsp import CacheAPSP, agrupar_instancias_por_rede # Cache das matrizes APSP (entre instâncias e execuções)
+
+def salvar_solucao(full_output_filepath, total_cost, num_routes, clocks_ref_exec, clocks_ref_find, routes_data):
+    """
+    Grava uma solução no formato de saída das Etapas 2 e 3.
+
+    Args:
+        full_output_filepath (str): Caminho do arquivo de saída.
+        total_cost (float): Custo total da solução.
+        num_routes (int): Número de rotas.
+        clocks_ref_exec (float): Tempo total de execução da etapa (em milissegundos).
+        clocks_ref_find (float): Tempo do cálculo do APSP (em milissegundos).
+        routes_data (list): Rotas no formato `all_routes_output_data` (route_id, demand, cost, visits).
+    """
+    with open(full_output_filepath, 'w') as f:
+        f.write(f"{int(total_cost)}\n")         # Escreve o custo total da solução (inteiro)
+        f.write(f"{num_routes}\n")             # Escreve o número total de rotas
+        f.write(f"{int(clocks_ref_exec)}\n")    # Escreve o tempo total de execução da etapa (em ms)
+        f.write(f"{int(clocks_ref_find)}\n")    # Escreve o tempo gasto no cálculo do APSP (em ms)
+
+        # Itera sobre cada rota para formatar e escrever seus detalhes
+        for route in routes_data:
+            total_visits_in_route = len(route['visits']) # Obtém o número de visitas na rota
+            # Constrói a linha da rota no formato específico: "0 1 route_id demand cost total_visits"
+            route_line = f"0 1 {route['route_id']} {int(route['demand'])} {int(route['cost'])} {total_visits_in_route}"
+
+            # Adiciona os detalhes de cada visita (Depósito 'D' ou Serviço 'S')
+            for visit_type, service_id, from_node, to_node in route['visits']:
+                if visit_type == 'D':
+                    route_line += f" (D {service_id},{from_node},{to_node})" # Formato para visita ao Depósito
+                elif visit_type == 'S':
+                    route_line += f" (S {service_id},{from_node},{to_node})" # Formato para visita a Serviço
+            f.write(route_line + "\n") # Escreve a linha completa da rota no arquivo
+
+def expandir_percursos_rota(route, short_paths_matrix):
+    """
+    Expande os deslocamentos (deadheading) de uma rota: para cada par de visitas consecutivas,
+    a sequência de nós do caminho mais curto entre o fim ('to') da primeira e o início ('from') da segunda.
+
+    Args:
+        route (dict): Rota no formato `all_routes_output_data` (com a lista 'visits').
+        short_paths_matrix (MatrizDistancias): Matriz APSP calculada com predecessores.
+
+    Returns:
+        list: Lista de tuplas (visita_origem, visita_destino, custo, nós do caminho).
+    """
+    percursos = []
+    visits = route['visits']
+    for visita_origem, visita_destino in zip(visits, visits[1:]):
+        u, v = visita_origem[3], visita_destino[2] # Fim da visita anterior -> início da próxima
+        percursos.append((visita_origem, visita_destino, short_paths_matrix.distancia(u, v),
+                          short_paths_matrix.caminho(u, v)))
+    return percursos
+
+def salvar_percursos(full_output_filepath, routes_data, short_paths_matrix):
+    """
+    Grava as ruas percorridas entre as visitas de cada rota, uma linha por deslocamento:
+    "route_id (X id,from,to) (Y id,from,to) custo nó1 nó2 ... nóK", onde nó1..nóK é o caminho
+    mais curto do fim da primeira visita ao início da segunda (um único nó se não há deslocamento).
+
+    Args:
+        full_output_filepath (str): Caminho do arquivo de percursos.
+        routes_data (list): Rotas no formato `all_routes_output_data`.
+        short_paths_matrix (MatrizDistancias): Matriz APSP calculada com predecessores.
+    """
+    with open(full_output_filepath, 'w') as f:
+        for route in routes_data:
+            for visita_origem, visita_destino, custo, caminho in expandir_percursos_rota(route, short_paths_matrix):
+                origem_txt = f"({visita_origem[0]} {visita_origem[1]},{visita_origem[2]},{visita_origem[3]})"
+                destino_txt = f"({visita_destino[0]} {visita_destino[1]},{visita_destino[2]},{visita_destino[3]})"
+                nos_txt = ' '.join(map(str, caminho)) if caminho is not None else '-' # '-': sem caminho
+                f.write(f"{route['route_id']} {origem_txt} {destino_txt} {custo} {nos_txt}\n")
+
+def processar_arquivos_completo(input_directory, output_directory, output_directory_improved, cache_directory=None,
+                                percursos_directory=None):
+    """
+    Processa todos os arquivos .dat de um diretório de entrada em uma única passada: cada instância
+    é preparada uma vez (leitura, serviços, grafo e APSP) e usada pelas Etapas 2 e 3, que gravam
+    suas soluções nos respectivos diretórios de saída.
+
+    Args:
+        input_directory (str): O caminho para o diretório contendo os arquivos .dat de instância.
+        output_directory (str): O caminho para o diretório das soluções da Etapa 2.
+        output_directory_improved (str): O caminho para o diretório das soluções melhoradas (Etapa 3).
+        cache_directory (str, optional): Pasta do cache em disco das matrizes APSP. Se None, o cache
+                                         vale apenas durante a execução.
+        percursos_directory (str, optional): Se informada, o APSP guarda predecessores e, para cada solução
+                                             melhorada, é gravado nesta pasta o arquivo com as ruas de cada
+                                             deslocamento (ver `salvar_percursos`). Neste modo o cache não é usado.
+    """
+    # Tenta criar os diretórios de saída. Se já existirem, nada é feito (exist_ok=True).
+    for directory in (output_directory, output_directory_improved, percursos_directory):
+        if directory is None:
+            continue
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as e:
+            print(f"ERRO: Não foi possível criar o diretório de saída '{directory}': {e}")
+            print("Verifique as permissões de escrita ou se o caminho é válido.")
+            sys.exit(1)
+
+    try:
+        # Lista os arquivos .dat e os ordena numericamente (ex: 'bhw2.dat' antes de 'bhw10.dat')
+        raw_dat_files = [f for f in os.listdir(input_directory) if f.endswith('.dat')]
+
+        def sort_key(filename):
+            match = re.search(r'(\d+)', filename) # Procura por um ou mais dígitos no nome do arquivo
+            if match:
+                return int(match.group(1))
+            return float('inf') # Arquivos sem números vão para o final da lista
+
+        dat_files = sorted(raw_dat_files, key=sort_key)
+    except FileNotFoundError:
+        print(f"ERRO CRÍTICO: O diretório de entrada '{input_directory}' NÃO FOI ENCONTRADO.")
+        print("Certifique-se de que o caminho 'input_directory' no código esteja correto e que a pasta exista.")
+        sys.exit(1)
+
+    if not dat_files:
+        print(f"AVISO: Nenhum arquivo .dat encontrado no diretório: '{input_directory}'.")
+        sys.exit(0)
+
+    print(f"Iniciando processamento das ETAPAS 2 e 3 de {len(dat_files)} arquivos .dat...")
+    print(f"Arquivos de instância em: '{input_directory}'")
+    print(f"Saídas da Etapa 2 em: '{output_directory}'; saídas melhoradas (Etapa 3) em: '{output_directory_improved}'\n")
+
+    # Cache das matrizes APSP e agrupamento das instâncias que compartilham a mesma rede
+    cache_apsp = CacheAPSP(cache_directory)
+    extremos_por_instancia = agrupar_instancias_por_rede([os.path.join(input_directory, f) for f in dat_files])
+
+    processed_count = 0 # Contador de arquivos processados
+    inviaveis_por_instancia = {} # Serviços fora das soluções (ver `identificar_servicos_inviaveis`)
+    start_time_batch = time.perf_counter() # Marca o tempo de início do processamento em lote
+
+    for dat_file in dat_files:
+        processed_count += 1
+        current_file_start_time = time.perf_counter()
+        full_instance_filepath = os.path.join(input_directory, dat_file)
+        output_filename_base = "sol-" + dat_file
+
+        print(f"[{processed_count}/{len(dat_files)}] Processando (Etapas 2 e 3): '{dat_file}'...")
+
+        try:
+            # Pré-processamento único: leitura, serviços, grafo e APSP
+            instancia = preparar_instancia(full_instance_filepath, cache_apsp=cache_apsp,
+                                           extremos_apsp=extremos_por_instancia.get(full_instance_filepath),
+                                           com_predecessores=percursos_directory is not None)
+            if instancia.servicos_inviaveis:
+                inviaveis_por_instancia[dat_file] = instancia.servicos_inviaveis
+
+            # Etapa 2: solução inicial
+            salvar_solucao(os.path.join(output_directory, output_filename_base),
+                           *gerar_solucao_inicial_aprimorada(instancia))
+
+            # Etapa 3: solução melhorada, sobre a mesma instância preparada
+            resultado_etapa3 = otimizar_solucao(instancia)
+            salvar_solucao(os.path.join(output_directory_improved, output_filename_base), *resultado_etapa3)
+
+            # Ruas de cada deslocamento da solução melhorada (caminhos reconstruídos sob demanda)
+            if percursos_directory is not None:
+                salvar_percursos(os.path.join(percursos_directory, "percursos-" + dat_file),
+                                 resultado_etapa3[4], instancia.short_paths_matrix)
+
+            elapsed_time_file = (time.perf_counter() - current_file_start_time) * 1000 # Tempo em milissegundos
+            print(f"  Concluído: '{output_filename_base}' (Etapas 2 e 3) em {elapsed_time_file:.2f} ms")
+
+        except Exception as e:
+            print(f"  ERRO ao processar '{dat_file}': {type(e).__name__}: {e}")
+            print(f"  Saídas para '{output_filename_base}' podem estar incompletas ou ausentes.")
+        print("-" * 50) # Imprime um separador visual para melhor legibilidade no console
+
+    total_elapsed_batch_time = time.perf_counter() - start_time_batch # Tempo total em segundos
+
+    print(f"\n--- Processamento de todos os arquivos das ETAPAS 2 e 3 concluído ---")
+    print(f"Total de arquivos processados: {processed_count}")
+    print(f"Tempo total de execução: {total_elapsed_batch_time:.2f} segundos")
+    total_inviaveis = sum(len(inviaveis) for inviaveis in inviaveis_por_instancia.values())
+    print(f"Serviços inviáveis, fora das soluções: {total_inviaveis} (em {len(inviaveis_por_instancia)} instância(s))")
+    # IDs e motivos também ficam registrados ao lado das soluções
+    salvar_servicos_inviaveis(os.path.join(output_directory, ARQUIVO_SERVICOS_INVIAVEIS), inviaveis_por_instancia)
+    salvar_servicos_inviaveis(os.path.join(output_directory_improved, ARQUIVO_SERVICOS_INVIAVEIS), inviaveis_por_instancia)
+    print(cache_apsp.resumo())
+    for linha in cache_apsp.resumo_por_familia():
+        print(linha)
+    print(f"Saídas geradas em: '{output_directory}' e '{output_directory_improved}'")
+
+# Este bloco garante que o código abaixo só será executado quando o script for chamado diretamente
+if __name__ == "__main__":
+    # CONFIGURAÇÃO DOS DIRETÓRIOS DE TRABALHO
+    input_directory = "instancias"                 # Pasta das instâncias (.dat)
+    output_directory = "saidas"                    # Pasta das soluções da Etapa 2
+    output_directory_improved = "saidas_Melhoradas" # Pasta das soluções melhoradas da Etapa 3
+
+    # Define a pasta onde as matrizes APSP são guardadas entre execuções (reaproveitadas se o grafo não mudar).
+    cache_directory = "cache_apsp"
+
+    processar_arquivos_completo(input_directory, output_directory, output_directory_improved, cache_directory)
@@ -6,9 +6,11 @@ import sys   # Importa o módulo 'sys' para interagir com o sistema (ex: sair do
 
 # Importa a função principal de otimização da Etapa 3.
 # Esta função é agora autocontida, ou seja, ela gerará a solução inicial e fará a busca local internamente.
-from otimizador_melhorado import otimizar_solucao 
+from instancia_preparada import preparar_instancia, salvar_servicos_inviaveis, ARQUIVO_SERVICOS_INVIAVEIS
+from otimizador_melhorado import otimizar_solucao
+from cache_apsp import CacheAPSP, agrupar_instancias_por_rede # Cache das matrizes APSP (entre instâncias e execuções)
 
-def processar_arquivos_etapa3(input_directory, output_directory_improved):
+def processar_arquivos_etapa3(input_directory, output_directory_improved, cache_directory=None):
     """
     Processa todos os arquivos .dat de um diretório de entrada, gera soluções
     aprimoradas (Etapa 3) para cada um e salva os resultados em um diretório de saída dedicado.
@@ -16,6 +18,9 @@ def processar_arquivos_etapa3(input_directory, output_directory_improved):
     Args:
         input_directory (str): O caminho para o diretório contendo os arquivos .dat de instância.
         output_directory_improved (str): O caminho para o diretório onde as soluções melhoradas serão salvas.
+        cache_directory (str, optional): Pasta do cache em disco das matrizes APSP. Se None, o cache
+                                         vale apenas durante a execução: instâncias com a mesma rede
+                                         ainda compartilham o APSP, mas nada é gravado em disco.
     """
     # Tenta criar o diretório de saída para as soluções melhoradas.
     # Se já existir, a função não faz nada (exist_ok=True).
@@ -63,7 +68,14 @@ def processar_arquivos_etapa3(input_directory, output_directory_improved):
     print(f"Arquivos de instância em: '{input_directory}'")
     print(f"Arquivos de saída melhorados (Etapa 3) serão salvos em: '{output_directory_improved}'\n")
 
+    # Cache das matrizes APSP (chave: impressão digital do grafo de cada instância), em disco se houver pasta
+    cache_apsp = CacheAPSP(cache_directory)
+    # Instâncias com a mesma rede (ex: mgval/mggdb com diferentes taxas de demanda) usam os extremos
+    # unidos do grupo, de modo que o APSP é calculado uma única vez por rede distinta
+    extremos_por_instancia = agrupar_instancias_por_rede([os.path.join(input_directory, f) for f in dat_files])
+
     processed_count = 0 # Contador para o número de arquivos processados
+    inviaveis_por_instancia = {} # Serviços fora das soluções (ver `identificar_servicos_inviaveis`)
     start_time_batch = time.perf_counter() # Marca o tempo de início do processamento em lote
 
     # Loop principal para processar cada arquivo .dat
@@ -82,12 +94,17 @@ def processar_arquivos_etapa3(input_directory, output_directory_improved):
         print(f"[{processed_count}/{len(dat_files)}] Processando (Etapa 3): '{dat_file}'...")
 
         try:
+            # A instância é preparada aqui para que os serviços inviáveis entrem no resumo do lote
+            instancia = preparar_instancia(full_instance_filepath, cache_apsp=cache_apsp,
+                                           extremos_apsp=extremos_por_instancia.get(full_instance_filepath))
+            if instancia.servicos_inviaveis:
+                inviaveis_por_instancia[dat_file] = instancia.servicos_inviaveis
             # Chama a função principal de otimização da Etapa 3.
             # Esta função retorna o custo total da solução melhorada, o número de rotas,
             # o tempo total de execução da Etapa 3, o tempo gasto no cálculo do APSP,
             # e os dados detalhados das rotas otimizadas.
             total_cost, num_routes, clocks_ref_exec, clocks_ref_find, routes_data = \
-                otimizar_solucao(full_instance_filepath) # A função agora é autocontida e precisa apenas do caminho da instância
+                otimizar_solucao(instancia) # A função é autocontida: a instância já preparada dispensa a leitura e o APSP
             
             # Abre o arquivo de saída no modo de escrita ('w') para salvar os resultados
             with open(full_output_filepath, 'w') as f:
@@ -128,6 +145,13 @@ def processar_arquivos_etapa3(input_directory, output_directory_improved):
     print(f"\n--- Processamento de todos os arquivos da ETAPA 3 concluído ---")
     print(f"Total de arquivos processados: {processed_count}")
     print(f"Tempo total de execução: {total_elapsed_batch_time:.2f} segundos")
+    total_inviaveis = sum(len(inviaveis) for inviaveis in inviaveis_por_instancia.values())
+    print(f"Serviços inviáveis, fora das soluções: {total_inviaveis} (em {len(inviaveis_por_instancia)} instância(s))")
+    # IDs e motivos também ficam registrados ao lado das soluções
+    salvar_servicos_inviaveis(os.path.join(output_directory_improved, ARQUIVO_SERVICOS_INVIAVEIS), inviaveis_por_instancia)
+    print(cache_apsp.resumo())
+    for linha in cache_apsp.resumo_por_familia():
+        print(linha)
     print(f"Todos os arquivos de saída melhorados foram gerados em: '{output_directory_improved}'")
 
 # Este bloco garante que o código abaixo só será executado quando o script for chamado diretamente
@@ -137,6 +161,9 @@ if __name__ == "__main__":
     input_directory = "instancias" 
     # Define a pasta onde as soluções melhoradas da Etapa 3 serão salvas.
     output_directory_improved = "saidas_Melhoradas" 
+
+    # Define a pasta onde as matrizes APSP são guardadas entre execuções (reaproveitadas se o grafo não mudar).
+    cache_directory = "cache_apsp"
     
     # Chama a função principal para iniciar o processamento de todos os arquivos
-    processar_arquivos_etapa3(input_directory, output_directory_improved)
\ No newline at end of file
+    processar_arquivos_etapa3(input_directory, output_directory_improved, cache_directory)
\ No newline at end of file
@@ -0,0 +1,344 @@
+from array import array # Importa array para armazenar as distâncias em um bloco contíguo de inteiros (int64)
+
+# Valor sentinela usado para representar "não existe caminho" dentro do array de inteiros.
+# É grande o bastante para nunca ser confundido com uma distância real e pequeno o bastante
+# para que a soma de dois sentinelas ainda caiba em um int64 (útil em algoritmos min-plus).
+DISTANCIA_INALCANCAVEL = 2 ** 62 - 1
+INFINITO = float('inf') # Valor devolvido aos consumidores para pares sem caminho
+
+class MatrizDistancias:
+    """
+    Armazena a matriz de caminhos mais curtos (APSP) de forma compacta.
+    As distâncias ficam em um único array de int64, organizado linha a linha (row-major)
+    pelo índice denso de cada nó, em vez de um dicionário com chaves (u, v).
+    Pares sem caminho são guardados com o sentinela DISTANCIA_INALCANCAVEL e devolvidos
+    como float('inf') pelos métodos de acesso, mantendo a semântica do dicionário antigo.
+    A matriz pode ser restrita (retangular): apenas algumas origens (linhas) e destinos (colunas).
+    """
+    __slots__ = ('nos', 'nos_destino', 'indice_no', 'inicio_linha', 'n', 'dados', 'predecessores')
+
+    def __init__(self, nos, buffer=None, nos_destino=None):
+        """
+        Args:
+            nos (list): Lista dos nós de origem (linhas). Na matriz completa, todos os nós do grafo.
+                        A posição de cada nó nesta lista define o seu índice denso na matriz.
+            buffer (optional): Bloco de memória externo (ex: `SharedMemory.buf`) com pelo menos
+                               linhas*colunas*8 bytes. Se informado, a matriz passa a ler e escrever
+                               diretamente nesse bloco, sem cópia e sem inicializá-lo.
+            nos_destino (list, optional): Lista dos nós de destino (colunas). Se None, usa `nos`
+                                          (matriz quadrada completa).
+        """
+        self.nos = list(nos)
+        self.nos_destino = self.nos if nos_destino is None else list(nos_destino)
+        self.indice_no = {no: idx for idx, no in enumerate(self.nos_destino)} # Nó -> índice denso (coluna)
+        self.n = len(self.nos_destino) # Largura de cada linha
+        self.inicio_linha = {no: idx * self.n for idx, no in enumerate(self.nos)} # Nó -> deslocamento da linha
+        total_celulas = len(self.nos) * self.n
+        if buffer is None:
+            self.dados = array('q', [DISTANCIA_INALCANCAVEL]) * total_celulas # Inicia tudo como inalcançável
+        else:
+            # Visão int64 sobre o bloco externo (usada, por exemplo, com memória compartilhada entre processos)
+            self.dados = memoryview(buffer)[:total_celulas * 8].cast('q')
+        self.predecessores = None # MatrizPredecessores opcional (ver `calcular_apsp(..., com_predecessores=True)`)
+
+    def definir_linha(self, origem, distancias):
+        """
+        Copia para a matriz as distâncias calculadas a partir de um nó de origem.
+
+        Args:
+            origem (int): O nó de origem da linha.
+            distancias (dict): Dicionário nó -> distância (como retornado pelo Dijkstra).
+                               Distâncias infinitas são gravadas como o sentinela; nós que não
+                               são colunas da matriz são ignorados.
+        """
+        base = self.inicio_linha[origem]
+        dados = self.dados
+        for destino, coluna in self.indice_no.items():
+            dist = distancias.get(destino, INFINITO)
+            if dist != INFINITO:
+                dados[base + coluna] = dist
+
+    def definir_linha_densa(self, origem, distancias, indices_destino):
+        """
+        Copia para a matriz uma linha de distâncias indexada por índice denso do grafo
+        (como retornada por `dijkstra_csr`), em uma única atribuição de fatia.
+
+        Args:
+            origem (int): O nó de origem da linha.
+            distancias (list): Distância para cada índice denso do grafo (sentinela se inalcançável).
+            indices_destino (list): Índice denso no grafo de cada coluna da matriz, na ordem de `nos_destino`.
+        """
+        base = self.inicio_linha[origem]
+        self.dados[base:base + self.n] = array('q', [distancias[j] for j in indices_destino])
+
+    def distancia(self, u, v):
+        """
+        Retorna a distância do caminho mais curto de u para v.
+
+        Args:
+            u (int): Nó de origem.
+            v (int): Nó de destino.
+
+        Returns:
+            float | int: A distância, ou float('inf') se não existir caminho (ou se algum dos nós
+                         não pertencer ao grafo).
+        """
+        try:
+            dist = self.dados[self.inicio_linha[u] + self.indice_no[v]]
+        except KeyError:
+            return INFINITO # Nó fora do grafo: mesmo comportamento do dict.get(..., inf)
+        if dist == DISTANCIA_INALCANCAVEL:
+            return INFINITO
+        return dist
+
+    def linha(self, u):
+        """
+        Retorna uma visão (memoryview) da linha de distâncias do nó u, sem cópia.
+        Os valores estão na ordem de `self.nos_destino` e usam o sentinela para pares inalcançáveis.
+        """
+        base = self.inicio_linha[u]
+        return memoryview(self.dados)[base:base + self.n]
+
+    def caminho(self, u, v):
+        """
+        Retorna a sequência de nós do caminho mais curto de u para v (ver `MatrizPredecessores.caminho`).
+        Requer que a matriz tenha sido calculada com predecessores.
+        """
+        if self.predecessores is None:
+            raise ValueError("A matriz não guarda predecessores; calcule-a com com_predecessores=True.")
+        return self.predecessores.caminho(u, v)
+
+    def tamanho_em_bytes(self):
+        """Retorna o tamanho (em bytes) do bloco de distâncias armazenado."""
+        return self.dados.itemsize * len(self.dados)
+
+    def carregar_bytes(self, dados_brutos):
+        """
+        Substitui o conteúdo da matriz por um bloco de bytes já no formato interno
+        (int64 row-major, com o sentinela para pares inalcançáveis), ex: `ndarray.tobytes()`.
+        """
+        dados = array('q')
+        dados.frombytes(dados_brutos)
+        if len(dados) != len(self.nos) * self.n:
+            raise ValueError(f"Esperados {len(self.nos) * self.n} valores na matriz, recebidos {len(dados)}.")
+        self.dados = dados
+
+    def preencher_inalcancavel(self):
+        """Marca todos os pares como inalcançáveis (útil para inicializar um buffer externo)."""
+        self.dados[:] = array('q', [DISTANCIA_INALCANCAVEL]) * (len(self.nos) * self.n)
+
+    def copiar_para_memoria_propria(self):
+        """
+        Copia as distâncias de um buffer externo para um array próprio da matriz,
+        liberando a referência ao buffer (necessário antes de fechar uma memória compartilhada).
+        """
+        if isinstance(self.dados, array):
+            return
+        dados_proprios = array('q')
+        dados_proprios.frombytes(self.dados.cast('B'))
+        self.dados.release()
+        self.dados = dados_proprios
+
+class MatrizDistanciasSimetrica(MatrizDistancias):
+    """
+    Matriz APSP de um grafo não direcionado (d(u, v) == d(v, u) para todo par): guarda apenas o
+    triângulo superior (incluindo a diagonal) sobre um único conjunto de nós, que são ao mesmo tempo
+    origens e destinos. A linha i ocupa as células (i, i..k-1), contíguas no array de int64, e
+    `inicio_linha[i]` é o deslocamento tal que a célula (i, j), j >= i, fica em `inicio_linha[i] + j`.
+    A interface de consulta é a mesma de `MatrizDistancias`: `distancia(u, v)` troca os índices
+    quando u vem depois de v, de forma transparente para os construtivos e operadores.
+    Como na matriz restrita, apenas os pares que o solver consulta são garantidos (ver
+    `ordem_matriz_simetrica`); os demais podem valer float('inf'). A diagonal vale sempre zero.
+    """
+    __slots__ = ()
+
+    def __init__(self, nos, buffer=None):
+        """
+        Args:
+            nos (list): Nós da matriz (origens e destinos). A posição de cada nó define a sua linha/coluna.
+            buffer (optional): Bloco de memória externo com pelo menos k*(k+1)/2*8 bytes.
+        """
+        self.nos = list(nos)
+        self.nos_destino = self.nos
+        self.indice_no = {no: idx for idx, no in enumerate(self.nos)} # Nó -> índice denso
+        k = self.n = len(self.nos)
+        self.inicio_linha = [i * k - i * (i - 1) // 2 - i for i in range(k)] # Linha i -> deslocamento
+        total_celulas = k * (k + 1) // 2
+        if buffer is None:
+            self.dados = array('q', [DISTANCIA_INALCANCAVEL]) * total_celulas
+            self._zerar_diagonal()
+        else:
+            self.dados = memoryview(buffer)[:total_celulas * 8].cast('q')
+        self.predecessores = None # Não há predecessores na forma triangular
+
+    def _zerar_diagonal(self):
+        """Grava d(u, u) = 0, inclusive para os nós cujas linhas não são calculadas."""
+        for i in range(self.n):
+            self.dados[self.inicio_linha[i] + i] = 0
+
+    @staticmethod
+    def num_celulas(num_nos):
+        """Número de células (int64) guardadas para uma matriz simétrica com `num_nos` nós."""
+        return num_nos * (num_nos + 1) // 2
+
+    def definir_linha(self, origem, distancias):
+        """
+        Copia para a matriz as distâncias da origem para os nós que vêm depois dela (triângulo superior).
+
+        Args:
+            origem (int): O nó de origem da linha.
+            distancias (dict): Dicionário nó -> distância (como retornado pelo Dijkstra).
+        """
+        i = self.indice_no[origem]
+        base = self.inicio_linha[i]
+        for j in range(i, self.n):
+            dist = distancias.get(self.nos[j], INFINITO)
+            if dist != INFINITO:
+                self.dados[base + j] = dist
+
+    def definir_linha_densa(self, origem, distancias, indices_destino):
+        """
+        Como `MatrizDistancias.definir_linha_densa`, gravando apenas as colunas j >= i da linha i.
+
+        Args:
+            origem (int): O nó de origem da linha.
+            distancias (list): Distância para cada índice denso do grafo (sentinela se inalcançável).
+            indices_destino (list): Índice denso no grafo de cada nó da matriz, na ordem de `nos`.
+        """
+        i = self.indice_no[origem]
+        base = self.inicio_linha[i]
+        self.dados[base + i:base + self.n] = array('q', [distancias[j] for j in indices_destino[i:]])
+
+    def distancia(self, u, v):
+        """
+        Retorna a distância do caminho mais curto entre u e v (igual nos dois sentidos).
+
+        Returns:
+            float | int: A distância, ou float('inf') se não existir caminho (ou se algum dos nós
+                         não pertencer à matriz).
+        """
+        try:
+            i = self.indice_no[u]
+            j = self.indice_no[v]
+        except KeyError:
+            return INFINITO
+        if i > j:
+            i, j = j, i
+        dist = self.dados[self.inicio_linha[i] + j]
+        if dist == DISTANCIA_INALCANCAVEL:
+            return INFINITO
+        return dist
+
+    def linha(self, u):
+        """
+        Retorna a linha de distâncias do nó u, na ordem de `self.nos`. Como metade da linha está
+        guardada em outras linhas (coluna de u), o resultado é uma cópia (array de int64).
+        """
+        i = self.indice_no[u]
+        dados, inicio_linha = self.dados, self.inicio_linha
+        linha = array('q', (dados[inicio_linha[j] + i] for j in range(i)))
+        linha.extend(dados[inicio_linha[i] + i:inicio_linha[i] + self.n])
+        return linha
+
+    def carregar_bytes(self, dados_brutos):
+        """Substitui o conteúdo da matriz por um bloco de bytes do triângulo superior (int64)."""
+        dados = array('q')
+        dados.frombytes(dados_brutos)
+        if len(dados) != self.num_celulas(self.n):
+            raise ValueError(f"Esperados {self.num_celulas(self.n)} valores na matriz, recebidos {len(dados)}.")
+        self.dados = dados
+
+    def preencher_inalcancavel(self):
+        """Marca todos os pares como inalcançáveis (útil para inicializar um buffer externo)."""
+        self.dados[:] = array('q', [DISTANCIA_INALCANCAVEL]) * self.num_celulas(self.n)
+        self._zerar_diagonal()
+
+class MatrizPredecessores:
+    """
+    Armazena, para cada origem da matriz APSP, o predecessor de cada nó do grafo no caminho mais curto
+    a partir dessa origem (árvore de caminhos mínimos), em um único array de int32 linha a linha.
+    Os predecessores são índices densos do grafo (posição em `nos_grafo`), com -1 para a própria
+    origem e para nós inalcançáveis. Cada linha cobre todos os nós do grafo, e não apenas as colunas
+    da matriz de distâncias, pois os caminhos passam por vértices não requeridos.
+    Os caminhos são reconstruídos sob demanda e guardados em cache.
+    """
+    __slots__ = ('nos_grafo', 'indice_grafo', 'inicio_linha', 'n', 'dados', 'caminhos', 'reducao')
+
+    def __init__(self, origens, nos_grafo, buffer=None):
+        """
+        Args:
+            origens (list): Nós de origem (linhas), os mesmos da matriz de distâncias.
+            nos_grafo (list): Todos os nós do grafo, na ordem dos índices densos usados pelo Dijkstra.
+            buffer (optional): Bloco de memória externo com pelo menos linhas*nós*4 bytes (ex: `SharedMemory.buf`).
+        """
+        self.nos_grafo = list(nos_grafo)
+        self.indice_grafo = {no: idx for idx, no in enumerate(self.nos_grafo)} # Nó -> índice denso no grafo
+        self.n = len(self.nos_grafo)
+        self.inicio_linha = {no: idx * self.n for idx, no in enumerate(origens)} # Nó -> deslocamento da linha
+        total_celulas = len(self.inicio_linha) * self.n
+        if buffer is None:
+            self.dados = array('i', [-1]) * total_celulas
+        else:
+            self.dados = memoryview(buffer)[:total_celulas * 4].cast('i')
+        self.caminhos = {} # Cache dos caminhos já reconstruídos: (u, v) -> lista de nós ou None
+        self.reducao = None # GrafoReduzido opcional: os caminhos são expandidos para o grafo original
+
+    def definir_linha(self, origem, predecessores):
+        """
+        Copia para a matriz a árvore de caminhos mínimos de uma origem.
+
+        Args:
+            origem (int): O nó de origem da linha.
+            predecessores (list): Predecessor (índice denso, ou -1) de cada índice denso do grafo.
+        """
+        base = self.inicio_linha[origem]
+        self.dados[base:base + self.n] = array('i', predecessores)
+
+    def caminho(self, u, v):
+        """
+        Reconstrói (e guarda em cache) a sequência de nós do caminho mais curto de u para v,
+        seguindo os predecessores a partir de v até a origem u.
+
+        Args:
+            u (int): Nó de origem (precisa ser uma das linhas da matriz).
+            v (int): Nó de destino (qualquer nó do grafo).
+
+        Returns:
+            list | None: Nós do caminho, de u até v inclusive ([u] se u == v), ou None se não
+                         houver caminho ou se u não for uma origem da matriz.
+        """
+        chave = (u, v)
+        if chave in self.caminhos:
+            return self.caminhos[chave]
+
+        caminho_indices = None
+        if u in self.inicio_linha and v in self.indice_grafo:
+            base = self.inicio_linha[u]
+            indice_origem = self.indice_grafo[u]
+            atual = self.indice_grafo[v]
+            caminho_indices = [atual]
+            while atual != indice_origem:
+                atual = self.dados[base + atual]
+                if atual < 0 or len(caminho_indices) > self.n: # Sem caminho (ou árvore inconsistente)
+                    caminho_indices = None
+                    break
+                caminho_indices.append(atual)
+
+        resultado = None if caminho_indices is None else [self.nos_grafo[j] for j in reversed(caminho_indices)]
+        if self.reducao is not None:
+            resultado = self.reducao.expandir_caminho(resultado) # Reinsere os nós internos dos atalhos
+        self.caminhos[chave] = resultado
+        return resultado
+
+    def tamanho_em_bytes(self):
+        """Retorna o tamanho (em bytes) do bloco de predecessores armazenado (sem o cache de caminhos)."""
+        return self.dados.itemsize * len(self.dados)
+
+    def copiar_para_memoria_propria(self):
+        """Copia os predecessores de um buffer externo para um array próprio, liberando o buffer."""
+        if isinstance(self.dados, array):
+            return
+        dados_proprios = array('i')
+        dados_proprios.frombytes(self.dados.cast('B'))
+        self.dados.release()
+        self.dados = dados_proprios
@@ -0,0 +1,146 @@
+import heapq # Importa heapq para selecionar os vizinhos mais próximos de cada serviço
+import sys # Importa sys para medir o tamanho da lista de custos
+from operator import add, sub # Soma elemento a elemento (deslocamento + custo de serviço) sem laço em Python
+
+from matriz_distancias import DISTANCIA_INALCANCAVEL, INFINITO
+
+try:
+    import numpy as np # Dependência opcional: necessária apenas para a visão em ndarray (ver `como_ndarray`)
+except ImportError:
+    np = None
+
+# Índice do depósito na matriz de serviços: os serviços usam os próprios IDs globais (1..S)
+INDICE_DEPOSITO = 0
+
+class MatrizServicos:
+    """
+    Matriz de custos serviço -> serviço, indexada diretamente pelo ID global dos serviços, com o
+    depósito no índice 0. A célula (a, b) guarda o custo de, terminado o serviço a, deslocar-se até o
+    início de b e executá-lo: d(fim de a, início de b) + custo de serviço de b. O depósito tem início
+    e fim no próprio nó e custo de serviço zero, de modo que o custo de uma rota é a soma das células
+    entre visitas consecutivas, de 0 a 0.
+
+    Substitui, nos operadores de busca local, os dois saltos de cada avaliação
+    (`id_to_service_obj[id]['to']` e depois `sp_matrix.distancia(to, from)`) por um único acesso a
+    uma lista plana de (S + 1)² posições. Os valores são lidos de uma lista de inteiros pelo mesmo
+    motivo de `GrafoCSR`; pares sem caminho valem float('inf').
+    """
+    __slots__ = ('n', 'custos', 'custo_servico', 'demanda', 'inicio', 'fim', 'custos_ndarray')
+
+    def __init__(self, servicos, depot_node, short_paths_matrix):
+        """
+        Args:
+            servicos (list): Serviços requeridos com IDs globais 1..S (ver `montar_servicos`).
+            depot_node (int): O nó do depósito.
+            short_paths_matrix (MatrizDistancias): Matriz APSP com origens no depósito e nos fins dos
+                                                   serviços e destinos no depósito e nos inícios.
+        """
+        n = self.n = len(servicos) + 1
+        self.inicio = [depot_node] * n       # ID -> nó de início do serviço
+        self.fim = [depot_node] * n          # ID -> nó de fim do serviço
+        self.custo_servico = [0] * n         # ID -> custo de serviço
+        self.demanda = [0] * n               # ID -> demanda
+        for servico in servicos:
+            s = servico['id']
+            self.inicio[s], self.fim[s] = servico['from'], servico['to']
+            self.custo_servico[s], self.demanda[s] = servico['service_cost'], servico['demand']
+
+        self.custos_ndarray = None # Cópia em ndarray, montada na primeira chamada de `como_ndarray`
+
+        # Preenche linha a linha: a linha de a é a linha APSP do fim de a, lida nas colunas dos inícios
+        colunas = [short_paths_matrix.indice_no[no] for no in self.inicio]
+        linhas_apsp = {} # Serviços que terminam no mesmo nó compartilham a linha
+        self.custos = []
+        for a in range(n):
+            linha = linhas_apsp.get(self.fim[a])
+            if linha is None:
+                linha = linhas_apsp[self.fim[a]] = self._linha(short_paths_matrix, self.fim[a], colunas)
+            self.custos.extend(linha)
+
+    def _linha(self, short_paths_matrix, origem, colunas):
+        """Monta a linha de custos de um nó de origem (deslocamento até cada início + custo de serviço)."""
+        distancias = short_paths_matrix.linha(origem)
+        deslocamentos = [distancias[coluna] for coluna in colunas]
+        linha = list(map(add, deslocamentos, self.custo_servico))
+        if DISTANCIA_INALCANCAVEL in deslocamentos: # Raro: só com serviços fora do alcance do depósito
+            linha = [INFINITO if dist == DISTANCIA_INALCANCAVEL else custo
+                     for dist, custo in zip(deslocamentos, linha)]
+        return linha
+
+    def custo(self, a, b):
+        """Custo de ir do fim do serviço a ao início do serviço b e executá-lo (0 = depósito)."""
+        return self.custos[a * self.n + b]
+
+    def deslocamento(self, a, b):
+        """Apenas o deslocamento (deadheading) do fim do serviço a ao início do serviço b (0 = depósito)."""
+        return self.custos[a * self.n + b] - self.custo_servico[b]
+
+    def vizinhos(self, k, servicos_ativos=None):
+        """
+        Listas de vizinhança granular: para cada serviço s, os k serviços com menor deslocamento até o
+        início de s (candidatos a vir logo antes de s numa rota) e os k com menor deslocamento a partir
+        do fim de s (candidatos a vir logo depois). Empates ficam com o menor ID.
+
+        Args:
+            k (int): Tamanho de cada lista.
+            servicos_ativos (iterable, optional): IDs considerados (padrão: todos os serviços, 1..S).
+
+        Returns:
+            tuple: (antecessores (list), sucessores (list)), cada um indexado pelo ID (lista vazia no depósito
+                   e nos serviços fora de `servicos_ativos`).
+        """
+        n, custos, custo_servico = self.n, self.custos, self.custo_servico
+        ativos = sorted(servicos_ativos) if servicos_ativos is not None else list(range(1, n))
+        antecessores = [[] for _ in range(n)]
+        sucessores = [[] for _ in range(n)]
+        for s in ativos:
+            base = s * n
+            # Deslocamentos a partir do fim de s (sucessores) e até o início de s (coluna s, antecessores;
+            # o custo de serviço de s, comum a toda a coluna, não altera a ordem)
+            saindo = list(map(sub, custos[base:base + n], custo_servico))
+            chegando = custos[s::n]
+            sucessores[s] = [v for v in heapq.nsmallest(k + 1, ativos, key=saindo.__getitem__) if v != s][:k]
+            antecessores[s] = [v for v in heapq.nsmallest(k + 1, ativos, key=chegando.__getitem__) if v != s][:k]
+        return antecessores, sucessores
+
+    def como_ndarray(self):
+        """
+        Retorna os custos como um ndarray (S + 1) x (S + 1) de float64 (exato para somas de custos
+        inteiros; pares sem caminho valem inf), montado uma única vez e reaproveitado pelos
+        construtivos vetorizados. Requer numpy.
+        """
+        if np is None:
+            raise ImportError("A visão em ndarray da matriz de serviços requer o pacote 'numpy'.")
+        if self.custos_ndarray is None:
+            self.custos_ndarray = np.array(self.custos, dtype=np.float64).reshape(self.n, self.n)
+        return self.custos_ndarray
+
+    def custo_visitas(self, visitas):
+        """
+        Custo total de uma rota, saindo do depósito e voltando a ele.
+
+        Args:
+            visitas (list): Visitas de serviço da rota, tuplas ('S', id, from, to), sem as do depósito.
+
+        Returns:
+            float | int: O custo da rota (0 se vazia, float('inf') se algum deslocamento não existe).
+        """
+        if not visitas:
+            return 0 # Rota vazia (apenas Depot -> Depot) tem custo zero
+        custos, n = self.custos, self.n
+        anterior = INDICE_DEPOSITO
+        total = 0
+        for visita in visitas:
+            s = visita[1]
+            total += custos[anterior * n + s]
+            anterior = s
+        return total + custos[anterior * n + INDICE_DEPOSITO]
+
+    def demanda_visitas(self, visitas):
+        """Demanda total das visitas de serviço de uma rota."""
+        demanda = self.demanda
+        return sum(demanda[visita[1]] for visita in visitas)
+
+    def tamanho_em_bytes(self):
+        """Retorna o tamanho (em bytes) da lista de custos (sem contar os ints compartilhados)."""
+        return sys.getsizeof(self.custos)
@@ -1,59 +1,32 @@
 # otimizador_melhorado.py (Versão Final Otimizada - Etapa 3 Autocontida)
 import time # Importa o módulo time para medir o tempo de execução
-import heapq # Importa heapq, uma implementação de fila de prioridade para Dijkstra
-from collections import defaultdict, deque # Importa defaultdict para listas de adjacência e deque para otimizações de fila
-import copy # Importa copy para cópias de objetos, especialmente listas aninhadas
-from copy import deepcopy # Importa deepcopy para criar cópias independentes de objetos complexos
+from collections import deque # Fila dos serviços a reavaliar no Relocate inter-rotas
+from itertools import chain, repeat # Para percorrer as duas listas de vizinhos de um serviço sem copiá-las
 from concurrent.futures import ThreadPoolExecutor # Para paralelizar tarefas em threads
 import os # Importa os para interagir com o sistema operacional (ex: obter número de CPUs)
 
-# Importa módulos base necessários para carregar dados e construir o grafo.
-# NOTA: Este módulo é autocontido para a Etapa 3, portanto, não importa o 'otimizador.py' da Etapa 2
-# para evitar dependências e recálculos duplicados do APSP.
-from leitor_dados import carregar_dados_arquivo
-from grafo_estatisticas import construir_grafo, contar_vertices
+# Importa módulos base necessários para carregar dados, construir o grafo e calcular o APSP.
+# NOTA: Este módulo é autocontido para a Etapa 3, portanto, não importa o 'otimizador.py' da Etapa 2;
+# as duas etapas compartilham apenas o pré-processamento (instancia_preparada.py).
+# Pré-processamento compartilhado com a Etapa 2: leitura dos dados, tabela de serviços, grafo e APSP
+from instancia_preparada import InstanciaPreparada, preparar_instancia
+from matriz_servicos import MatrizServicos
+from solucao import Solucao
+from matriz_distancias import INFINITO
+from construtivo import MODOS_CONSTRUTIVO, FUNCOES_CONSTRUTIVO, montar_rotas_saida
 
-# --- Funções Auxiliares Comuns (Dijkstra, Cálculo de Custo/Demanda) ---
-
-def dijkstra_optimized(start_node, graph_adj, traversal_costs, all_nodes):
-    """
-    Calcula as distâncias dos caminhos mais curtos de um nó inicial para todos os outros nós.
-    Implementação otimizada do algoritmo de Dijkstra usando uma fila de prioridade (heap).
-    
-    Args:
-        start_node (int): O nó de origem.
-        graph_adj (defaultdict): Lista de adjacência do grafo.
-        traversal_costs (dict): Dicionário de custos de travessia (chave: (u, v), valor: custo).
-        all_nodes (list): Lista de todos os nós no grafo.
-        
-    Returns:
-        dict: Dicionário onde as chaves são os nós e os valores são as distâncias mais curtas de start_node.
-    """
-    distances = {node: float('inf') for node in all_nodes} # Inicializa distâncias com infinito
-    distances[start_node] = 0 # Distância do nó inicial para si mesmo é 0
-    pq = [(0, start_node)] # Fila de prioridade: (custo_acumulado, nó)
-
-    while pq:
-        dist, current_node = heapq.heappop(pq) # Extrai o nó com menor custo
-        if dist > distances[current_node]: # Se já encontrou um caminho melhor, ignora
-            continue
-        for neighbor in graph_adj.get(current_node, []): # Itera sobre os vizinhos do nó atual
-            cost_to_neighbor = traversal_costs.get((current_node, neighbor), float('inf')) # Custo da aresta/arco
-            if cost_to_neighbor == float('inf'): # Se o caminho não existe ou é inválido, pula
-                continue
-            if distances[current_node] + cost_to_neighbor < distances[neighbor]: # Se encontrou um caminho mais curto
-                distances[neighbor] = distances[current_node] + cost_to_neighbor # Atualiza a distância
-                heapq.heappush(pq, (distances[neighbor], neighbor)) # Adiciona/atualiza na fila de prioridade
-    return distances
+# --- Funções Auxiliares Comuns (Cálculo de Custo/Demanda) ---
 
 def calculate_route_cost_from_segments(services_segment, sp_matrix, depot, id_map):
     """
     Calcula o custo total de uma rota dada uma sequência de segmentos de serviço.
     Considera os custos de travessia (da matriz APSP) e os custos de serviço.
+    Os operadores de busca local usam `MatrizServicos.custo_visitas`, com o mesmo resultado e um
+    único acesso por deslocamento; esta versão é mantida para quem consulta a matriz APSP diretamente.
     
     Args:
         services_segment (list): Lista de tuplas de serviços na rota (excluindo 'D' de depósito).
-        sp_matrix (dict): Matriz de caminhos mais curtos (All-Pairs Shortest Path).
+        sp_matrix (MatrizDistancias): Matriz de caminhos mais curtos (All-Pairs Shortest Path).
         depot (int): O nó do depósito.
         id_map (dict): Dicionário mapeando service_id para o objeto de serviço completo.
         
@@ -68,7 +41,7 @@ def calculate_route_cost_from_segments(services_segment, sp_matrix, depot, id_ma
         first_service_id = services_segment[0][1]
         first_service_obj = id_map[first_service_id]
         
-        travel_cost = sp_matrix.get((current_location, first_service_obj['from']), float('inf'))
+        travel_cost = sp_matrix.distancia(current_location, first_service_obj['from'])
         if travel_cost == float('inf'): return float('inf') # Caminho inacessível
         cost += travel_cost # Adiciona custo de travessia
         cost += first_service_obj['service_cost'] # Adiciona custo do serviço
@@ -82,7 +55,7 @@ def calculate_route_cost_from_segments(services_segment, sp_matrix, depot, id_ma
         prev_service_obj = id_map[prev_service_id]
         current_service_obj = id_map[current_service_id]
         
-        travel_cost = sp_matrix.get((prev_service_obj['to'], current_service_obj['from']), float('inf'))
+        travel_cost = sp_matrix.distancia(prev_service_obj['to'], current_service_obj['from'])
         if travel_cost == float('inf'): return float('inf') # Caminho inacessível
         cost += travel_cost # Adiciona custo de travessia entre serviços
         cost += current_service_obj['service_cost'] # Adiciona custo do serviço
@@ -90,7 +63,7 @@ def calculate_route_cost_from_segments(services_segment, sp_matrix, depot, id_ma
 
     # Custo de retorno ao depósito a partir do último serviço
     if services_segment:
-        cost_to_depot = sp_matrix.get((current_location, depot), float('inf'))
+        cost_to_depot = sp_matrix.distancia(current_location, depot)
         if cost_to_depot == float('inf'): return float('inf') # Caminho inacessível
         cost += cost_to_depot
     else:
@@ -121,7 +94,8 @@ def calculate_route_demand(services_segment, id_map, capacity):
 # --- Lógica do Algoritmo Construtivo (Etapa 2), agora INTERNA a este módulo ---
 def generate_initial_solution_internal(
     dados_gerais, required_nodes, required_edges, non_required_edges, 
-    required_arcs, non_required_arcs, short_paths_matrix, id_to_service_obj):
+    required_arcs, non_required_arcs, short_paths_matrix, id_to_service_obj, servicos_inviaveis=(),
+    matriz_servicos=None, modo_construtivo='indexado'):
     """
     Gera uma solução inicial para o problema de roteamento de veículos.
     Esta função replica a lógica construtiva da Etapa 2, usando a matriz APSP já calculada.
@@ -134,8 +108,18 @@ def generate_initial_solution_internal(
         non_required_edges (list): Lista de arestas não requeridas.
         required_arcs (list): Lista de arcos requeridos.
         non_required_arcs (list): Lista de arcos não requeridos.
-        short_paths_matrix (dict): Matriz de caminhos mais curtos (APSP).
+        short_paths_matrix (MatrizDistancias): Matriz de caminhos mais curtos (APSP).
         id_to_service_obj (dict): Mapeamento de service_id para objeto de serviço completo.
+        servicos_inviaveis (dict | set): IDs dos serviços que nenhuma rota pode atender (ver
+                                         `identificar_servicos_inviaveis`); ficam fora da solução.
+        matriz_servicos (MatrizServicos, optional): Custos serviço -> serviço usados no modo 'indexado'.
+                                                    Se None, é montada a partir da matriz APSP.
+        modo_construtivo (str): 'indexado' (padrão, ver `rotas_vizinho_mais_proximo`), 'vetorizado'
+                                (NumPy, ver `rotas_vizinho_mais_proximo_vetorizado`) ou 'escalar'
+                                (percorre todos os serviços pendentes a cada passo), com as mesmas rotas,
+                                'split' (tour gigante + Split, ver `rotas_tour_gigante_split`),
+                                'savings' (Clarke-Wright, ver `rotas_savings`) ou 'portfolio'
+                                (melhor de várias variantes, ver `rotas_portfolio`).
         
     Returns:
         tuple: (total_solution_cost (float), num_routes (int), all_routes_output_data (list)).
@@ -144,12 +128,23 @@ def generate_initial_solution_internal(
     capacidade_veiculo = int(dados_gerais['Capacity'])
     depot_node = int(dados_gerais['Depot Node'])
 
+    if modo_construtivo not in MODOS_CONSTRUTIVO:
+        raise ValueError(f"Modo do construtivo desconhecido: '{modo_construtivo}'. Opções: {', '.join(MODOS_CONSTRUTIVO)}")
+    if modo_construtivo != 'escalar':
+        # Construtivos de construtivo.py: mesma regra (listas de candidatos ou NumPy) ou portfólio de variantes
+        if matriz_servicos is None:
+            matriz_servicos = MatrizServicos(list(id_to_service_obj.values()), depot_node, short_paths_matrix)
+        rotas = FUNCOES_CONSTRUTIVO[modo_construtivo](matriz_servicos, capacidade_veiculo, servicos_inviaveis)
+        total_solution_cost, all_routes_output_data = montar_rotas_saida(rotas, matriz_servicos, depot_node)
+        return total_solution_cost, len(all_routes_output_data), all_routes_output_data
+
     all_routes_output_data = [] # Armazena todas as rotas geradas
     total_solution_cost = 0 # Custo acumulado de todas as rotas
     route_id_counter = 1 # ID para cada nova rota
 
-    # Conjunto de IDs de serviços que ainda não foram atendidos
-    uncovered_service_ids = {s_obj['id'] for s_obj in id_to_service_obj.values()}
+    # Conjunto de IDs de serviços que ainda não foram atendidos (apenas os viáveis: entre eles,
+    # toda distância consultada abaixo é finita)
+    uncovered_service_ids = {s_obj['id'] for s_obj in id_to_service_obj.values() if s_obj['id'] not in servicos_inviaveis}
 
     # Loop principal: continua criando novas rotas enquanto houver serviços não cobertos
     while uncovered_service_ids:
@@ -173,14 +168,10 @@ def generate_initial_solution_internal(
                 continue # Serviço muito grande para a capacidade do veículo
 
             # Custo de ir do depósito até o início do serviço
-            cost_from_depot = short_paths_matrix.get((depot_node, service_obj['from']), float('inf'))
-            if cost_from_depot == float('inf'):
-                continue # Serviço inacessível do depósito
+            cost_from_depot = short_paths_matrix.distancia(depot_node, service_obj['from'])
 
             # Custo de retornar ao depósito depois de realizar o serviço (se ele fosse o único)
-            cost_to_depot_from_service = short_paths_matrix.get((service_obj['to'], depot_node), float('inf'))
-            if cost_to_depot_from_service == float('inf'):
-                continue # Não consegue retornar ao depósito
+            cost_to_depot_from_service = short_paths_matrix.distancia(service_obj['to'], depot_node)
 
             # Custo potencial da rota se só este serviço for atendido
             potential_initial_route_cost = cost_from_depot + service_obj['service_cost'] + cost_to_depot_from_service
@@ -190,13 +181,12 @@ def generate_initial_solution_internal(
                 best_first_service_for_route = service_obj
 
         if best_first_service_for_route is None:
-            # Se não foi possível encontrar nenhum serviço para iniciar uma nova rota,
-            # significa que os serviços restantes são inacessíveis ou excedem a capacidade individualmente.
+            # Todo serviço restante é viável sozinho, então isso não deve ocorrer (verificação defensiva)
             break # Quebra o loop principal, não há mais rotas viáveis a criar
 
         # Adiciona o primeiro serviço encontrado à rota atual
         service_to_add = best_first_service_for_route
-        current_route_cost += short_paths_matrix[(depot_node, service_to_add['from'])] # Custo de ir do depósito ao serviço
+        current_route_cost += short_paths_matrix.distancia(depot_node, service_to_add['from']) # Custo de ir do depósito ao serviço
         current_route_cost += service_to_add['service_cost'] # Custo de serviço em si
         current_route_demand += service_to_add['demand'] # Adiciona a demanda
         current_vehicle_location = service_to_add['to'] # Atualiza a localização do veículo
@@ -216,14 +206,10 @@ def generate_initial_solution_internal(
                     continue # Serviço excede a capacidade remanescente da rota
 
                 # Custo de ir da localização atual do veículo até o início do próximo serviço
-                travel_cost_to_service_start = short_paths_matrix.get((current_vehicle_location, service_obj['from']), float('inf'))
-                if travel_cost_to_service_start == float('inf'):
-                    continue # Serviço inacessível da localização atual
+                travel_cost_to_service_start = short_paths_matrix.distancia(current_vehicle_location, service_obj['from'])
 
                 # Custo de retornar ao depósito SE este serviço for o ÚLTIMO da rota
-                cost_to_depot_after_service = short_paths_matrix.get((service_obj['to'], depot_node), float('inf'))
-                if cost_to_depot_after_service == float('inf'):
-                    continue # Não consegue retornar ao depósito após este serviço
+                cost_to_depot_after_service = short_paths_matrix.distancia(service_obj['to'], depot_node)
 
                 # Critério de seleção: Minimiza (custo para chegar ao serviço + custo de serviço + custo de voltar ao depósito)
                 potential_extended_cost = travel_cost_to_service_start + service_obj['service_cost'] + cost_to_depot_after_service
@@ -236,7 +222,7 @@ def generate_initial_solution_internal(
                 # Adiciona o serviço encontrado à rota
                 service_to_add = best_next_service_candidate
 
-                travel_cost_actual = short_paths_matrix[(current_vehicle_location, service_to_add['from'])]
+                travel_cost_actual = short_paths_matrix.distancia(current_vehicle_location, service_to_add['from'])
                 current_route_cost += travel_cost_actual # Custo de deslocamento
                 current_route_cost += service_to_add['service_cost'] # Custo de serviço
                 
@@ -246,7 +232,7 @@ def generate_initial_solution_internal(
                 uncovered_service_ids.remove(service_to_add['id']) # Marca como coberto
             else:
                 # Se nenhum serviço adicional pôde ser adicionado, a rota termina e retorna ao depósito.
-                cost_to_depot = short_paths_matrix.get((current_vehicle_location, depot_node), 0)
+                cost_to_depot = short_paths_matrix.distancia(current_vehicle_location, depot_node)
                 current_route_cost += cost_to_depot
                 current_route_visits_triples.append(('D', 0, depot_node, depot_node))
                 break # Sai do loop interno, rota completa
@@ -265,337 +251,620 @@ def generate_initial_solution_internal(
 
 # --- Operadores de Busca Local ---
 
-def perform_2opt(route_services_segment, sp_matrix, depot_node, id_to_service_obj, capacity, max_inner_iterations=50):
+def perform_2opt(rota, matriz_servicos, max_inner_iterations=50):
     """
     Aplica o operador 2-opt em uma única rota para tentar melhorar seu custo.
-    A operação 2-opt inverte um segmento da rota.
-    
+    A operação 2-opt inverte a ordem de um segmento da rota (os serviços mantêm o seu sentido).
+
+    Inverter o segmento i..j troca os arcos das fronteiras, (antes, s_i) e (s_j, depois), por
+    (antes, s_j) e (s_i, depois), e também todos os deslocamentos internos: cada (s_k, s_k+1) vira
+    (s_k+1, s_k), que em geral custa outro valor (arcos direcionados, ou extremos diferentes dos
+    serviços). Os custos internos vêm de duas somas de prefixo ao longo da rota, no sentido atual (de
+    início, a da própria `Rota`) e no inverso, de modo que cada candidato é avaliado em O(1), sem montar
+    listas. Só um movimento aceito inverte o segmento (no próprio lugar) e refaz as somas de prefixo. Cada passagem percorre
+    todos os pares (i, j), aplicando as melhorias à medida que aparecem, até uma passagem sem melhoria
+    (ótimo local) ou o limite de passagens. A demanda da rota não muda, e a capacidade não é verificada.
+
     Args:
-        route_services_segment (list): Lista de serviços na rota (sem os nós de depósito).
-        sp_matrix (dict): Matriz de caminhos mais curtos.
-        depot_node (int): Nó do depósito.
-        id_to_service_obj (dict): Mapeamento de service_id para objeto de serviço.
-        capacity (int): Capacidade do veículo (para verificações de viabilidade).
-        max_inner_iterations (int): Número máximo de iterações do loop interno de melhoria.
-        
+        rota (Rota): A rota (não é alterada).
+        matriz_servicos (MatrizServicos): Custos serviço -> serviço indexados pelo ID (depósito = 0).
+        max_inner_iterations (int): Número máximo de passagens sobre todos os pares (i, j).
+
     Returns:
-        tuple: (best_segments (list), best_cost (float)). A melhor sequência de serviços e o custo.
+        tuple: (best_sequence (list), best_cost (int)). A melhor sequência de IDs de serviço e o custo.
     """
-    if len(route_services_segment) < 2: # 2-opt requer pelo menos 2 serviços para trocar
-        return route_services_segment, calculate_route_cost_from_segments(route_services_segment, sp_matrix, depot_node, id_to_service_obj)
-
-    best_segments = deepcopy(route_services_segment) # Cria uma cópia para não modificar a original diretamente
-    best_cost = calculate_route_cost_from_segments(best_segments, sp_matrix, depot_node, id_to_service_obj)
-    
-    # Loop para continuar buscando melhorias até que nenhuma seja encontrada ou atinja o limite
+    best_cost = rota.custo
+    tamanho = len(rota.servicos)
+    if tamanho < 2: # 2-opt requer pelo menos 2 serviços para trocar
+        return rota.servicos.tolist(), best_cost
+
+    custos, n = matriz_servicos.custos, matriz_servicos.n
+    # IDs da rota entre os dois depósitos (0): o serviço da posição k da rota fica em ids[k + 1]
+    ids = [0] + rota.servicos.tolist() + [0]
+
+    def somas_de_prefixo():
+        """direto[k] / inverso[k]: soma das células (ids[t], ids[t+1]) / (ids[t+1], ids[t]) para 0 <= t < k."""
+        direto = [0] * (tamanho + 1)
+        inverso = [0] * (tamanho + 1)
+        for k in range(1, tamanho + 1):
+            a, b = ids[k - 1], ids[k]
+            direto[k] = direto[k - 1] + custos[a * n + b]
+            inverso[k] = inverso[k - 1] + custos[b * n + a]
+        return direto, inverso
+
+    # A soma no sentido atual é a da rota; só a do sentido inverso é calculada
+    direto, inverso = rota.prefixo_custo.tolist(), somas_de_prefixo()[1]
     for _ in range(max_inner_iterations):
-        improved_in_iteration = False # Flag para saber se houve melhora nesta iteração
-        
-        # Itera sobre todos os pares de "pontos de corte" (i e j) na rota
-        for i in range(len(best_segments)): # Início do segmento a ser invertido
-            for j in range(i + 1, len(best_segments)): # Fim do segmento (inclusive)
-                if j - i < 1: # Garante que há pelo menos 2 elementos no segmento para inverter
-                    continue
-                
-                # --- NÓS ENVOLVIDOS NAS ARESTAS ANTIGAS QUE SERÃO REMOVIDAS ---
-                # Aresta 1: Do nó ANTES do segmento invertido para o nó INICIAL do segmento
-                node_before_segment_start_to = depot_node 
-                if i > 0:
-                    node_before_segment_start_to = id_to_service_obj[best_segments[i-1][1]]['to']
-                node_segment_start_from = id_to_service_obj[best_segments[i][1]]['from']
-                
-                # Aresta 2: Do nó FINAL do segmento invertido para o nó DEPOIS do segmento
-                node_segment_end_to = id_to_service_obj[best_segments[j][1]]['to']
-                node_after_segment_end_from = depot_node 
-                if j < len(best_segments) - 1:
-                    node_after_segment_end_from = id_to_service_obj[best_segments[j+1][1]]['from']
-
-                # Custos das duas arestas antigas que serão "removidas" virtualmente
-                cost_old_1 = sp_matrix.get((node_before_segment_start_to, node_segment_start_from), float('inf'))
-                cost_old_2 = sp_matrix.get((node_segment_end_to, node_after_segment_end_from), float('inf'))
-
-                if cost_old_1 == float('inf') or cost_old_2 == float('inf'): 
-                    continue # Se a rota original já tem caminhos inválidos, não otimiza
-
-                # --- Cria o novo segmento de rota com a parte entre i e j invertida ---
-                temp_segments = best_segments[:i] + \
-                                best_segments[i:j+1][::-1] + \
-                                best_segments[j+1:]
-                
-                # --- NÓS ENVOLVIDOS NAS ARESTAS NOVAS QUE SERÃO ADICIONADAS ---
-                # As novas arestas são criadas a partir da nova ordem dos serviços
-                new_node_before_segment_start_to = node_before_segment_start_to 
-                new_node_segment_start_from = id_to_service_obj[temp_segments[i][1]]['from']
-                
-                new_node_segment_end_to = id_to_service_obj[temp_segments[j][1]]['to']
-                new_node_after_segment_end_from = node_after_segment_end_from
-                
-                # Custos das duas arestas novas que serão "adicionadas" virtualmente
-                cost_new_1 = sp_matrix.get((new_node_before_segment_start_to, new_node_segment_start_from), float('inf'))
-                cost_new_2 = sp_matrix.get((new_node_segment_end_to, new_node_after_segment_end_from), float('inf'))
-
-                if cost_new_1 == float('inf') or cost_new_2 == float('inf'): 
-                    continue # Se a nova rota criaria caminhos inválidos, ignora
-
-                # Calcula a mudança líquida no custo total da rota (custo das novas arestas - custo das antigas)
-                cost_change = (cost_new_1 + cost_new_2) - (cost_old_1 + cost_old_2)
-                
-                if cost_change < 0: # Se a troca resulta em uma melhoria de custo
-                    # A demanda da rota não muda com um 2-opt, mas a viabilidade é reconfirmada
-                    demand, feasible = calculate_route_demand(temp_segments, id_to_service_obj, capacity)
-                    if not feasible: 
-                        continue # Rota se tornou inviável (não deveria ocorrer com 2-opt simples)
-
-                    best_segments = temp_segments # Aplica a melhoria na rota
-                    best_cost += cost_change     # Atualiza o custo da rota com a mudança
-                    improved_in_iteration = True # Marca que uma melhoria foi encontrada
-                    break # Quebra o loop 'j' e recomeça o loop externo (para '_') para esta rota
-            if improved_in_iteration:
-                continue # Se houve melhoria, continua o loop externo para tentar mais melhorias nesta rota
-            else:
-                break # Se nenhuma melhoria foi encontrada em todos os pares (i,j) nesta iteração, sai do 2-opt
-
-    return best_segments, best_cost # Retorna a melhor versão da rota e seu custo
-
-def perform_relocate_intra(route_services_segment, sp_matrix, depot_node, id_to_service_obj, capacity, max_inner_iterations=50):
+        improved_in_iteration = False # Flag para saber se houve melhora nesta passagem
+
+        for i in range(1, tamanho): # Posição (em rota) do início do segmento a ser invertido
+            # Termos que só dependem de i: fronteira antiga (antes, início) e somas internas até i
+            linha_antes, linha_inicio = ids[i - 1] * n, ids[i] * n
+            fixo = direto[i] - inverso[i] - custos[linha_antes + ids[i]]
+            for j in range(i + 1, tamanho + 1): # Fim do segmento (inclusive)
+                fim, depois = ids[j], ids[j + 1]
+                # Fronteiras novas - antigas + deslocamentos internos no sentido inverso - no sentido atual
+                cost_change = (custos[linha_antes + fim] + custos[linha_inicio + depois] - custos[fim * n + depois]
+                               + inverso[j] - direto[j] + fixo)
+
+                if cost_change < 0: # Se a inversão melhora a rota, aplica no próprio lugar
+                    ids[i:j + 1] = ids[i:j + 1][::-1]
+                    best_cost += cost_change
+                    direto, inverso = somas_de_prefixo()
+                    linha_inicio = ids[i] * n
+                    fixo = direto[i] - inverso[i] - custos[linha_antes + ids[i]]
+                    improved_in_iteration = True
+
+        if not improved_in_iteration:
+            break # Passagem sem melhoria: a rota está num ótimo local do 2-opt
+
+    return ids[1:-1], best_cost # Retorna a melhor versão da rota (sem os depósitos) e seu custo
+
+def perform_relocate_intra(rota, matriz_servicos, max_inner_iterations=50):
     """
     Aplica o operador Relocate (1-opt) intra-rota: move um único serviço para outra posição
     dentro da mesma rota.
-    
+
+    Cada movimento é avaliado em O(1) pela diferença de custo: retirar o serviço s de entre p e q
+    remove os arcos (p, s) e (s, q) e cria (p, q); inseri-lo entre a e b remove (a, b) e cria (a, s)
+    e (s, b). Só o movimento aceito altera a rota. A demanda da rota não muda com o Relocate intra,
+    de modo que não há verificação de capacidade. A ordem de busca e o critério de aceitação (primeira
+    melhoria para cada serviço, passagem encerrada no primeiro serviço sem melhoria enquanto nenhuma
+    foi aplicada) são os mesmos da versão que avaliava a rota inteira, com o mesmo resultado.
+
     Args:
-        route_services_segment (list): Lista de serviços na rota.
-        sp_matrix (dict): Matriz de caminhos mais curtos.
-        depot_node (int): Nó do depósito.
-        id_to_service_obj (dict): Mapeamento de service_id para objeto de serviço.
-        capacity (int): Capacidade do veículo.
+        rota (Rota): A rota (não é alterada).
+        matriz_servicos (MatrizServicos): Custos serviço -> serviço indexados pelo ID (depósito = 0).
         max_inner_iterations (int): Limite de iterações do loop de melhoria.
-        
+
     Returns:
-        tuple: (best_segments (list), best_cost (float)). A melhor sequência de serviços e o custo.
+        tuple: (best_sequence (list), best_cost (int)). A melhor sequência de IDs de serviço e o custo.
     """
-    if len(route_services_segment) < 2: # Relocate intra requer pelo menos 2 serviços
-        return route_services_segment, calculate_route_cost_from_segments(route_services_segment, sp_matrix, depot_node, id_to_service_obj)
+    ids = rota.servicos.tolist() # IDs na ordem da rota (depósito = 0 fora da lista)
+    best_cost = rota.custo
+    if len(ids) < 2: # Relocate intra requer pelo menos 2 serviços
+        return ids, best_cost
+
+    custos, n = matriz_servicos.custos, matriz_servicos.n
+    tamanho = len(ids)
 
-    best_segments = deepcopy(route_services_segment)
-    best_cost = calculate_route_cost_from_segments(best_segments, sp_matrix, depot_node, id_to_service_obj)
-    
     for _ in range(max_inner_iterations):
         improved = False # Flag para indicar se houve melhoria nesta iteração
-        
-        for i in range(len(best_segments)): # Itera sobre cada serviço como o "serviço a ser movido"
-            service_to_move = best_segments[i]
-            
-            # Cria uma rota temporária removendo o serviço atual
-            temp_route_without_service = best_segments[:i] + best_segments[i+1:]
-            
-            # Tenta inserir o serviço em todas as outras posições possíveis na rota (inclusive no início/fim)
-            for j in range(len(temp_route_without_service) + 1):
-                if i == j: continue # Não tente inserir na mesma posição de onde removeu (seria trivial)
-                
-                new_segments_candidate = temp_route_without_service[:j] + [service_to_move] + temp_route_without_service[j:]
-                
-                # A demanda não muda para o Relocate Intra (o mesmo serviço está na rota), mas verifica viabilidade
-                demand, feasible = calculate_route_demand(new_segments_candidate, id_to_service_obj, capacity)
-                if not feasible:
-                    continue # Nova rota inviável, pula
-                
-                new_cost = calculate_route_cost_from_segments(new_segments_candidate, sp_matrix, depot_node, id_to_service_obj)
-                
-                if new_cost < best_cost: # Se encontrou uma melhoria
-                    best_segments = new_segments_candidate # Aplica a melhoria
-                    best_cost = new_cost # Atualiza o custo
+
+        for i in range(tamanho): # Itera sobre cada serviço como o "serviço a ser movido"
+            s = ids[i]
+            anterior = ids[i - 1] if i > 0 else 0
+            seguinte = ids[i + 1] if i < tamanho - 1 else 0
+            linha_s = s * n
+            # Variação de custo ao retirar s: cria (anterior, seguinte), remove (anterior, s) e (s, seguinte)
+            delta_remocao = custos[anterior * n + seguinte] - custos[anterior * n + s] - custos[linha_s + seguinte]
+
+            # Posição j da rota sem s (0..tamanho - 1, exceto a original): inserção entre a e b, que são
+            # ids[j - 1] e ids[j] antes de i e, depois de i, ids[j] e ids[j + 1] (0 = depósito nas pontas)
+            for j in range(tamanho):
+                if j == i: continue # Mesma posição de onde saiu (movimento trivial)
+                if j < i:
+                    a = ids[j - 1] if j > 0 else 0
+                    b = ids[j]
+                else:
+                    a = ids[j]
+                    b = ids[j + 1] if j < tamanho - 1 else 0
+                delta = delta_remocao + custos[a * n + s] + custos[linha_s + b] - custos[a * n + b]
+
+                if delta < 0: # Se encontrou uma melhoria: materializa só este movimento
+                    ids.insert(j, ids.pop(i))
+                    best_cost += delta
                     improved = True # Marca que houve melhoria
-                    break # Quebra o loop 'j' e reinicia o loop externo (para '_') para esta rota
-            if improved:
-                continue # Se houve melhoria, continua o loop externo para mais otimizações nesta rota
-            else:
-                break # Se nenhuma melhoria foi encontrada em todas as posições, sai do relocate intra
+                    break # Quebra o loop 'j' e segue para o próximo serviço
+            if not improved:
+                break # Nenhuma melhoria até este serviço: encerra a passagem (como na versão anterior)
+        if not improved:
+            break # Passagem sem melhoria: as seguintes repetiriam a mesma busca sobre a mesma rota
 
-    return best_segments, best_cost
+    return ids, best_cost
 
-def perform_relocate_inter(all_routes_data, sp_matrix, depot_node, id_to_service_obj, capacity):
+class CacheMovimentos:
     """
-    Aplica o operador Relocate inter-rotas: tenta mover um serviço de uma rota para outra rota existente.
-    Modifica a lista `all_routes_data` (solução completa) in-place.
-    
+    Cache de movimentos da busca local, mantido entre as iterações globais de `otimizar_solucao`. Cada
+    rota é identificada pelo seu conteúdo (tupla dos IDs dos serviços): uma rota alterada por qualquer
+    operador deixa de corresponder às suas entradas, de modo que só as entradas das rotas tocadas pelos
+    últimos movimentos perdem a validade.
+      - 2-opt e Relocate intra: resultado (serviços e custo) do operador para cada rota já processada;
+        como os operadores são determinísticos, uma rota inalterada não é processada de novo.
+      - Relocate inter: valor do melhor movimento conhecido de cada par (origem, destino) de rotas. Ao
+        fim de `perform_relocate_inter` nenhum par tem movimento de melhoria, e na chamada seguinte os
+        pares cujas duas rotas não mudaram são pulados.
+    Com `ativo=False` nada é guardado (todas as consultas são faltas), o que permite medir a busca sem o
+    cache com as mesmas estatísticas. Registra também o tempo de cada iteração global.
+    """
+    __slots__ = ('ativo', 'rotas', 'pares_inter', 'acertos', 'faltas', 'tempos_iteracao')
+
+    OPERADORES = ('2opt', 'relocate_intra', 'relocate_inter')
+
+    def __init__(self, ativo=True):
+        """
+        Args:
+            ativo (bool): Se False, o cache apenas conta as consultas, sem guardar nem reaproveitar nada.
+        """
+        self.ativo = ativo
+        self.rotas = {'2opt': {}, 'relocate_intra': {}} # Operador -> {tupla de IDs: (serviços, custo)}
+        self.pares_inter = {} # (tupla de IDs da origem, tupla de IDs do destino) -> valor do melhor movimento
+        self.acertos = dict.fromkeys(self.OPERADORES, 0)
+        self.faltas = dict.fromkeys(self.OPERADORES, 0)
+        self.tempos_iteracao = [] # Tempo (ms) de cada iteração global da busca local
+
+    def consultar_rota(self, operador, chave):
+        """Retorna o resultado guardado do operador intra-rota para a rota `chave`, ou None (falta)."""
+        resultado = self.rotas[operador].get(chave) if self.ativo else None
+        if resultado is None:
+            self.faltas[operador] += 1
+        else:
+            self.acertos[operador] += 1
+        return resultado
+
+    def guardar_rota(self, operador, chave, resultado):
+        """Guarda o resultado (serviços, custo) do operador intra-rota para a rota `chave`."""
+        if self.ativo:
+            self.rotas[operador][chave] = resultado
+
+    def par_sem_melhoria(self, chave_origem, chave_destino):
+        """True se o par de rotas, inalterado desde a última busca, não tem movimento de melhoria."""
+        if self.ativo and (chave_origem, chave_destino) in self.pares_inter:
+            self.acertos['relocate_inter'] += 1
+            return True
+        self.faltas['relocate_inter'] += 1
+        return False
+
+    def guardar_pares(self, pares):
+        """Substitui os pares do Relocate inter pelos da solução atual (os das rotas alteradas saem)."""
+        if self.ativo:
+            self.pares_inter = pares
+
+    def taxa_acertos(self, operador):
+        """Fração das consultas do operador respondidas pelo cache."""
+        total = self.acertos[operador] + self.faltas[operador]
+        return self.acertos[operador] / total if total else 0.0
+
+    def resumo(self):
+        """Retorna uma linha de texto com os acertos e faltas de cada operador."""
+        return "Cache de movimentos: " + ", ".join(
+            f"{operador} {self.acertos[operador]}/{self.acertos[operador] + self.faltas[operador]} "
+            f"({100.0 * self.taxa_acertos(operador):.1f}%)" for operador in self.OPERADORES)
+
+# Tamanho das listas de vizinhança granular do Relocate inter-rotas (ver `MatrizServicos.vizinhos`)
+VIZINHOS_RELOCATE_INTER = 10
+# Número máximo de serviços consecutivos movidos juntos pelo Relocate inter-rotas
+SEQUENCIA_RELOCATE_INTER = 3
+
+def perform_relocate_inter(solucao, matriz_servicos, capacity, vizinhanca=None, cache=None):
+    """
+    Aplica o operador Relocate inter-rotas: move serviços de uma rota para outra rota existente.
+    Modifica a solução in-place (só as rotas alteradas recalculam as somas de prefixo).
+
+    O movimento leva uma sequência de até `SEQUENCIA_RELOCATE_INTER` serviços consecutivos, que começa
+    num serviço s, para outra rota, na mesma ordem. A busca é granular: a sequência só é inserida antes
+    de um dos antecessores mais próximos do seu primeiro serviço ou depois de um dos sucessores mais
+    próximos do seu último (ver `MatrizServicos.vizinhos`) que esteja em outra rota, ou no início ou no
+    fim de outra rota (o depósito é vizinho de todas). Cada movimento é avaliado em O(1): retirar a
+    sequência de entre p e q troca as suas duas arestas das pontas por (p, q), e inseri-la entre a e b
+    troca (a, b) pelas arestas de a ao primeiro serviço e do último a b. Para cada serviço é aplicado o
+    melhor movimento de melhoria (de qualquer tamanho) que respeita a capacidade da rota de destino;
+    só quando nenhum melhora, tenta-se trocar s com um serviço de outra rota ao lado de um dos seus
+    vizinhos mais próximos (escolher a troca mesmo quando uma realocação melhora leva a ótimos locais
+    piores). A busca continua depois de cada movimento (várias melhorias por chamada). Bits "don't look"
+    evitam reavaliar serviços cuja vizinhança não mudou: um serviço sem movimento de melhoria só volta à
+    fila quando um movimento altera a rota ao seu redor (os serviços movidos e os vizinhos nas posições
+    de origem e de destino). Como um movimento também muda o início ou o fim de uma rota para todos os
+    serviços, a busca granular termina apenas quando uma rodada com todos os bits desligados não aplica
+    nenhum movimento. Segue-se então uma passada sobre a vizinhança completa (todas as posições e todas
+    as trocas com as outras rotas); se ela aplicar algum movimento, a busca granular recomeça, de modo
+    que o resultado é sempre um ótimo local da vizinhança completa. Rotas esvaziadas são removidas e as
+    restantes, renumeradas. Com um `CacheMovimentos`, os pares de rotas inalterados desde a chamada
+    anterior (sem movimento de melhoria, portanto) são pulados até que um movimento toque uma das duas
+    rotas.
+
     Args:
-        all_routes_data (list): Lista de dicionários representando todas as rotas da solução atual.
-        sp_matrix (dict): Matriz de caminhos mais curtos.
-        depot_node (int): Nó do depósito.
-        id_to_service_obj (dict): Mapeamento de service_id para objeto de serviço.
+        solucao (Solucao): A solução atual.
+        matriz_servicos (MatrizServicos): Custos serviço -> serviço indexados pelo ID (depósito = 0).
         capacity (int): Capacidade do veículo.
-        
+        vizinhanca (tuple, optional): (antecessores, sucessores) de `MatrizServicos.vizinhos`. Se None, são
+                                      calculados com `VIZINHOS_RELOCATE_INTER` vizinhos por serviço.
+        cache (CacheMovimentos, optional): Melhores movimentos conhecidos por par de rotas, mantidos entre
+                                           as chamadas.
+
     Returns:
         bool: True se alguma melhoria foi encontrada e aplicada, False caso contrário.
     """
-    total_improved = False # Flag global para indicar se houve QUALQUER melhoria nesta função
-
-    # Loop principal para continuar buscando melhorias enquanto elas forem encontradas
-    while True:
-        improved_in_iteration = False # Flag para indicar se houve melhoria nesta iteração completa de todos os pares de rotas
-        
-        # Itera sobre todas as rotas como rota de origem (r1)
-        for r1_idx in range(len(all_routes_data)):
-            r1 = all_routes_data[r1_idx]
-            r1_services = [v for v in r1['visits'] if v[0] == 'S'] # Serviços da rota de origem
-            if not r1_services: continue # Rota de origem vazia, não há serviços para mover
-
-            # Itera sobre cada serviço na rota de origem (o serviço a ser movido)
-            for s_idx in range(len(r1_services)):
-                service_to_move = r1_services[s_idx]
-                
-                # Cria uma versão temporária da rota de origem sem o serviço
-                r1_temp_services = r1_services[:s_idx] + r1_services[s_idx+1:]
-                
-                # Calcula o custo e demanda da rota de origem APÓS a remoção
-                r1_cost_after_removal = calculate_route_cost_from_segments(r1_temp_services, sp_matrix, depot_node, id_to_service_obj)
-                r1_demand_after_removal, r1_feasible_after_removal = calculate_route_demand(r1_temp_services, id_to_service_obj, capacity)
-                
-                if not r1_feasible_after_removal: # Se a rota de origem ficar inviável (improvável para remoção), pula
+    custos, n, demanda = matriz_servicos.custos, matriz_servicos.n, matriz_servicos.demanda
+    rotas = [rota.servicos.tolist() for rota in solucao.rotas] # IDs de cada rota
+    if vizinhanca is None:
+        vizinhanca = matriz_servicos.vizinhos(VIZINHOS_RELOCATE_INTER, [s for rota in rotas for s in rota])
+    antecessores, sucessores = vizinhanca
+
+    # Posição de cada serviço: rota_de[s] (índice em `rotas`) e posicao[s] (índice na rota)
+    rota_de = [-1] * n
+    posicao = [0] * n
+    for indice_rota, rota in enumerate(rotas):
+        for k, s in enumerate(rota):
+            rota_de[s], posicao[s] = indice_rota, k
+    cargas = [rota.carga for rota in solucao.rotas]
+    alteradas = set() # Rotas a regravar na solução ao final
+
+    # Pares (origem, destino) de rotas, na posição origem * num_rotas + destino: pular marca os pares sem
+    # movimento de melhoria segundo o cache; melhor_par guarda o melhor movimento visto na rodada desde a
+    # última alteração das duas rotas (só pode ser negativo num par cujo movimento acabou de ser aplicado,
+    # e aí o par é liberado, de modo que um movimento de melhoria nunca é descartado por ele)
+    num_rotas = len(rotas)
+    chaves = [rota.chave() for rota in solucao.rotas]
+    pular = bytearray(num_rotas * num_rotas)
+    melhor_par = [INFINITO] * (num_rotas * num_rotas)
+    if cache is not None:
+        for origem in range(num_rotas):
+            for destino in range(num_rotas):
+                if origem != destino and rotas[origem] and rotas[destino] \
+                        and cache.par_sem_melhoria(chaves[origem], chaves[destino]):
+                    pular[origem * num_rotas + destino] = 1
+
+    def tocar(indice_rota):
+        """Libera os pares da rota alterada por um movimento (as entradas do cache deixam de valer)."""
+        pular[indice_rota * num_rotas:(indice_rota + 1) * num_rotas] = bytes(num_rotas)
+        pular[indice_rota::num_rotas] = bytes(num_rotas)
+        melhor_par[indice_rota * num_rotas:(indice_rota + 1) * num_rotas] = [INFINITO] * num_rotas
+        melhor_par[indice_rota::num_rotas] = [INFINITO] * num_rotas
+
+    def vizinhos_na_rota(s):
+        """Serviços antes e depois de s na sua rota (0 = depósito)."""
+        rota, k = rotas[rota_de[s]], posicao[s]
+        return (rota[k - 1] if k > 0 else 0), (rota[k + 1] if k < len(rota) - 1 else 0)
+
+    servicos = sorted(s for rota in rotas for s in rota)
+    fila = deque() # Serviços com o bit "don't look" desligado
+    na_fila = bytearray(n)
+
+    def reativar(s):
+        if s and not na_fila[s]:
+            na_fila[s] = 1
+            fila.append(s)
+
+    def melhor_movimento_granular(primeiro, ultimo, demanda_sequencia, origem, delta_remocao):
+        """Melhor movimento da sequência ao lado dos vizinhos próximos das suas pontas ou no início/fim de outra rota."""
+        linha_ultimo = ultimo * n
+        pares_origem = origem * num_rotas
+        melhor_delta, melhor_destino = 0, None
+        # Inserção ao lado de cada vizinho próximo v de outra rota (antecessor do primeiro serviço ou
+        # sucessor do último): entre o anterior de v e v, ou entre v e o seu seguinte
+        for v in antecessores[primeiro] + sucessores[ultimo]:
+            destino = rota_de[v]
+            par = pares_origem + destino
+            if destino == origem or pular[par] or cargas[destino] + demanda_sequencia > capacity:
+                continue
+            rota, k = rotas[destino], posicao[v]
+            a = rota[k - 1] if k > 0 else 0
+            b = rota[k + 1] if k < len(rota) - 1 else 0
+            linha_v = v * n
+            antes = delta_remocao + custos[a * n + primeiro] + custos[linha_ultimo + v] - custos[a * n + v] # Antes de v
+            depois = delta_remocao + custos[linha_v + primeiro] + custos[linha_ultimo + b] - custos[linha_v + b] # Depois de v
+            if antes < melhor_par[par] or depois < melhor_par[par]:
+                melhor_par[par] = min(antes, depois)
+                if antes < melhor_delta:
+                    melhor_delta, melhor_destino = antes, (destino, posicao[v])
+                if depois < melhor_delta:
+                    melhor_delta, melhor_destino = depois, (destino, posicao[v] + 1)
+
+        # O depósito é vizinho de todas as rotas: inserção no início (logo após a saída) e no fim (logo
+        # antes do retorno) de cada rota de destino
+        for destino, rota in enumerate(rotas):
+            par = pares_origem + destino
+            if destino == origem or not rota or pular[par] or cargas[destino] + demanda_sequencia > capacity:
+                continue
+            inicio, fim = rota[0], rota[-1]
+            antes = delta_remocao + custos[primeiro] + custos[linha_ultimo + inicio] - custos[inicio] # No início
+            depois = delta_remocao + custos[fim * n + primeiro] + custos[linha_ultimo] - custos[fim * n] # No fim
+            if antes < melhor_par[par] or depois < melhor_par[par]:
+                melhor_par[par] = min(antes, depois)
+                if antes < melhor_delta:
+                    melhor_delta, melhor_destino = antes, (destino, 0)
+                if depois < melhor_delta:
+                    melhor_delta, melhor_destino = depois, (destino, len(rota))
+        return melhor_delta, melhor_destino
+
+    def melhor_movimento_completo(primeiro, ultimo, demanda_sequencia, origem, delta_remocao):
+        """Melhor movimento da sequência entre todas as posições de todas as outras rotas (vizinhança completa)."""
+        linha_ultimo = ultimo * n
+        pares_origem = origem * num_rotas
+        melhor_delta, melhor_destino = 0, None
+        for destino, rota in enumerate(rotas):
+            par = pares_origem + destino
+            if destino == origem or not rota or pular[par] or cargas[destino] + demanda_sequencia > capacity:
+                continue
+            # Inserção entre cada par de visitas consecutivas (a, b) da rota, do depósito ao depósito
+            visitas = [0] + rota + [0]
+            deltas = [delta_remocao + custos[a * n + primeiro] + custos[linha_ultimo + b] - custos[a * n + b]
+                      for a, b in zip(visitas, visitas[1:])]
+            menor = min(deltas)
+            if menor < melhor_par[par]:
+                melhor_par[par] = menor
+            if menor < melhor_delta:
+                melhor_delta, melhor_destino = menor, (destino, deltas.index(menor))
+        return melhor_delta, melhor_destino
+
+    def melhor_troca_granular(s, origem, anterior, seguinte):
+        """Melhor troca de s com um serviço t de outra rota cuja posição deixa s ao lado de um vizinho
+        próximo (t logo após um antecessor próximo de s ou logo antes de um sucessor próximo)."""
+        linha_s = s * n
+        pares_origem = origem * num_rotas
+        # Variação na rota de origem sem a parte que depende de t
+        ganho_s = custos[anterior * n + s] + custos[linha_s + seguinte]
+        folga_origem = capacity - cargas[origem] + demanda[s] # Demanda máxima de t
+        melhor_delta, melhor_t = 0, None
+        for v, depois_de_v in chain(zip(antecessores[s], repeat(True)), zip(sucessores[s], repeat(False))):
+            destino = rota_de[v]
+            par = pares_origem + destino
+            if destino == origem or pular[par]:
+                continue
+            rota, k = rotas[destino], posicao[v]
+            if depois_de_v: # t logo após v
+                if k == len(rota) - 1:
                     continue
-
-                # Itera sobre todas as outras rotas como rota de destino (r2)
-                for r2_idx in range(len(all_routes_data)):
-                    if r1_idx == r2_idx: continue # Não tenta mover para a mesma rota
-
-                    r2 = all_routes_data[r2_idx]
-                    r2_services = [v for v in r2['visits'] if v[0] == 'S'] # Serviços da rota de destino
-                    
-                    # Tenta inserir o serviço em todas as posições possíveis na rota de destino
-                    for insert_pos in range(len(r2_services) + 1):
-                        r2_temp_services = r2_services[:insert_pos] + [service_to_move] + r2_services[insert_pos:]
-                        
-                        # Verifica a viabilidade da rota de destino com o novo serviço
-                        r2_demand_after_insertion, r2_feasible_after_insertion = calculate_route_demand(r2_temp_services, id_to_service_obj, capacity)
-                        
-                        if not r2_feasible_after_insertion: # Se a rota de destino ficar inviável, pula
-                            continue
-                        
-                        # Calcula o novo custo da rota de destino
-                        r2_cost_after_insertion = calculate_route_cost_from_segments(r2_temp_services, sp_matrix, depot_node, id_to_service_obj)
-
-                        # Calcula a mudança total de custo na solução (custo_novo_par - custo_antigo_par)
-                        old_total_cost_pair = r1['cost'] + r2['cost']
-                        new_total_cost_pair = r1_cost_after_removal + r2_cost_after_insertion
-                        
-                        if new_total_cost_pair < old_total_cost_pair: # Se encontrou uma melhoria global
-                            # --- Aplica a melhoria (modifica as rotas in-place) ---
-                            # Atualiza rota de origem (r1)
-                            r1['visits'] = [('D', 0, depot_node, depot_node)] + r1_temp_services + [('D', 0, depot_node, depot_node)]
-                            r1['demand'] = r1_demand_after_removal
-                            r1['cost'] = r1_cost_after_removal
-
-                            # Atualiza rota de destino (r2)
-                            r2['visits'] = [('D', 0, depot_node, depot_node)] + r2_temp_services + [('D', 0, depot_node, depot_node)]
-                            r2['demand'] = r2_demand_after_insertion
-                            r2['cost'] = r2_cost_after_insertion
-                            
-                            improved_in_iteration = True # Marca que houve melhoria nesta iteração da função
-                            total_improved = True # Marca que houve melhoria global na execução da função
-                            # Retorna True imediatamente para reiniciar a busca local global,
-                            # pois a estrutura das rotas mudou e pode abrir novas oportunidades.
-                            return True 
-
-        if not improved_in_iteration: # Se nenhuma melhoria foi encontrada após tentar todas as combinações
-            break # Sai do loop de busca inter-rota
-
-    return total_improved # Retorna True se houve alguma melhoria total na função perform_relocate_inter
+                a, t, b = v, rota[k + 1], (rota[k + 2] if k < len(rota) - 2 else 0)
+            else: # t logo antes de v
+                if k == 0:
+                    continue
+                a, t, b = (rota[k - 2] if k > 1 else 0), rota[k - 1], v
+            if demanda[t] > folga_origem or cargas[destino] - demanda[t] + demanda[s] > capacity:
+                continue
+            linha_t = t * n
+            delta = (custos[anterior * n + t] + custos[linha_t + seguinte] - ganho_s
+                     + custos[a * n + s] + custos[linha_s + b] - custos[a * n + t] - custos[linha_t + b])
+            if delta < melhor_par[par]:
+                melhor_par[par] = delta
+                if delta < melhor_delta:
+                    melhor_delta, melhor_t = delta, t
+        return melhor_delta, melhor_t
+
+    def melhor_troca_completa(s, origem, anterior, seguinte):
+        """Melhor troca de s com qualquer serviço de outra rota (vizinhança completa)."""
+        linha_s = s * n
+        pares_origem = origem * num_rotas
+        ganho_s = custos[anterior * n + s] + custos[linha_s + seguinte]
+        folga_origem = capacity - cargas[origem] + demanda[s]
+        melhor_delta, melhor_t = 0, None
+        for destino, rota in enumerate(rotas):
+            par = pares_origem + destino
+            if destino == origem or not rota or pular[par]:
+                continue
+            minima = cargas[destino] + demanda[s] - capacity # Demanda mínima de t
+            # Troca com cada serviço t da rota, entre as visitas a e b
+            visitas = [0] + rota + [0]
+            deltas = [custos[anterior * n + t] + custos[t * n + seguinte] - ganho_s
+                      + custos[a * n + s] + custos[linha_s + b] - custos[a * n + t] - custos[t * n + b]
+                      if minima <= demanda[t] <= folga_origem else INFINITO
+                      for a, t, b in zip(visitas, rota, visitas[2:])]
+            menor = min(deltas)
+            if menor < melhor_par[par]:
+                melhor_par[par] = menor
+            if menor < melhor_delta:
+                melhor_delta, melhor_t = menor, rota[deltas.index(menor)]
+        return melhor_delta, melhor_t
+
+    def aplicar(s, tamanho, origem, destino, indice):
+        """Move a sequência de `tamanho` serviços que começa em s para a posição `indice` da rota de destino
+        e reativa os serviços ao redor do movimento."""
+        rota_origem, rota_destino = rotas[origem], rotas[destino]
+        k = posicao[s]
+        sequencia = rota_origem[k:k + tamanho]
+        anterior = rota_origem[k - 1] if k > 0 else 0
+        seguinte = rota_origem[k + tamanho] if k + tamanho < len(rota_origem) else 0
+        del rota_origem[k:k + tamanho]
+        rota_destino[indice:indice] = sequencia
+        for j in range(k, len(rota_origem)):
+            posicao[rota_origem[j]] = j
+        for j in range(indice, len(rota_destino)):
+            posicao[rota_destino[j]] = j
+        demanda_sequencia = 0
+        for t in sequencia:
+            rota_de[t] = destino
+            demanda_sequencia += demanda[t]
+        cargas[origem] -= demanda_sequencia
+        cargas[destino] += demanda_sequencia
+        alteradas.update((origem, destino))
+        tocar(origem)
+        tocar(destino)
+
+        # Reativa os serviços cuja vizinhança mudou: os da sequência e os vizinhos nas posições de origem
+        # e de destino
+        novo_anterior = vizinhos_na_rota(s)[0]
+        novo_seguinte = vizinhos_na_rota(sequencia[-1])[1]
+        for t in sequencia + [anterior, seguinte, novo_anterior, novo_seguinte]:
+            reativar(t)
+
+    def trocar(s, t, origem, anterior, seguinte):
+        """Troca s e t de posição (e de rota) e reativa os serviços ao redor dos dois."""
+        destino = rota_de[t]
+        a, b = vizinhos_na_rota(t)
+        k, j = posicao[s], posicao[t]
+        rotas[origem][k], rotas[destino][j] = t, s
+        rota_de[s], posicao[s], rota_de[t], posicao[t] = destino, j, origem, k
+        cargas[origem] += demanda[t] - demanda[s]
+        cargas[destino] += demanda[s] - demanda[t]
+        alteradas.update((origem, destino))
+        tocar(origem)
+        tocar(destino)
+        for v in (s, t, anterior, seguinte, a, b):
+            reativar(v)
+
+    def tentar(s, melhor_movimento):
+        """Procura o melhor movimento das sequências que começam em s com `melhor_movimento` e o aplica se
+        for de melhoria."""
+        origem = rota_de[s]
+        rota = rotas[origem]
+        k = posicao[s]
+        anterior = rota[k - 1] if k > 0 else 0
+        melhor_delta, melhor_movimento_s = 0, None
+        demanda_sequencia = 0
+        for tamanho in range(1, min(SEQUENCIA_RELOCATE_INTER, len(rota) - k) + 1):
+            ultimo = rota[k + tamanho - 1]
+            seguinte = rota[k + tamanho] if k + tamanho < len(rota) else 0
+            demanda_sequencia += demanda[ultimo]
+            # Variação ao retirar a sequência s..ultimo da rota de origem
+            delta_remocao = custos[anterior * n + seguinte] - custos[anterior * n + s] - custos[ultimo * n + seguinte]
+            delta, destino = melhor_movimento(s, ultimo, demanda_sequencia, origem, delta_remocao)
+            if delta < melhor_delta:
+                melhor_delta, melhor_movimento_s = delta, (tamanho, origem) + destino
+        if melhor_movimento_s is None:
+            # Sem movimento de sequência que melhore: troca de s com um serviço de outra rota (escolher a
+            # troca mesmo quando uma realocação melhora deixa a busca em ótimos locais piores)
+            seguinte = rota[k + 1] if k + 1 < len(rota) else 0
+            melhor_troca = melhor_troca_completa if melhor_movimento is melhor_movimento_completo else melhor_troca_granular
+            delta, t = melhor_troca(s, origem, anterior, seguinte)
+            if delta < 0:
+                trocar(s, t, origem, anterior, seguinte)
+                return True
+            return False # Nenhuma melhoria: o bit "don't look" de s fica ligado
+        aplicar(s, *melhor_movimento_s)
+        return True
+
+    def descer():
+        """Busca granular e passada completa, até a passada completa não aplicar nenhum movimento."""
+        melhorou = False
+        busca_completa = True
+        # A vizinhança granular não contém todas as inserções: quando ela se esgota, uma passada sobre a
+        # vizinhança completa (a mesma da versão anterior do operador) confirma o ótimo local ou aplica os
+        # movimentos que faltavam, e a busca granular recomeça a partir deles
+        while busca_completa:
+            movimento_na_rodada = True
+            # Inserções junto ao depósito dependem do primeiro e do último serviço de cada rota, que um
+            # movimento muda para todos os serviços: enquanto uma rodada aplicar algum movimento, a seguinte
+            # reativa todos
+            while movimento_na_rodada:
+                movimento_na_rodada = False
+                melhor_par[:] = [INFINITO] * (num_rotas * num_rotas)
+                for s in servicos:
+                    reativar(s)
+                while fila:
+                    s = fila.popleft()
+                    na_fila[s] = 0
+                    if tentar(s, melhor_movimento_granular):
+                        melhorou = movimento_na_rodada = True
+
+            busca_completa = False
+            for s in servicos:
+                if tentar(s, melhor_movimento_completo):
+                    melhorou = busca_completa = True
+        return melhorou
+
+    total_improved = descer()
+
+    # A última passada (completa) não aplicou nenhum movimento: o melhor movimento de cada par (o da
+    # passada ou, nos pares pulados, o que já estava no cache) é de não melhoria
+    if cache is not None:
+        pares = {}
+        for origem in range(num_rotas):
+            for destino in range(num_rotas):
+                if origem != destino and rotas[origem] and rotas[destino]:
+                    chave_origem, chave_destino = tuple(rotas[origem]), tuple(rotas[destino])
+                    par = origem * num_rotas + destino
+                    pares[chave_origem, chave_destino] = (cache.pares_inter[chave_origem, chave_destino]
+                                                          if pular[par] else melhor_par[par])
+        cache.guardar_pares(pares)
+
+    # Regrava as rotas alteradas (sequência, carga, custo e somas de prefixo)
+    for indice_rota in alteradas:
+        solucao.rotas[indice_rota].definir_servicos(rotas[indice_rota], matriz_servicos)
+
+    # Rotas esvaziadas saem da solução; as demais são renumeradas na ordem
+    if any(not rotas[indice_rota] for indice_rota in alteradas):
+        solucao.rotas = [rota for rota in solucao.rotas if rota.servicos]
+        for route_id, rota in enumerate(solucao.rotas, start=1):
+            rota.route_id = route_id
+
+    return total_improved # Retorna True se houve alguma melhoria
 
 # --- Função Principal de Otimização (Etapa 3) ---
-def otimizar_solucao(instance_filepath, initial_solution_threshold_factor=1.00, max_total_iterations=5, num_threads=None):
+def otimizar_solucao(instance_filepath, initial_solution_threshold_factor=1.00, max_total_iterations=5, num_threads=None,
+                     apsp_backend='auto', apsp_restrito=True, cache_apsp=None, extremos_apsp=None,
+                     modo_construtivo='indexado', cache_movimentos=None):
     """
     Função principal para a Etapa 3 do trabalho prático.
     Realiza a geração da solução inicial (internamente, replicando a Etapa 2) e aplica aprimoramentos
     usando heurísticas de busca local (2-opt, Relocate Intra/Inter-rotas).
-    O All-Pairs Shortest Path (APSP) é calculado apenas uma vez e de forma paralelizada para eficiência.
+    O All-Pairs Shortest Path (APSP) é calculado apenas uma vez, com o método mais adequado ao grafo.
     
     Args:
-        instance_filepath (str): Caminho completo para o arquivo de instância (.dat).
+        instance_filepath (str | InstanciaPreparada): Caminho completo para o arquivo de instância (.dat)
+                                                      ou a instância já preparada (ver `preparar_instancia`),
+                                                      caso em que o arquivo não é lido de novo, o APSP não é
+                                                      recalculado e as opções de APSP abaixo são ignoradas.
         initial_solution_threshold_factor (float): Fator (ex: 1.05 para 5%) para decidir se uma rota
                                                     já é "boa o suficiente" e não precisa de otimização intra-rota.
         max_total_iterations (int): Número máximo de iterações do loop global de busca local (VND).
         num_threads (int, optional): Número de threads para paralelização. Se None, usa o número de CPUs.
+        apsp_backend (str): Backend do cálculo do APSP: 'auto' (padrão, escolhe entre Floyd-Warshall
+                            vetorizado e Dijkstra em processos), 'processos', 'threads', 'sequencial'
+                            ou 'floyd_warshall'.
+        apsp_restrito (bool): Se True, calcula apenas as distâncias que o solver consulta (origens no
+                              depósito e nos fins dos serviços, destinos no depósito e nos inícios dos
+                              serviços), em vez da matriz completa entre todos os nós.
+        cache_apsp (CacheAPSP, optional): Cache em disco das matrizes APSP. Num acerto, a matriz é
+                                          aberta via mmap e o APSP não é recalculado.
+        extremos_apsp (tuple, optional): (origens, destinos) da matriz APSP no modo restrito, quando a
+                                         instância faz parte de um grupo que compartilha a mesma rede
+                                         (ver `agrupar_instancias_por_rede`). Se None, usa os extremos
+                                         dos serviços da própria instância.
+        modo_construtivo (str): Modo do construtivo da solução inicial: 'indexado' (padrão), 'vetorizado',
+                                'escalar', 'split', 'savings' ou 'portfolio' (ver `generate_initial_solution_internal`).
+        cache_movimentos (CacheMovimentos, optional): Cache de movimentos da busca local, mantido entre as
+                                                      iterações globais. Se None, um novo é criado; passar
+                                                      um `CacheMovimentos(ativo=False)` desliga o cache e
+                                                      mantém as estatísticas (acertos e tempo por iteração).
         
     Returns:
         tuple: (final_total_cost (float), num_routes (int), total_clocks_optimization_stage (float),
                 clocks_apsp (float), final_solution_routes_output (list)).
                 Custo total final, número de rotas, tempo total da Etapa 3, tempo do APSP, e rotas detalhadas.
     """
-    t0_total_optimization_process = time.perf_counter() # Marca o tempo de início total do processo da Etapa 3
-
-    # 1. Carregar os dados da instância usando o módulo 'leitor_dados.py'
-    dados_gerais, required_nodes, required_edges, non_required_edges, required_arcs, non_required_arcs = \
-        carregar_dados_arquivo(instance_filepath)
-    
-    capacidade_veiculo = int(dados_gerais['Capacity']) # Capacidade dos veículos
-    depot_node = int(dados_gerais['Depot Node'])     # Nó do depósito
-    
-    # Mapeamento de todos os Serviços Requeridos com IDs globais
-    # Essencial para acessar facilmente os detalhes (demanda, custo, from/to) de cada serviço por seu ID.
-    all_required_services = []
-    service_id_counter = 1
-    # Adiciona nós requeridos
-    for rn in required_nodes:
-        node_val = int(rn['node'].lstrip('N'))
-        all_required_services.append({
-            'id': service_id_counter, 'type': 'node', 'node_val': node_val,
-            'demand': rn['demand'], 'service_cost': rn['service_cost'],
-            'from': node_val, 'to': node_val
-        })
-        service_id_counter += 1
-    # Adiciona arestas e arcos requeridos
-    for re_or_ra in required_edges + required_arcs:
-        s_type = 'edge' if 'edge' in re_or_ra else 'arc'
-        all_required_services.append({
-            'id': service_id_counter, 'type': s_type, 'from': re_or_ra['from'], 'to': re_or_ra['to'],
-            'traversal_cost': re_or_ra['traversal_cost'], # Importante para construir o grafo
-            'demand': re_or_ra['demand'], 'service_cost': re_or_ra['service_cost']
-        })
-        service_id_counter += 1
-    
-    id_to_service_obj = {s['id']: s for s in all_required_services}
-
-    # === CÁLCULO ÚNICO DO ALL-PAIRS SHORTEST PATH (APSP) ===
-    # Esta é a parte mais intensiva computacionalmente para grafos grandes.
-    # O APSP é calculado apenas uma vez neste módulo.
-    start_time_path_finding = time.perf_counter()
-    
-    # Conta o total de nós no grafo e os ordena
-    total_nodes_count = contar_vertices(required_edges, non_required_edges, required_arcs, non_required_arcs, required_nodes)
-    all_graph_nodes = sorted(list(set(range(1, total_nodes_count + 1))))
-    
-    # Constrói o grafo (adjacência e custos) a partir dos dados carregados
-    graph_adj, traversal_costs_direct = construir_grafo(required_edges, non_required_edges, required_arcs, non_required_arcs)
-    
-    short_paths_matrix = {} # Dicionário para armazenar as distâncias mais curtas entre todos os pares
-
-    # Define o número de threads a serem usadas para paralelizar o cálculo do Dijkstra
-    # Se 'num_threads' for None, usa o número de CPUs lógicas disponíveis no sistema.
-    num_threads_apsp = os.cpu_count() if os.cpu_count() else 1 
-
-    # Função auxiliar para ThreadPoolExecutor: executa Dijkstra para um nó de origem.
-    def run_dijkstra_for_node(start_node_for_worker):
-        return start_node_for_worker, dijkstra_optimized(start_node_for_worker, graph_adj, traversal_costs_direct, all_graph_nodes)
-
-    # Paraleliza o cálculo do APSP
-    if num_threads_apsp > 1 and len(all_graph_nodes) > 1:
-        print(f"  Paralelizando cálculo APSP com {num_threads_apsp} threads...")
-        with ThreadPoolExecutor(max_workers=num_threads_apsp) as executor:
-            # 'executor.map' aplica a função 'run_dijkstra_for_node' a cada 'start_node' em 'all_graph_nodes'.
-            # Os resultados são processados à medida que ficam prontos.
-            for start_node_result, distances_from_start in executor.map(run_dijkstra_for_node, all_graph_nodes):
-                for end_node, dist in distances_from_start.items():
-                    short_paths_matrix[(start_node_result, end_node)] = dist
-    else: 
-        # Execução sequencial do APSP se não houver threads ou nós suficientes
-        print("  Calculando APSP sequencialmente...")
-        for start_node in all_graph_nodes:
-            distances_from_start = dijkstra_optimized(start_node, graph_adj, traversal_costs_direct, all_graph_nodes)
-            for end_node, dist in distances_from_start.items():
-                short_paths_matrix[(start_node, end_node)] = dist
-    
-    end_time_path_finding = time.perf_counter()
-    clocks_apsp = (end_time_path_finding - start_time_path_finding) * 1000 # Tempo total do cálculo APSP em milissegundos
+    # 1. Carregar os dados, mapear os serviços requeridos com IDs globais, construir o grafo e calcular
+    # o APSP (módulo instancia_preparada). O backend 'auto' usa Floyd-Warshall vetorizado em grafos
+    # pequenos/densos e, nos demais, distribui os Dijkstras entre processos (sequencial com 1 CPU).
+    # No modo restrito, só são calculadas as linhas/colunas consultadas pelos operadores e pelo construtivo.
+    if isinstance(instance_filepath, InstanciaPreparada):
+        instancia = instance_filepath # Já preparada (ex: pelo driver que executa as Etapas 2 e 3 juntas)
+    else:
+        instancia = preparar_instancia(instance_filepath, apsp_backend=apsp_backend, apsp_restrito=apsp_restrito,
+                                       cache_apsp=cache_apsp, extremos_apsp=extremos_apsp)
+    t0_total_optimization_process = time.perf_counter() # Marca o tempo de início do processo da Etapa 3 (após a preparação)
+
+    dados_gerais = instancia.dados_gerais
+    required_nodes, required_edges, required_arcs = instancia.required_nodes, instancia.required_edges, instancia.required_arcs
+    non_required_edges, non_required_arcs = instancia.non_required_edges, instancia.non_required_arcs
+    capacidade_veiculo = instancia.capacidade_veiculo # Capacidade dos veículos
+    depot_node = instancia.depot_node                 # Nó do depósito
+    # Mapeamento de service_id para o serviço: acesso direto à demanda, custo e from/to de cada serviço
+    id_to_service_obj = instancia.id_to_service_obj
+    short_paths_matrix = instancia.short_paths_matrix # Matriz APSP compacta
+    # Custos serviço -> serviço indexados pelo ID, usados por todos os operadores da busca local
+    matriz_servicos = instancia.matriz_servicos
+    clocks_apsp = instancia.clocks_apsp # Tempo total do cálculo APSP em milissegundos
 
     # 2. Gerar a solução inicial (replicando a Etapa 2)
     # Esta é a fase construtiva que gera um conjunto de rotas viáveis.
@@ -603,7 +872,8 @@ def otimizar_solucao(instance_filepath, initial_solution_threshold_factor=1.00,
     total_cost_initial_internal, num_routes_initial_internal, all_routes_data = \
         generate_initial_solution_internal(
             dados_gerais, required_nodes, required_edges, non_required_edges, 
-            required_arcs, non_required_arcs, short_paths_matrix, id_to_service_obj
+            required_arcs, non_required_arcs, short_paths_matrix, id_to_service_obj, instancia.servicos_inviaveis,
+            matriz_servicos, modo_construtivo
         )
     end_time_constructive = time.perf_counter()
     clocks_constructive_internal = (end_time_constructive - start_time_constructive) * 1000 # Tempo da fase construtiva
@@ -613,13 +883,61 @@ def otimizar_solucao(instance_filepath, initial_solution_threshold_factor=1.00,
     # O VND alterna entre diferentes operadores de vizinhança.
     current_total_cost_solution = total_cost_initial_internal # Custo inicial da solução antes da busca local
     
-    # Cria uma cópia profunda das rotas iniciais para trabalhar (para não modificar o objeto original)
-    best_solution_routes = deepcopy(all_routes_data) 
+    # Converte as rotas iniciais para o formato compacto da busca (IDs em arrays, carga e custo guardados);
+    # as rotas de saída, com as visitas, só são montadas ao final
+    solucao = Solucao.de_rotas_saida(all_routes_data, matriz_servicos)
     
     # Define o número de threads a serem usadas para paralelizar operadores intra-rota.
     if num_threads is None:
         num_threads = os.cpu_count() if os.cpu_count() else 1
 
+    # Listas de vizinhança granular do Relocate inter-rotas: dependem só da matriz e dos serviços da
+    # solução, então são calculadas uma única vez para todas as iterações
+    vizinhanca_inter = matriz_servicos.vizinhos(VIZINHOS_RELOCATE_INTER, [s for rota in solucao.rotas for s in rota.servicos])
+
+    # Resultados dos operadores por rota e pares de rotas sem melhoria, reaproveitados entre as iterações
+    if cache_movimentos is None:
+        cache_movimentos = CacheMovimentos()
+
+    def aplicar_intra(operador, funcao_operador):
+        """
+        Aplica um operador intra-rota a todas as rotas (em paralelo, se houver mais de uma thread) e
+        substitui as rotas melhoradas. Rotas inalteradas desde a última aplicação vêm do cache.
+
+        Returns:
+            bool: True se alguma rota foi melhorada.
+        """
+        # Prepara os dados de cada rota: a chave do cache e o resultado guardado (ou None)
+        routes_for_intra_opt = [(rota, chave, cache_movimentos.consultar_rota(operador, chave))
+                                for rota, chave in ((rota, rota.chave()) for rota in solucao.rotas)]
+
+        # Função wrapper para ThreadPoolExecutor: aplica o operador a uma única rota
+        def wrapper_single_route(route_info):
+            rota, _, resultado = route_info
+            initial_cost = rota.custo
+            # Condição de early stopping / threshold: se a rota já está "boa o suficiente"
+            # initial_solution_threshold_factor * initial_cost é para permitir uma margem de melhora.
+            # Se a rota já está dentro dessa margem, não otimiza.
+            if initial_cost < (initial_solution_threshold_factor * initial_cost) and initial_solution_threshold_factor >= 1.0:
+                return list(rota.servicos), initial_cost # Retorna a rota original sem otimização
+            return resultado or funcao_operador(rota, matriz_servicos)
+
+        # Executa o operador em paralelo para todas as rotas (se houver mais de 1 thread e rota)
+        if num_threads > 1 and len(routes_for_intra_opt) > 0:
+            with ThreadPoolExecutor(max_workers=num_threads) as executor:
+                resultados = list(executor.map(wrapper_single_route, routes_for_intra_opt))
+        else: # Execução sequencial
+            resultados = [wrapper_single_route(r) for r in routes_for_intra_opt]
+
+        # Os operadores só aplicam movimentos de melhoria: uma rota com o mesmo custo não mudou
+        melhorou = False
+        for (rota, chave, _), (servicos, custo) in zip(routes_for_intra_opt, resultados):
+            cache_movimentos.guardar_rota(operador, chave, (servicos, custo))
+            if custo < rota.custo:
+                rota.definir_servicos(servicos, matriz_servicos)
+                melhorou = True
+        return melhorou
+
     total_improved_in_search = True # Flag para controlar o loop global de busca: True se alguma melhoria foi encontrada
     iteration_counter = 0 # Contador de iterações do VND
 
@@ -627,149 +945,47 @@ def otimizar_solucao(instance_filepath, initial_solution_threshold_factor=1.00,
     while total_improved_in_search and iteration_counter < max_total_iterations:
         total_improved_in_search = False # Reseta a flag para esta iteração
         iteration_counter += 1
+        t0_iteracao = time.perf_counter()
         print(f"  Iniciando Iteração Global de Busca Local {iteration_counter} (Custo Atual: {current_total_cost_solution:.2f})...")
 
         # --- Operador 1: 2-opt (Intra-rota) ---
-        improved_2opt_pass = False # Flag para saber se o 2-opt melhorou nesta passagem
-        
-        # Prepara os dados de cada rota para serem processados em paralelo pelo 2-opt
-        routes_for_intra_opt = []
-        for route_initial_data in best_solution_routes:
-            services_segment = [v for v in route_initial_data['visits'] if v[0] == 'S']
-            routes_for_intra_opt.append({
-                'services_segment': services_segment,
-                'current_cost': calculate_route_cost_from_segments(services_segment, short_paths_matrix, depot_node, id_to_service_obj),
-                'route_id': route_initial_data['route_id']
-            })
-
-        # Função wrapper para ThreadPoolExecutor: aplica 2-opt a uma única rota
-        def wrapper_2opt_single_route(route_info):
-            services = route_info['services_segment']
-            initial_cost = route_info['current_cost']
-            route_id = route_info['route_id']
-            
-            # Condição de early stopping / threshold: se a rota já está "boa o suficiente"
-            # initial_solution_threshold_factor * initial_cost é para permitir uma margem de melhora.
-            # Se a rota já está dentro dessa margem, não otimiza.
-            if initial_cost < (initial_solution_threshold_factor * initial_cost) and initial_solution_threshold_factor >= 1.0: 
-                return services, initial_cost, route_id, False # Retorna a rota original sem otimização
-
-            # Aplica o operador 2-opt
-            optimized_segments, optimized_cost = perform_2opt(services, short_paths_matrix, depot_node, id_to_service_obj, capacidade_veiculo)
-            return optimized_segments, optimized_cost, route_id, optimized_cost < initial_cost # Retorna se houve melhora
-
-        # Executa o 2-opt em paralelo para todas as rotas (se houver mais de 1 thread e rota)
-        if num_threads > 1 and len(routes_for_intra_opt) > 0:
-            with ThreadPoolExecutor(max_workers=num_threads) as executor:
-                results_2opt = list(executor.map(wrapper_2opt_single_route, routes_for_intra_opt))
-        else: # Execução sequencial
-            results_2opt = [wrapper_2opt_single_route(r) for r in routes_for_intra_opt]
-
-        # Atualiza a melhor solução global com os resultados do 2-opt
-        new_best_solution_routes = []
-        new_total_cost_temp = 0
-        
-        for optimized_segments, optimized_cost, route_id, was_improved in results_2opt:
-            if was_improved:
-                improved_2opt_pass = True # Marca que pelo menos uma rota foi melhorada pelo 2-opt
-            
-            # Reconstroi o formato completo da rota para a saída
-            final_demand, _ = calculate_route_demand(optimized_segments, id_to_service_obj, capacidade_veiculo)
-            final_visits = [('D', 0, depot_node, depot_node)] + optimized_segments + [('D', 0, depot_node, depot_node)]
-            
-            new_best_solution_routes.append({
-                'route_id': route_id,
-                'demand': final_demand,
-                'cost': optimized_cost,
-                'visits': final_visits
-            })
-            new_total_cost_temp += optimized_cost # Acumula o custo das rotas otimizadas
-
-        # Se o 2-opt intra-rota melhorou o custo total da solução
-        if improved_2opt_pass and new_total_cost_temp < current_total_cost_solution:
-            best_solution_routes = new_best_solution_routes # Atualiza a melhor solução encontrada
-            current_total_cost_solution = new_total_cost_temp # Atualiza o custo total
+        if aplicar_intra('2opt', perform_2opt): # Se o 2-opt intra-rota melhorou o custo total da solução
+            current_total_cost_solution = solucao.custo # Atualiza o custo total
             total_improved_in_search = True # Marca que houve melhoria global nesta iteração do VND
             print(f"    2-opt Intra melhorou. Novo Custo: {current_total_cost_solution:.2f}")
             
         # --- Operador 2: Relocate Intra-rota (1-opt intra) ---
-        improved_relocate_intra_pass = False # Flag para Relocate Intra
-        
-        # Prepara dados para paralelização do Relocate Intra (similar ao 2-opt)
-        routes_for_relocate_intra_opt = []
-        for route_data in best_solution_routes:
-            services_segment = [v for v in route_data['visits'] if v[0] == 'S']
-            routes_for_relocate_intra_opt.append({
-                'services_segment': services_segment,
-                'current_cost': calculate_route_cost_from_segments(services_segment, short_paths_matrix, depot_node, id_to_service_obj),
-                'route_id': route_data['route_id']
-            })
-        
-        # Função wrapper para ThreadPoolExecutor: aplica Relocate Intra a uma única rota
-        def wrapper_relocate_intra_single_route(route_info):
-            services = route_info['services_segment']
-            initial_cost = route_info['current_cost']
-            route_id = route_info['route_id']
-            
-            if initial_cost < (initial_solution_threshold_factor * initial_cost):
-                return services, initial_cost, route_id, False
-            
-            optimized_segments, optimized_cost = perform_relocate_intra(services, short_paths_matrix, depot_node, id_to_service_obj, capacidade_veiculo)
-            return optimized_segments, optimized_cost, route_id, optimized_cost < initial_cost
-
-        # Executa Relocate Intra em paralelo
-        if num_threads > 1 and len(routes_for_relocate_intra_opt) > 0:
-            with ThreadPoolExecutor(max_workers=num_threads) as executor:
-                results_relocate_intra = list(executor.map(wrapper_relocate_intra_single_route, routes_for_relocate_intra_opt))
-        else:
-            results_relocate_intra = [wrapper_relocate_intra_single_route(r) for r in routes_for_relocate_intra_opt]
-            
-        new_best_solution_routes = []
-        new_total_cost_temp = 0
-        
-        for optimized_segments, optimized_cost, route_id, was_improved in results_relocate_intra:
-            if was_improved:
-                improved_relocate_intra_pass = True
-
-            final_demand, _ = calculate_route_demand(optimized_segments, id_to_service_obj, capacidade_veiculo)
-            final_visits = [('D', 0, depot_node, depot_node)] + optimized_segments + [('D', 0, depot_node, depot_node)]
-            
-            new_best_solution_routes.append({
-                'route_id': route_id,
-                'demand': final_demand,
-                'cost': optimized_cost,
-                'visits': final_visits
-            })
-            new_total_cost_temp += optimized_cost
-
-        # Se o Relocate Intra melhorou o custo total
-        if improved_relocate_intra_pass and new_total_cost_temp < current_total_cost_solution:
-            best_solution_routes = new_best_solution_routes
-            current_total_cost_solution = new_total_cost_temp
+        if aplicar_intra('relocate_intra', perform_relocate_intra): # Se o Relocate Intra melhorou o custo total
+            current_total_cost_solution = solucao.custo
             total_improved_in_search = True
             print(f"    Relocate Intra melhorou. Novo Custo: {current_total_cost_solution:.2f}")
 
         # --- Operador 3: Relocate Inter-rota (Busca entre rotas) ---
         # Este operador é tipicamente executado sequencialmente devido à complexidade de gerenciar
-        # modificações entre múltiplas rotas de forma paralela. Ele tenta mover um serviço de uma
-        # rota para qualquer outra rota existente na solução.
-        improved_inter_relocate_pass = perform_relocate_inter(best_solution_routes, short_paths_matrix, depot_node, id_to_service_obj, capacidade_veiculo)
+        # modificações entre múltiplas rotas de forma paralela. Ele move serviços para perto dos seus
+        # vizinhos mais próximos em outras rotas, até nenhum movimento da vizinhança granular melhorar.
+        improved_inter_relocate_pass = perform_relocate_inter(solucao, matriz_servicos, capacidade_veiculo,
+                                                              vizinhanca_inter, cache_movimentos)
         
         # Se o Relocate Inter melhorou o custo total
         if improved_inter_relocate_pass:
-            # O perform_relocate_inter modifica as rotas in-place, então recalculamos o custo total aqui.
-            current_total_cost_solution = sum(r['cost'] for r in best_solution_routes) 
+            current_total_cost_solution = solucao.custo
             total_improved_in_search = True
             print(f"    Relocate Inter melhorou. Novo Custo: {current_total_cost_solution:.2f}")
 
+        cache_movimentos.tempos_iteracao.append((time.perf_counter() - t0_iteracao) * 1000)
+
+    print(f"  {cache_movimentos.resumo()}")
+
     # === Fim da Busca Local (VND) ===
     
-    final_solution_routes_output = best_solution_routes # A melhor solução de rotas encontrada
+    final_solution_routes_output = solucao.para_saida(matriz_servicos, depot_node) # Rotas no formato de saída
     final_total_cost = current_total_cost_solution # O custo total final da solução
 
     t1_total_optimization_process = time.perf_counter()
     # Tempo total de execução da função otimizar_solucao (Etapa 3)
-    total_clocks_optimization_stage = (t1_total_optimization_process - t0_total_optimization_process) * 1000
+    total_clocks_optimization_stage = ((t1_total_optimization_process - t0_total_optimization_process) * 1000
+                                       + instancia.clocks_preparacao) # Inclui a preparação (leitura, grafo e APSP)
 
     # Retorna os resultados conforme o formato esperado.
     # clocks_ref_exec: tempo total da Etapa 3 (APSP + Construtivo + Busca Local)
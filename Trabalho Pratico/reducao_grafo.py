@@ -0,0 +1,99 @@
+from collections import deque # Importa deque para a fila de nós candidatos à contração
+
+class GrafoReduzido:
+    """
+    Resultado da redução do grafo antes do APSP (ver `reduzir_grafo`): nós mantidos, custos de
+    travessia do grafo reduzido e, para cada atalho criado, a sequência de nós originais que ele
+    substitui. As distâncias entre nós mantidos são as mesmas do grafo original.
+    """
+    __slots__ = ('nos', 'traversal_costs', 'interiores', 'nos_removidos')
+
+    def expandir_caminho(self, caminho):
+        """
+        Converte um caminho do grafo reduzido (lista de nós mantidos) para o grafo original,
+        inserindo os nós internos de cada atalho.
+
+        Args:
+            caminho (list | None): Sequência de nós do grafo reduzido.
+
+        Returns:
+            list | None: A sequência correspondente de nós do grafo original.
+        """
+        if not caminho:
+            return caminho
+        expandido = [caminho[0]]
+        for u, v in zip(caminho, caminho[1:]):
+            expandido.extend(self.interiores.get((u, v), ()))
+            expandido.append(v)
+        return expandido
+
+def reduzir_grafo(all_graph_nodes, traversal_costs, nos_protegidos):
+    """
+    Contrai os nós não protegidos com no máximo dois vizinhos distintos (cadeias de ruas não
+    requeridas e becos sem saída), repetindo até não haver mais candidatos. Ao remover um nó x de
+    vizinhos {a, b}, cada par de arcos (p, x), (x, q) com p != q vira o atalho (p, q) de custo
+    c(p, x) + c(x, q); atalhos paralelos a arcos existentes ficam apenas com o menor custo.
+    Como x só pode ser atravessado entre a e b, nenhuma distância entre nós mantidos muda.
+
+    Args:
+        all_graph_nodes (list): Lista de todos os nós do grafo.
+        traversal_costs (dict): Dicionário de custos de travessia (chave: (u, v), valor: custo),
+                                como devolvido por `construir_grafo`.
+        nos_protegidos (iterable): Nós que não podem ser removidos: depósito, nós requeridos,
+                                   extremos dos serviços e demais origens/destinos do APSP.
+
+    Returns:
+        GrafoReduzido: Os nós mantidos (na ordem original), os custos do grafo reduzido e o
+                       mapeamento de cada atalho para os nós originais internos.
+    """
+    protegidos = set(nos_protegidos)
+    saida = {no: {} for no in all_graph_nodes}   # u -> {v: custo}
+    entrada = {no: {} for no in all_graph_nodes} # v -> {u: custo}
+    for (u, v), custo in traversal_costs.items():
+        saida[u][v] = custo
+        entrada[v][u] = custo
+    interiores = {} # (u, v) -> nós originais internos do atalho (apenas para atalhos)
+
+    removidos = set()
+    candidatos = deque(no for no in all_graph_nodes if no not in protegidos)
+    while candidatos:
+        x = candidatos.popleft()
+        if x in removidos:
+            continue
+        vizinhos = set(saida[x]) | set(entrada[x])
+        vizinhos.discard(x)
+        if len(vizinhos) > 2:
+            continue
+
+        # Cria os atalhos p -> q que passavam por x (laços p -> x -> p nunca fazem parte de um caminho mínimo)
+        for p, custo_px in entrada[x].items():
+            if p == x:
+                continue
+            for q, custo_xq in saida[x].items():
+                if q == x or q == p:
+                    continue
+                custo = custo_px + custo_xq
+                if q not in saida[p] or custo < saida[p][q]:
+                    saida[p][q] = custo
+                    entrada[q][p] = custo
+                    interiores[(p, q)] = interiores.get((p, x), ()) + (x,) + interiores.get((x, q), ())
+
+        # Remove x e os seus arcos; os vizinhos podem ter ficado com menos vizinhos distintos
+        for p in entrada[x]:
+            del saida[p][x]
+            interiores.pop((p, x), None)
+        for q in saida[x]:
+            if q != x:
+                del entrada[q][x]
+            interiores.pop((x, q), None)
+        saida[x] = {}
+        entrada[x] = {}
+        removidos.add(x)
+        candidatos.extend(no for no in vizinhos if no not in protegidos)
+
+    reducao = GrafoReduzido()
+    reducao.nos = [no for no in all_graph_nodes if no not in removidos]
+    reducao.traversal_costs = {(u, v): custo for u in reducao.nos for v, custo in saida[u].items()}
+    reducao.interiores = interiores
+    reducao.nos_removidos = removidos
+    return reducao
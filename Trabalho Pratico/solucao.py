@@ -0,0 +1,120 @@
+from array import array # Importa array para guardar as sequências de IDs e as somas de prefixo de forma compacta
+import sys # Importa sys para medir o tamanho das estruturas
+
+from matriz_servicos import INDICE_DEPOSITO
+
+class Rota:
+    """
+    Rota da busca local da Etapa 3 em formato compacto: os IDs dos serviços em ordem (array de int,
+    sem as visitas do depósito) e, calculadas uma única vez a cada alteração, as somas de prefixo da
+    carga e do custo ao longo da rota. Com a rota entre dois depósitos (posição 0 = saída,
+    len(servicos) + 1 = retorno), `prefixo_carga[k]` é a demanda dos k primeiros serviços e
+    `prefixo_custo[k]` o custo do trecho até a posição k (soma das células da `MatrizServicos`);
+    a carga e o custo da rota são os últimos valores.
+
+    Substitui o dicionário com a lista de visitas ('S', id, from, to) entre visitas ('D', ...),
+    montado apenas na saída (ver `para_saida`). Nos laços dos operadores, a sequência é copiada para
+    uma lista, cuja leitura é mais rápida que a do array (ver `GrafoCSR`).
+    """
+    __slots__ = ('route_id', 'servicos', 'prefixo_carga', 'prefixo_custo')
+
+    def __init__(self, route_id, servicos, matriz_servicos):
+        """
+        Args:
+            route_id (int): Número da rota na saída.
+            servicos (iterable): IDs dos serviços na ordem da rota.
+            matriz_servicos (MatrizServicos): Custos serviço -> serviço indexados pelo ID (depósito = 0).
+        """
+        self.route_id = route_id
+        self.definir_servicos(servicos, matriz_servicos)
+
+    def definir_servicos(self, servicos, matriz_servicos):
+        """Substitui a sequência de serviços e recalcula as somas de prefixo da carga e do custo."""
+        self.servicos = array('i', servicos)
+        custos, n, demanda = matriz_servicos.custos, matriz_servicos.n, matriz_servicos.demanda
+        prefixo_carga = [0]
+        prefixo_custo = [0]
+        carga = custo = 0
+        anterior = INDICE_DEPOSITO
+        for s in self.servicos:
+            carga += demanda[s]
+            custo += custos[anterior * n + s]
+            prefixo_carga.append(carga)
+            prefixo_custo.append(custo)
+            anterior = s
+        if self.servicos: # Rota vazia (apenas Depot -> Depot) tem custo zero
+            prefixo_custo.append(custo + custos[anterior * n + INDICE_DEPOSITO])
+        self.prefixo_carga = array('q', prefixo_carga)
+        self.prefixo_custo = array('q', prefixo_custo)
+
+    @property
+    def carga(self):
+        """Demanda total da rota."""
+        return self.prefixo_carga[-1]
+
+    @property
+    def custo(self):
+        """Custo total da rota, saindo do depósito e voltando a ele."""
+        return self.prefixo_custo[-1]
+
+    def chave(self):
+        """Tupla dos IDs dos serviços, que identifica a rota pelo conteúdo (ver `CacheMovimentos`)."""
+        return tuple(self.servicos)
+
+    def para_saida(self, matriz_servicos, depot_node):
+        """
+        Converte a rota para o formato de saída das Etapas 2 e 3.
+
+        Returns:
+            dict: {'route_id', 'demand', 'cost', 'visits'}, com as visitas ('S', id, from, to) entre as
+                  visitas ('D', 0, depot_node, depot_node).
+        """
+        inicio, fim = matriz_servicos.inicio, matriz_servicos.fim
+        return {
+            'route_id': self.route_id,
+            'demand': self.carga,
+            'cost': self.custo,
+            'visits': ([('D', 0, depot_node, depot_node)] + [('S', s, inicio[s], fim[s]) for s in self.servicos]
+                       + [('D', 0, depot_node, depot_node)])
+        }
+
+    def tamanho_em_bytes(self):
+        """Retorna o tamanho (em bytes) do objeto e dos seus três arrays."""
+        return (sys.getsizeof(self) + sys.getsizeof(self.servicos) + sys.getsizeof(self.prefixo_carga)
+                + sys.getsizeof(self.prefixo_custo))
+
+class Solucao:
+    """
+    Solução da busca local da Etapa 3: a lista de rotas (`Rota`). O custo total é a soma dos custos
+    guardados nas rotas, sem percorrer as visitas.
+    """
+    __slots__ = ('rotas',)
+
+    def __init__(self, rotas):
+        """
+        Args:
+            rotas (list): As rotas (`Rota`) da solução.
+        """
+        self.rotas = rotas
+
+    @classmethod
+    def de_rotas_saida(cls, all_routes_data, matriz_servicos):
+        """
+        Monta a solução a partir de rotas no formato de saída (ex: o da solução inicial, ver
+        `generate_initial_solution_internal`), mantendo os números das rotas.
+        """
+        return cls([Rota(r['route_id'], [v[1] for v in r['visits'] if v[0] == 'S'], matriz_servicos)
+                    for r in all_routes_data])
+
+    @property
+    def custo(self):
+        """Custo total da solução."""
+        return sum(rota.custo for rota in self.rotas)
+
+    def para_saida(self, matriz_servicos, depot_node):
+        """Converte todas as rotas para o formato de saída das Etapas 2 e 3 (ver `Rota.para_saida`)."""
+        return [rota.para_saida(matriz_servicos, depot_node) for rota in self.rotas]
+
+    def tamanho_em_bytes(self):
+        """Retorna o tamanho (em bytes) da solução, somando o de cada rota."""
+        return sys.getsizeof(self) + sys.getsizeof(self.rotas) + sum(rota.tamanho_em_bytes() for rota in self.rotas)